@@ -0,0 +1,145 @@
+# Author: Baturov Illia (xbatur00)
+#
+# --batch of interpret.py and the in-process runs shared with --serve and
+# --test. Imported by interpret.py only in these modes.
+
+import io
+import os
+import sys
+import json
+import time
+import hashlib
+
+from interpret import Interpreter, IPP_error
+
+### BATCH ###
+
+# --batch: programs of a directory or manifest run in a pool of worker
+# processes, every worker imports the interpreter once and runs its
+# programs in-process, one JSON line per program goes to --results
+
+program_cache_size = 256
+
+# interpreter of the source, from programs when it was loaded before
+def cached_interpreter(source_data, opt_level, programs):
+    if programs is None:
+        return Interpreter.load(source_data, opt_level)
+    key = (hashlib.sha256(source_data).digest(), opt_level)
+    interpreter = programs.pop(key, None)
+    if interpreter is None:
+        interpreter = Interpreter.load(source_data, opt_level)
+        if len(programs) >= program_cache_size:
+            # least recently used first
+            programs.pop(next(iter(programs)))
+    programs[key] = interpreter
+    return interpreter
+
+# one program with input, output and stderr kept in memory, programs is
+# the cache of loaded interpreters of --serve,
+# returns (stdout bytes, stderr text, exit code)
+def run_isolated(source_data, input_data, opt_level=1, programs=None):
+    saved_stderr = sys.stderr
+    sys.stderr = io.StringIO()
+    output = io.BytesIO()
+    try:
+        exit_code = cached_interpreter(source_data, opt_level, programs).run(input_data, output)
+    except IPP_error as error:
+        exit_code = error.exit_code
+    except Exception:
+        # internal error, the worker keeps running
+        import traceback
+        sys.stderr.write(traceback.format_exc())
+        exit_code = 99
+    finally:
+        errors = sys.stderr.getvalue()
+        sys.stderr = saved_stderr
+    return output.getvalue(), errors, exit_code
+
+# raised by the timer of a worker, not an Exception so run_isolated lets it through
+class IPP_timeout(BaseException):
+    pass
+
+def request_timer(signal_number, frame):
+    raise IPP_timeout()
+
+worker_timeout = 10.0
+
+# pool workers of --batch and --test stop a program after worker_timeout
+def pool_worker_start(timeout):
+    import signal
+    global worker_timeout
+    worker_timeout = timeout
+    signal.signal(signal.SIGALRM, request_timer)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+# run_isolated under the timer of the worker, exit code None on timeout
+def run_timed(source_data, input_data, opt_level):
+    import signal
+    signal.setitimer(signal.ITIMER_REAL, worker_timeout)
+    try:
+        return run_isolated(source_data, input_data, opt_level)
+    except IPP_timeout:
+        return b'', '', None
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+
+# (source, input) pairs: *.src and *.xml files of a directory with the .in
+# file of the same name, or manifest lines "source<TAB>input" relative to it
+def batch_programs(path):
+    if os.path.isdir(path):
+        for name in sorted(os.listdir(path)):
+            stem, extension = os.path.splitext(name)
+            if extension in ('.src', '.xml'):
+                input_path = os.path.join(path, stem + '.in')
+                yield os.path.join(path, name), input_path if os.path.isfile(input_path) else None
+        return
+    base = os.path.dirname(path)
+    with open(path) as manifest:
+        for line in manifest:
+            fields = line.rstrip('\n').split('\t')
+            if not fields[0].strip() or fields[0].startswith('#'):
+                continue
+            input_path = os.path.join(base, fields[1]) if len(fields) > 1 and fields[1] else None
+            yield os.path.join(base, fields[0]), input_path
+
+def batch_worker(task):
+    source_path, input_path, opt_level = task
+    start = time.perf_counter()
+    with open(source_path, 'rb') as source_file:
+        source_data = source_file.read()
+    input_data = b''
+    if input_path:
+        with open(input_path, 'rb') as batch_input:
+            input_data = batch_input.read()
+    output, errors, exit_code = run_timed(source_data, input_data, opt_level)
+    result = {
+        "source": source_path,
+        "input": input_path,
+        "exit_code": exit_code,
+        "stdout": output.decode('utf-8', 'replace'),
+        "stderr": errors,
+        "time": time.perf_counter() - start,
+    }
+    if exit_code is None:
+        result["error"] = "timeout"
+    return result
+
+def run_batch(path, workers, results_path, opt_level, timeout):
+    # the pool is only imported in batch mode, it costs every other run startup time
+    import multiprocessing
+
+    tasks = [(source, input_path, opt_level) for source, input_path in batch_programs(path)]
+    workers = workers or os.cpu_count() or 1
+    chunk_size = max(1, len(tasks) // (workers * 16))
+    failed = timed_out = 0
+    start = time.perf_counter()
+    with multiprocessing.Pool(workers, pool_worker_start, (timeout,)) as pool, open(results_path, 'w') as results:
+        for result in pool.imap(batch_worker, tasks, chunk_size):
+            json.dump(result, results)
+            results.write('\n')
+            failed += result["exit_code"] != 0
+            timed_out += result["exit_code"] is None
+    elapsed = time.perf_counter() - start
+
+    print(f"programs: {len(tasks)} nonzero exit: {failed} timeout: {timed_out} workers: {workers}", file=sys.stderr)
+    print(f"time: {elapsed:.3f} s throughput: {len(tasks) / elapsed:.1f} programs/s", file=sys.stderr)
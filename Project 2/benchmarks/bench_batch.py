@@ -0,0 +1,86 @@
+# Throughput of --batch against one interpret.py process per program on
+# a corpus of short generated programs.
+#
+# usage: python3 benchmarks/bench_batch.py [programs] [workers]
+
+import os
+import sys
+import json
+import time
+import shutil
+import tempfile
+import subprocess
+
+from workloads import Program_builder
+
+interpret_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'interpret.py')
+
+### CORPUS ###
+
+# reads a number, sums up to it and writes the sum
+def short_program(number):
+    program = Program_builder()
+    program.add('DEFVAR', 'GF@n').add('DEFVAR', 'GF@sum')
+    program.add('READ', 'GF@n', 'type:int')
+    program.add('MOVE', 'GF@sum', 'int@0')
+    program.add('LABEL', 'label:loop')
+    program.add('ADD', 'GF@sum', 'GF@sum', 'GF@n')
+    program.add('SUB', 'GF@n', 'GF@n', 'int@1')
+    program.add('JUMPIFNEQ', 'label:loop', 'GF@n', 'int@0')
+    program.add('WRITE', 'GF@sum')
+    program.add('EXIT', f'int@{number % 3}')
+    return program.xml(), f"{number % 50 + 1}\n"
+
+def write_corpus(corpus_dir, programs):
+    for number in range(programs):
+        source, input_text = short_program(number)
+        with open(os.path.join(corpus_dir, f"p{number:05}.src"), 'w') as source_file:
+            source_file.write(source)
+        with open(os.path.join(corpus_dir, f"p{number:05}.in"), 'w') as input_file:
+            input_file.write(input_text)
+
+### BENCHMARK ###
+
+def process_per_program(corpus_dir):
+    results = []
+    for name in sorted(os.listdir(corpus_dir)):
+        if name.endswith('.src'):
+            stem = os.path.join(corpus_dir, name[:-4])
+            process = subprocess.run([sys.executable, interpret_path, '--source', stem + '.src', '--input', stem + '.in'],
+                capture_output=True)
+            results.append((process.returncode, process.stdout.decode()))
+    return results
+
+def batch(corpus_dir, workers, results_path):
+    arguments = [sys.executable, interpret_path, '--batch', corpus_dir, '--results', results_path]
+    if workers:
+        arguments += ['--workers', str(workers)]
+    subprocess.run(arguments, check=True, capture_output=True)
+    with open(results_path) as results:
+        return [(result["exit_code"], result["stdout"]) for result in map(json.loads, results)]
+
+if __name__ == '__main__':
+    programs = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    work_dir = tempfile.mkdtemp()
+    try:
+        corpus_dir = os.path.join(work_dir, 'corpus')
+        os.mkdir(corpus_dir)
+        write_corpus(corpus_dir, programs)
+
+        start = time.perf_counter()
+        expected = process_per_program(corpus_dir)
+        process_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        results = batch(corpus_dir, workers, os.path.join(work_dir, 'results.jsonl'))
+        batch_time = time.perf_counter() - start
+    finally:
+        shutil.rmtree(work_dir)
+
+    if results != expected:
+        sys.exit("batch results differ from separate processes")
+    print(f"programs:             {programs}")
+    print(f"process per program:  {programs / process_time:10.1f} programs/s ({process_time:.3f} s)")
+    print(f"batch:                {programs / batch_time:10.1f} programs/s ({batch_time:.3f} s)")
+    print(f"speedup:              {process_time / batch_time:10.2f}x")
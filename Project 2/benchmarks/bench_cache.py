@@ -0,0 +1,61 @@
+# Startup time of interpret.py without the program cache, with a cold
+# cache (decode and store) and with a warm cache (load the .ippc file).
+#
+# usage: python3 benchmarks/bench_cache.py [runs]
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+import subprocess
+
+interpret_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'interpret.py')
+
+### PROGRAM ###
+
+# filler instructions skipped by the first JUMP, so only startup is measured
+def skipped_program(instructions):
+    lines = ['<?xml version="1.0" encoding="UTF-8"?>', '<program language="IPPcode23">']
+    lines.append(' <instruction order="1" opcode="DEFVAR"><arg1 type="var">GF@x</arg1></instruction>')
+    lines.append(' <instruction order="2" opcode="JUMP"><arg1 type="label">end</arg1></instruction>')
+    for order in range(3, instructions + 3):
+        lines.append(f' <instruction order="{order}" opcode="CONCAT"><arg1 type="var">GF@x</arg1>'
+            f'<arg2 type="string">line\\032{order}</arg2><arg3 type="var">GF@x</arg3></instruction>')
+    lines.append(f' <instruction order="{instructions + 3}" opcode="LABEL"><arg1 type="label">end</arg1></instruction>')
+    lines.append('</program>')
+    return '\n'.join(lines) + '\n'
+
+### BENCHMARK ###
+
+def startup_time(source, cache_dir, runs):
+    arguments = [sys.executable, interpret_path, '--source', source]
+    if cache_dir:
+        arguments += ['--cache-dir', cache_dir]
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(arguments, check=True)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+if __name__ == '__main__':
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    work_dir = tempfile.mkdtemp()
+    try:
+        print(f"{'instructions':>12} {'size':>9} {'no cache':>9} {'cold':>9} {'warm':>9} {'speedup':>8}")
+        for instructions in (100, 20000, 100000):
+            source = os.path.join(work_dir, f"program_{instructions}.xml")
+            with open(source, 'w') as source_file:
+                source_file.write(skipped_program(instructions))
+            cache_dir = os.path.join(work_dir, f"cache_{instructions}")
+
+            no_cache = startup_time(source, None, runs)
+            cold = startup_time(source, cache_dir, 1)
+            warm = startup_time(source, cache_dir, runs)
+
+            size = os.path.getsize(source) / 1024 / 1024
+            print(f"{instructions:>12} {size:>7.2f}MB {no_cache:>8.3f}s {cold:>8.3f}s {warm:>8.3f}s {no_cache / warm:>7.2f}x")
+    finally:
+        shutil.rmtree(work_dir)
@@ -0,0 +1,69 @@
+# Pause of the dispatch loop per --checkpoint: the string benchmark is stopped
+# after its CONCAT loop and the state is written by a forked child, as
+# run_program_limited does, and synchronously, as without os.fork.
+#
+# usage: python3 benchmarks/bench_checkpoint.py [megabytes] [runs]
+
+import io
+import os
+import sys
+import time
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import interpret
+import checkpoint
+from bench_string import string_program
+
+### BENCHMARK ###
+
+# runs the program up to the given step, the state stays in the interpreter globals
+def stop_at(program, steps):
+    interpret.output_file = io.BytesIO()
+    interpret.max_steps = steps
+    stderr, sys.stderr = sys.stderr, io.StringIO()
+    try:
+        interpret.run_program_limited(program)
+    except SystemExit:
+        pass
+    sys.stderr = stderr
+    interpret.max_steps = None
+
+def forked(fingerprint):
+    start = time.perf_counter()
+    checkpoint.write_checkpoint(fingerprint, interpret.limit_steps)
+    elapsed = time.perf_counter() - start
+    checkpoint.finish_checkpoint()
+    return elapsed
+
+def synchronous(fingerprint):
+    start = time.perf_counter()
+    checkpoint.write_checkpoint_file(checkpoint.encode_checkpoint(fingerprint, interpret.limit_steps))
+    return time.perf_counter() - start
+
+if __name__ == '__main__':
+    megabytes = float(sys.argv[1]) if len(sys.argv) > 1 else 10
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    size = int(megabytes * 1000000) // 10 * 10
+    program, _ = interpret.build_cfg(interpret.load_program(io.BytesIO(string_program(size, 'abcdefghij').encode())))
+    program = interpret.optimize_program(program, 1)
+    # stopped in the CONCAT loop, the string is most of the state
+    stop_at(program, size // 10 * 2)
+    string = str(interpret.ipp_global_frame[interpret.ipp_global_names['s']])
+    fingerprint = checkpoint.program_fingerprint(program)
+
+    with tempfile.TemporaryDirectory() as directory:
+        interpret.checkpoint_path = os.path.join(directory, 'checkpoint')
+        # alternating runs, best of each
+        fork_time = sync_time = float('inf')
+        for _ in range(runs):
+            fork_time = min(fork_time, forked(fingerprint))
+            sync_time = min(sync_time, synchronous(fingerprint))
+        checkpoint_size = os.path.getsize(interpret.checkpoint_path)
+        state = checkpoint.read_checkpoint(interpret.checkpoint_path, fingerprint)
+        if state is None or state["global"][interpret.ipp_global_names['s']] != string:
+            sys.exit("checkpoint does not restore the string")
+
+    print(f"{checkpoint_size} bytes of checkpoint, {len(string)} characters, {interpret.limit_steps} steps")
+    print(f"{'forked':<12} {fork_time * 1000:8.2f} ms pause")
+    print(f"{'synchronous':<12} {sync_time * 1000:8.2f} ms pause")
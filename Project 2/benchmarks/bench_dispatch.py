@@ -0,0 +1,72 @@
+# Instructions per second of the decoded dispatch loop against the
+# per-instruction `cases` dictionary loop it replaced.
+#
+# usage: python3 benchmarks/bench_dispatch.py [iterations]
+
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import interpret
+
+### PROGRAM ###
+
+# counting loop, three instructions per iteration
+def loop_program(iterations):
+    return f'''<?xml version="1.0" encoding="UTF-8"?>
+<program language="IPPcode23">
+ <instruction order="1" opcode="DEFVAR"><arg1 type="var">GF@i</arg1></instruction>
+ <instruction order="2" opcode="DEFVAR"><arg1 type="var">GF@n</arg1></instruction>
+ <instruction order="3" opcode="DEFVAR"><arg1 type="var">GF@c</arg1></instruction>
+ <instruction order="4" opcode="MOVE"><arg1 type="var">GF@i</arg1><arg2 type="int">0</arg2></instruction>
+ <instruction order="5" opcode="MOVE"><arg1 type="var">GF@n</arg1><arg2 type="int">{iterations}</arg2></instruction>
+ <instruction order="6" opcode="LABEL"><arg1 type="label">loop</arg1></instruction>
+ <instruction order="7" opcode="ADD"><arg1 type="var">GF@i</arg1><arg2 type="var">GF@i</arg2><arg3 type="int">1</arg3></instruction>
+ <instruction order="8" opcode="LT"><arg1 type="var">GF@c</arg1><arg2 type="var">GF@i</arg2><arg3 type="var">GF@n</arg3></instruction>
+ <instruction order="9" opcode="JUMPIFEQ"><arg1 type="label">loop</arg1><arg2 type="var">GF@c</arg2><arg3 type="bool">true</arg3></instruction>
+</program>
+'''.encode()
+
+### LEGACY LOOP ###
+
+# the dictionary is rebuilt and the order parsed for every executed
+# instruction, as it used to be; jumps use the indices of the linked program
+def legacy_interpreter(instruction):
+    if ( int(instruction.order) < 1 ):
+        exit(32)
+    cases = dict(interpret.ipp_handlers)
+    if instruction.opcode in cases:
+        cases[instruction.opcode](instruction)
+    else:
+        exit(53)
+
+def legacy_run(instructions):
+    executed = 0
+    interpret.instruction_order = 1
+    while interpret.instruction_order - 1 < len(instructions):
+        legacy_interpreter(instructions[interpret.instruction_order - 1])
+        interpret.instruction_order += 1
+        executed += 1
+    return executed
+
+### BENCHMARK ###
+
+def measure(run, instructions):
+    interpret.reset_frames()
+    start = time.perf_counter()
+    result = run(instructions)
+    return time.perf_counter() - start, result
+
+if __name__ == '__main__':
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    program, _ = interpret.build_cfg(interpret.load_program(io.BytesIO(loop_program(iterations))))
+
+    legacy_time, executed = measure(legacy_run, program)
+    decoded_time, _ = measure(interpret.run_program, program)
+
+    print(f"executed instructions: {executed}")
+    print(f"legacy loop:  {executed / legacy_time:12.0f} instructions/s ({legacy_time:.3f} s)")
+    print(f"decoded loop: {executed / decoded_time:12.0f} instructions/s ({decoded_time:.3f} s)")
+    print(f"speedup:      {legacy_time / decoded_time:12.2f}x")
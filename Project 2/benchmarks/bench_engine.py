@@ -0,0 +1,52 @@
+# Run time of the benchmark workloads with the dispatch loop (superinstructions
+# on) and with --engine=compiled, compile time included in the latter.
+#
+# usage: python3 benchmarks/bench_engine.py [scale] [workload ...]
+
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import interpret
+import compiled_engine
+from workloads import workloads
+
+### BENCHMARK ###
+
+def run(source, input_text, engine):
+    interpret.input_reader = io.BytesIO(input_text.encode())
+    interpret.output_file = io.BytesIO()
+    interpret.data_stack.clear()
+    program, blocks = interpret.build_cfg(interpret.load_program(io.BytesIO(source.encode())))
+    start = time.perf_counter()
+    try:
+        if engine == 'compiled':
+            compiled_engine.run_compiled(program, blocks)
+        else:
+            interpret.run_program(interpret.optimize_program(program, 1))
+    except SystemExit:
+        pass
+    elapsed = time.perf_counter() - start
+    interpret.flush_output()
+    return elapsed, interpret.output_file.getvalue()
+
+def compile_time(source):
+    program, blocks = interpret.build_cfg(interpret.load_program(io.BytesIO(source.encode())))
+    start = time.perf_counter()
+    compiled_engine.compile_program(program, blocks)
+    return time.perf_counter() - start
+
+if __name__ == '__main__':
+    scale = float(sys.argv[1]) if len(sys.argv) > 1 else 1.0
+    names = sys.argv[2:] or list(workloads)
+
+    print(f"{'workload':<10} {'interpreted':>12} {'compiled':>12} {'compile':>9} {'speedup':>8}")
+    for name in names:
+        source, input_text = workloads[name](scale)
+        interpreted, expected = run(source, input_text, 'interpreted')
+        compiled, output = run(source, input_text, 'compiled')
+        if output != expected:
+            sys.exit(f"{name}: compiled output differs")
+        print(f"{name:<10} {interpreted:>11.3f}s {compiled:>11.3f}s {compile_time(source) * 1000:>7.1f}ms {interpreted / compiled:>7.2f}x")
@@ -0,0 +1,77 @@
+# CALL/RETURN pairs that each set up a frame: the caller creates a temporary
+# frame with an argument, the callee pushes it, computes a result into it and
+# pops it back, with both engines. The loop runs once more in a program with
+# many functions it never calls, each with its own local variable, and takes
+# as long as without them.
+#
+# usage: python3 benchmarks/bench_frames.py [calls] [functions]
+
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import interpret
+import compiled_engine
+from workloads import Program_builder
+
+### PROGRAM ###
+
+def call_program(calls, functions=0):
+    program = Program_builder()
+    program.add('DEFVAR', 'GF@i')
+    program.add('MOVE', 'GF@i', 'int@0')
+    program.add('LABEL', 'label:loop')
+    program.add('CREATEFRAME')
+    program.add('DEFVAR', 'TF@n')
+    program.add('MOVE', 'TF@n', 'GF@i')
+    program.add('CALL', 'label:next')
+    program.add('MOVE', 'GF@i', 'TF@result')
+    program.add('JUMPIFNEQ', 'label:loop', 'GF@i', f'int@{calls}')
+    program.add('WRITE', 'GF@i')
+    program.add('EXIT', 'int@0')
+    # result = n + 1
+    program.add('LABEL', 'label:next')
+    program.add('PUSHFRAME')
+    program.add('DEFVAR', 'LF@result')
+    program.add('ADD', 'LF@result', 'LF@n', 'int@1')
+    program.add('POPFRAME')
+    program.add('RETURN')
+    # never called
+    for function in range(functions):
+        program.add('LABEL', f'label:unused{function}')
+        program.add('PUSHFRAME')
+        program.add('DEFVAR', f'LF@unused{function}')
+        program.add('POPFRAME')
+        program.add('RETURN')
+    return program.xml()
+
+### BENCHMARK ###
+
+def run(source, engine):
+    interpret.output_file = io.BytesIO()
+    program, blocks = interpret.build_cfg(interpret.load_program(io.BytesIO(source.encode())))
+    start = time.perf_counter()
+    try:
+        if engine == 'compiled':
+            compiled_engine.run_compiled(program, blocks)
+        else:
+            interpret.run_program(interpret.optimize_program(program, 1))
+    except SystemExit:
+        pass
+    interpret.flush_output()
+    return time.perf_counter() - start, interpret.output_file.getvalue()
+
+if __name__ == '__main__':
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    functions = int(sys.argv[2]) if len(sys.argv) > 2 else 10000
+
+    print(f"{calls} CALL/RETURN pairs, 11 instructions each")
+    for count in (0, functions):
+        source = call_program(calls, count)
+        for engine in ('interpreted', 'compiled'):
+            elapsed, output = run(source, engine)
+            if output != str(calls).encode():
+                sys.exit(f"{engine}: wrong output {output!r}")
+            print(f"{engine:<12} {count:>6} unused functions {elapsed:8.3f}s {elapsed / calls * 1e9:8.0f} ns/call")
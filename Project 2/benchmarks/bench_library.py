@@ -0,0 +1,61 @@
+# Runs per second of a small program through the Interpreter class inside
+# one process, loaded once against loaded for every run.
+#
+# usage: python3 benchmarks/bench_library.py [runs]
+
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import interpret
+from workloads import Program_builder
+
+### PROGRAM ###
+
+# reads a number, writes the sum up to it from a called function
+def small_program():
+    program = Program_builder()
+    program.add('DEFVAR', 'GF@n').add('DEFVAR', 'GF@sum')
+    program.add('READ', 'GF@n', 'type:int')
+    program.add('MOVE', 'GF@sum', 'int@0')
+    program.add('CALL', 'label:sum')
+    program.add('WRITE', 'GF@sum')
+    program.add('EXIT', 'int@3')
+    program.add('LABEL', 'label:sum')
+    program.add('ADD', 'GF@sum', 'GF@sum', 'GF@n')
+    program.add('SUB', 'GF@n', 'GF@n', 'int@1')
+    program.add('JUMPIFNEQ', 'label:sum', 'GF@n', 'int@0')
+    program.add('RETURN')
+    return program.xml().encode()
+
+### BENCHMARK ###
+
+def measure(runs, load_every_run):
+    source = small_program()
+    interpreter = interpret.Interpreter.load(source)
+    start = time.perf_counter()
+    for number in range(runs):
+        if load_every_run:
+            interpreter = interpret.Interpreter.load(source)
+        output = io.BytesIO()
+        exit_code = interpreter.run(b'10\n', output)
+        assert exit_code == 3 and output.getvalue() == b'55', (exit_code, output.getvalue())
+    return time.perf_counter() - start
+
+if __name__ == '__main__':
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+
+    loaded_time = measure(runs, False)
+    reload_time = measure(runs // 10, True) * 10
+
+    try:
+        interpret.Interpreter.load(b'<program language="IPPcode23"><instruction')
+    except interpret.IPP_error as error:
+        load_error = error.exit_code
+
+    print(f"runs:              {runs}")
+    print(f"loaded once:       {runs / loaded_time:10.0f} runs/s ({loaded_time / runs * 1e6:.1f} us/run)")
+    print(f"loaded every run:  {runs / reload_time:10.0f} runs/s ({reload_time / runs * 1e6:.1f} us/run)")
+    print(f"malformed XML:     IPP_error exit code {load_error}, host still running")
@@ -0,0 +1,55 @@
+# Overhead of --max-steps, --timeout and --max-memory: the benchmark workloads
+# run by run_program and by run_program_limited with all three limits set
+# high enough never to be reached.
+#
+# usage: python3 benchmarks/bench_limits.py [scale] [runs]
+
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import interpret
+from workloads import workloads
+
+### BENCHMARK ###
+
+def run(program, input_text, limited):
+    interpret.input_reader = io.BytesIO(input_text.encode())
+    interpret.output_file = io.BytesIO()
+    interpret.data_stack.clear()
+    start = time.perf_counter()
+    try:
+        if limited:
+            interpret.run_program_limited(program)
+        else:
+            interpret.run_program(program)
+    except SystemExit:
+        pass
+    elapsed = time.perf_counter() - start
+    interpret.flush_output()
+    return elapsed, interpret.output_file.getvalue()
+
+if __name__ == '__main__':
+    scale = float(sys.argv[1]) if len(sys.argv) > 1 else 1.0
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    interpret.max_steps = 1 << 62
+    interpret.time_limit = 3600.0
+    interpret.max_memory = 1 << 40
+
+    print(f"{'workload':<10} {'plain':>9} {'limited':>9} {'overhead':>9}")
+    for name, workload in workloads.items():
+        source, input_text = workload(scale)
+        program, _ = interpret.build_cfg(interpret.load_program(io.BytesIO(source.encode())))
+        program = interpret.optimize_program(program, 1)
+        # alternating runs, best of each
+        plain = limited = float('inf')
+        for _ in range(runs):
+            plain_time, expected = run(program, input_text, False)
+            limited_time, output = run(program, input_text, True)
+            if output != expected:
+                sys.exit(f"{name}: limited output differs")
+            plain = min(plain, plain_time)
+            limited = min(limited, limited_time)
+        print(f"{name:<10} {plain:>8.3f}s {limited:>8.3f}s {(limited / plain - 1) * 100:>+8.1f}%")
@@ -0,0 +1,68 @@
+# WRITE throughput of the buffered output against print() per WRITE.
+#
+# usage: python3 benchmarks/bench_output.py [writes]
+
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import interpret
+
+### PROGRAM ###
+
+# ten WRITEs of an int and a string per loop iteration
+def write_program(iterations):
+    lines = ['<?xml version="1.0" encoding="UTF-8"?>', '<program language="IPPcode23">']
+    def instruction(opcode, *arguments):
+        args = ''.join(f'<arg{i} type="{t}">{v}</arg{i}>' for i, (t, v) in enumerate(arguments, 1))
+        lines.append(f' <instruction order="{len(lines) - 1}" opcode="{opcode}">{args}</instruction>')
+    instruction('DEFVAR', ('var', 'GF@i'))
+    instruction('DEFVAR', ('var', 'GF@c'))
+    instruction('MOVE', ('var', 'GF@i'), ('int', '0'))
+    instruction('LABEL', ('label', 'loop'))
+    for _ in range(5):
+        instruction('WRITE', ('var', 'GF@i'))
+        instruction('WRITE', ('string', 'row\\010'))
+    instruction('ADD', ('var', 'GF@i'), ('var', 'GF@i'), ('int', '1'))
+    instruction('LT', ('var', 'GF@c'), ('var', 'GF@i'), ('int', str(iterations)))
+    instruction('JUMPIFEQ', ('label', 'loop'), ('var', 'GF@c'), ('bool', 'true'))
+    lines.append('</program>')
+    return ('\n'.join(lines) + '\n').encode()
+
+### BENCHMARK ###
+
+def print_output(string):
+    print(string, end='')
+
+def measure(program, buffered):
+    write_output = interpret.write_output
+    stdout = sys.stdout
+    with open(os.devnull, 'w') as devnull:
+        if buffered:
+            interpret.output_file = devnull.buffer
+        else:
+            interpret.write_output = print_output
+            sys.stdout = devnull
+        try:
+            start = time.perf_counter()
+            interpret.run_program(program)
+            interpret.flush_output()
+            return time.perf_counter() - start
+        finally:
+            interpret.write_output = write_output
+            interpret.output_file = None
+            sys.stdout = stdout
+
+if __name__ == '__main__':
+    writes = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    program = interpret.load_program(io.BytesIO(write_program(writes // 10)))
+
+    print_time = measure(program, False)
+    buffered_time = measure(program, True)
+
+    print(f"writes:   {writes}")
+    print(f"print():  {writes / print_time:12.0f} writes/s ({print_time:.3f} s)")
+    print(f"buffered: {writes / buffered_time:12.0f} writes/s ({buffered_time:.3f} s)")
+    print(f"speedup:  {print_time / buffered_time:12.2f}x")
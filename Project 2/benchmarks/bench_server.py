@@ -0,0 +1,103 @@
+# Request latency of interpret.py --serve against starting interpret.py
+# for every program, plus a timed out request that must not stop the server.
+#
+# usage: python3 benchmarks/bench_server.py [requests] [workers]
+
+import os
+import sys
+import json
+import time
+import socket
+import shutil
+import tempfile
+import subprocess
+
+from workloads import Program_builder
+
+interpret_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'interpret.py')
+
+### PROGRAMS ###
+
+def sum_program():
+    program = Program_builder()
+    program.add('DEFVAR', 'GF@n').add('DEFVAR', 'GF@sum')
+    program.add('READ', 'GF@n', 'type:int')
+    program.add('MOVE', 'GF@sum', 'int@0')
+    program.add('LABEL', 'label:loop')
+    program.add('ADD', 'GF@sum', 'GF@sum', 'GF@n')
+    program.add('SUB', 'GF@n', 'GF@n', 'int@1')
+    program.add('JUMPIFNEQ', 'label:loop', 'GF@n', 'int@0')
+    program.add('WRITE', 'GF@sum')
+    return program.xml()
+
+def endless_program():
+    program = Program_builder()
+    program.add('LABEL', 'label:loop')
+    program.add('JUMP', 'label:loop')
+    return program.xml()
+
+### CLIENT ###
+
+class Client:
+    def __init__(self, socket_path):
+        self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.socket.connect(socket_path)
+        self.responses = self.socket.makefile('rb')
+
+    def request(self, **request):
+        self.socket.sendall(json.dumps(request).encode() + b'\n')
+        return json.loads(self.responses.readline())
+
+def wait_for_socket(socket_path):
+    for _ in range(200):
+        if os.path.exists(socket_path):
+            return
+        time.sleep(0.05)
+    sys.exit("server did not start")
+
+### BENCHMARK ###
+
+if __name__ == '__main__':
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    workers = sys.argv[2] if len(sys.argv) > 2 else '2'
+    work_dir = tempfile.mkdtemp()
+    socket_path = os.path.join(work_dir, 'interpret.sock')
+    source_path = os.path.join(work_dir, 'sum.xml')
+    with open(source_path, 'w') as source_file:
+        source_file.write(sum_program())
+    server = subprocess.Popen([sys.executable, interpret_path, '--serve', socket_path, '--workers', workers],
+        stderr=subprocess.DEVNULL)
+    try:
+        wait_for_socket(socket_path)
+        client = Client(socket_path)
+
+        start = time.perf_counter()
+        for number in range(requests):
+            response = client.request(source=source_path, input=f"{number % 50 + 1}\n")
+            assert response["exit_code"] == 0, response
+        server_time = time.perf_counter() - start
+
+        processes = max(1, requests // 100)
+        start = time.perf_counter()
+        for number in range(processes):
+            subprocess.run([sys.executable, interpret_path, '--source', source_path],
+                input=f"{number % 50 + 1}\n".encode(), capture_output=True, check=True)
+        process_time = (time.perf_counter() - start) / processes * requests
+
+        start = time.perf_counter()
+        timed_out = client.request(xml=endless_program(), timeout=0.5)
+        timeout_time = time.perf_counter() - start
+        after = client.request(xml=sum_program(), input="3\n")
+        bad = client.request(xml="<program", input="")
+    finally:
+        server.terminate()
+        server.wait()
+        shutil.rmtree(work_dir)
+
+    print(f"requests:            {requests}")
+    print(f"server:              {server_time / requests * 1000:8.3f} ms/request ({requests / server_time:.0f} requests/s)")
+    print(f"process per program: {process_time / requests * 1000:8.3f} ms/request (from {processes} runs)")
+    print(f"speedup:             {process_time / server_time:8.1f}x")
+    print(f"endless program:     {timed_out} after {timeout_time:.2f} s")
+    print(f"next request:        exit_code={after['exit_code']} stdout={after['stdout']!r}")
+    print(f"malformed XML:       exit_code={bad['exit_code']}")
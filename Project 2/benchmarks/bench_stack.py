@@ -0,0 +1,77 @@
+# The int_loop workload in frame form (ADD, MUL, LT on GF variables) against
+# the same loop in stack form (PUSHS, MULS, ADDS, JUMPIFNEQS), with both engines.
+#
+# usage: python3 benchmarks/bench_stack.py [iterations]
+
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import interpret
+import compiled_engine
+from workloads import Program_builder
+
+### PROGRAMS ###
+
+# acc += i * 3 - 1 for every i below iterations, then WRITE acc
+def frame_program(iterations):
+    program = Program_builder()
+    program.add('DEFVAR', 'GF@i').add('DEFVAR', 'GF@acc').add('DEFVAR', 'GF@c')
+    program.add('MOVE', 'GF@i', 'int@0').add('MOVE', 'GF@acc', 'int@0')
+    program.add('LABEL', 'label:loop')
+    program.add('MUL', 'GF@c', 'GF@i', 'int@3')
+    program.add('SUB', 'GF@c', 'GF@c', 'int@1')
+    program.add('ADD', 'GF@acc', 'GF@acc', 'GF@c')
+    program.add('ADD', 'GF@i', 'GF@i', 'int@1')
+    program.add('LT', 'GF@c', 'GF@i', f'int@{iterations}')
+    program.add('JUMPIFEQ', 'label:loop', 'GF@c', 'bool@true')
+    program.add('WRITE', 'GF@acc')
+    return program.xml()
+
+# the same loop with the intermediate values on the data stack
+def stack_program(iterations):
+    program = Program_builder()
+    program.add('DEFVAR', 'GF@i').add('DEFVAR', 'GF@acc')
+    program.add('MOVE', 'GF@i', 'int@0').add('MOVE', 'GF@acc', 'int@0')
+    program.add('LABEL', 'label:loop')
+    program.add('PUSHS', 'GF@acc')
+    program.add('PUSHS', 'GF@i').add('PUSHS', 'int@3').add('MULS')
+    program.add('PUSHS', 'int@1').add('SUBS')
+    program.add('ADDS')
+    program.add('POPS', 'GF@acc')
+    program.add('PUSHS', 'GF@i').add('PUSHS', 'int@1').add('ADDS')
+    program.add('POPS', 'GF@i')
+    program.add('PUSHS', 'GF@i').add('PUSHS', f'int@{iterations}')
+    program.add('JUMPIFNEQS', 'label:loop')
+    program.add('WRITE', 'GF@acc')
+    return program.xml()
+
+### BENCHMARK ###
+
+def run(source, engine):
+    interpret.output_file = io.BytesIO()
+    interpret.data_stack.clear()
+    program, blocks = interpret.build_cfg(interpret.load_program(io.BytesIO(source.encode())))
+    start = time.perf_counter()
+    if engine == 'compiled':
+        compiled_engine.run_compiled(program, blocks)
+    else:
+        interpret.run_program(interpret.optimize_program(program, 1))
+    elapsed = time.perf_counter() - start
+    interpret.flush_output()
+    return elapsed, interpret.output_file.getvalue()
+
+if __name__ == '__main__':
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    frame_source = frame_program(iterations)
+    stack_source = stack_program(iterations)
+
+    print(f"{'engine':<12} {'frame form':>11} {'stack form':>11} {'speedup':>8}")
+    for engine in ('interpreted', 'compiled'):
+        frame_time, expected = run(frame_source, engine)
+        stack_time, output = run(stack_source, engine)
+        if output != expected:
+            sys.exit(f"{engine}: stack form writes {output!r}, frame form {expected!r}")
+        print(f"{engine:<12} {frame_time:>10.3f}s {stack_time:>10.3f}s {frame_time / stack_time:>7.2f}x")
@@ -0,0 +1,66 @@
+# Builds a string with CONCAT in a loop, replaces every 1000th character with
+# SETCHAR and writes it, with both engines.
+#
+# usage: python3 benchmarks/bench_string.py [megabytes] [chunk length]
+
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import interpret
+import compiled_engine
+from workloads import Program_builder
+
+### PROGRAM ###
+
+def string_program(size, chunk):
+    program = Program_builder()
+    program.add('DEFVAR', 'GF@s').add('DEFVAR', 'GF@n').add('DEFVAR', 'GF@c')
+    program.add('MOVE', 'GF@s', 'string@').add('MOVE', 'GF@n', 'int@0')
+    program.add('LABEL', 'label:append')
+    program.add('CONCAT', 'GF@s', 'GF@s', f'string@{chunk}')
+    program.add('ADD', 'GF@n', 'GF@n', f'int@{len(chunk)}')
+    program.add('LT', 'GF@c', 'GF@n', f'int@{size}')
+    program.add('JUMPIFEQ', 'label:append', 'GF@c', 'bool@true')
+    program.add('MOVE', 'GF@n', 'int@0')
+    program.add('LABEL', 'label:replace')
+    program.add('SETCHAR', 'GF@s', 'GF@n', 'string@#')
+    program.add('ADD', 'GF@n', 'GF@n', 'int@1000')
+    program.add('LT', 'GF@c', 'GF@n', f'int@{size}')
+    program.add('JUMPIFEQ', 'label:replace', 'GF@c', 'bool@true')
+    program.add('WRITE', 'GF@s')
+    return program.xml()
+
+def expected_output(size, chunk):
+    string = bytearray((chunk * (size // len(chunk) + 1))[:size].encode())
+    string[::1000] = b'#' * len(range(0, size, 1000))
+    return bytes(string)
+
+### BENCHMARK ###
+
+def run(source, engine):
+    interpret.output_file = io.BytesIO()
+    program, blocks = interpret.build_cfg(interpret.load_program(io.BytesIO(source.encode())))
+    start = time.perf_counter()
+    if engine == 'compiled':
+        compiled_engine.run_compiled(program, blocks)
+    else:
+        interpret.run_program(interpret.optimize_program(program, 1))
+    interpret.flush_output()
+    return time.perf_counter() - start, interpret.output_file.getvalue()
+
+if __name__ == '__main__':
+    megabytes = float(sys.argv[1]) if len(sys.argv) > 1 else 10
+    chunk = 'abcdefghij'[:int(sys.argv[2])] if len(sys.argv) > 2 else 'abcdefghij'
+    size = int(megabytes * 1000000) // len(chunk) * len(chunk)
+    source = string_program(size, chunk)
+    expected = expected_output(size, chunk)
+
+    print(f"{size} characters, {size // len(chunk)} CONCAT of {len(chunk)}, {len(range(0, size, 1000))} SETCHAR")
+    for engine in ('interpreted', 'compiled'):
+        elapsed, output = run(source, engine)
+        if output != expected:
+            sys.exit(f"{engine}: wrong output of {len(output)} bytes")
+        print(f"{engine:<12} {elapsed:8.3f}s {size / elapsed / 1e6:8.2f} MB/s")
@@ -0,0 +1,80 @@
+# Time to check a conformance corpus with --test against one interpret.py
+# process per test compared with its .out and .rc files, on the corpus of
+# bench_batch with the expected files written next to the programs.
+#
+# usage: python3 benchmarks/bench_test_runner.py [tests] [workers]
+
+import os
+import sys
+import json
+import time
+import shutil
+import tempfile
+import subprocess
+
+from bench_batch import write_corpus
+
+interpret_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'interpret.py')
+
+### CORPUS ###
+
+# the sum of 1..n and the exit code of short_program
+def write_expected(corpus_dir, tests):
+    for number in range(tests):
+        stem = os.path.join(corpus_dir, f"p{number:05}")
+        limit = number % 50 + 1
+        with open(stem + '.out', 'w') as output_file:
+            output_file.write(str(limit * (limit + 1) // 2))
+        with open(stem + '.rc', 'w') as code_file:
+            code_file.write(f"{number % 3}\n")
+
+### BENCHMARK ###
+
+# passed tests, the output is compared only when exit code 0 is expected
+def process_per_test(corpus_dir):
+    passed = 0
+    for name in sorted(os.listdir(corpus_dir)):
+        if name.endswith('.src'):
+            stem = os.path.join(corpus_dir, name[:-4])
+            process = subprocess.run([sys.executable, interpret_path, '--source', stem + '.src', '--input', stem + '.in'],
+                capture_output=True)
+            with open(stem + '.out', 'rb') as output_file, open(stem + '.rc') as code_file:
+                expected_code = int(code_file.read())
+                passed += process.returncode == expected_code and (expected_code != 0 or process.stdout == output_file.read())
+    return passed
+
+def test_runner(corpus_dir, workers, report_path):
+    arguments = [sys.executable, interpret_path, '--test', corpus_dir, '--report', report_path]
+    if workers:
+        arguments += ['--workers', str(workers)]
+    subprocess.run(arguments, capture_output=True)
+    with open(report_path) as report_file:
+        report = json.load(report_file)
+    return report["tests"] - report["failures"]
+
+if __name__ == '__main__':
+    tests = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    work_dir = tempfile.mkdtemp()
+    try:
+        corpus_dir = os.path.join(work_dir, 'corpus')
+        os.mkdir(corpus_dir)
+        write_corpus(corpus_dir, tests)
+        write_expected(corpus_dir, tests)
+
+        start = time.perf_counter()
+        expected = process_per_test(corpus_dir)
+        process_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        passed = test_runner(corpus_dir, workers, os.path.join(work_dir, 'report.json'))
+        runner_time = time.perf_counter() - start
+    finally:
+        shutil.rmtree(work_dir)
+
+    if passed != expected or passed != tests:
+        sys.exit(f"passed tests: {passed} with --test, {expected} with separate processes, of {tests}")
+    print(f"tests:             {tests}")
+    print(f"process per test:  {tests / process_time:10.1f} tests/s ({process_time:.3f} s)")
+    print(f"--test:            {tests / runner_time:10.1f} tests/s ({runner_time:.3f} s)")
+    print(f"speedup:           {process_time / runner_time:10.2f}x")
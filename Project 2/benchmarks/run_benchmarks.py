@@ -0,0 +1,228 @@
+# Runs the generated workloads through interpret.py and reports
+# instructions per second, run time and peak RSS of every workload,
+# compared against a stored JSON baseline or a reference tree.
+#
+# usage: python3 benchmarks/run_benchmarks.py [--runs N] [--scale F]
+#            [--rounds N] [--baseline FILE] [--reference DIR] [--threshold F]
+#            [--save] [workload ...]
+#
+# The executed instruction count comes from one --profile run. Every
+# workload is timed in fresh processes that load the program once and
+# time Interpreter.run, so interpreter startup is not measured, the best
+# run of all rounds is reported with the peak RSS of the processes. Exits with 1 when a
+# workload is slower than the baseline by more than the threshold, or when
+# its instruction count no longer matches the baseline.
+#
+# The best runs of one host drift by 20-25% between sessions, so a stored
+# baseline only catches slowdowns over the default threshold of 30%.
+# --reference DIR times the interpret.py of another tree, for example a
+# git worktree of the base commit, next to this one in every round and
+# compares the median ratio of the rounds. A tree against its own copy
+# stays within 15% with --rounds 5, so --threshold 0.15 fits it there.
+
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+from workloads import workloads
+
+benchmarks_dir = os.path.dirname(os.path.abspath(__file__))
+interpret_dir = os.path.join(benchmarks_dir, '..')
+interpret_path = os.path.join(interpret_dir, 'interpret.py')
+baseline_path = os.path.join(benchmarks_dir, 'baseline.json')
+
+### RUNNING ###
+
+def executed_instructions(source, input_path, work_dir):
+    profile_path = os.path.join(work_dir, 'profile.json')
+    subprocess.run([sys.executable, interpret_path, '--source', source, '--input', input_path,
+        '--output', os.devnull, '--profile', profile_path], check=True)
+    with open(profile_path) as profile_file:
+        return json.load(profile_file)["instructions"]
+
+# best run time in seconds of the program, run in this process by the
+# interpret.py of directory
+def measure(source, input_path, directory, runs):
+    sys.path.insert(0, directory)
+    import interpret
+    with open(source, 'rb') as source_file, open(input_path, 'rb') as input_file:
+        interpreter = interpret.Interpreter.load(source_file.read())
+        input_data = input_file.read()
+    run_time = None
+    with open(os.devnull, 'wb') as output:
+        for _ in range(runs):
+            start = time.perf_counter()
+            exit_code = interpreter.run(input_data, output)
+            elapsed = time.perf_counter() - start
+            if exit_code != 0:
+                sys.exit(f"{source}: exit code {exit_code}")
+            run_time = elapsed if run_time is None else min(run_time, elapsed)
+    return run_time
+
+# best run time in seconds and peak RSS in kB of a fresh process running measure
+def timed_runs(source, input_path, runs, directory=interpret_dir):
+    arguments = [sys.executable, os.path.abspath(__file__), '--measure', source, input_path, directory, '--runs', str(runs)]
+    process = subprocess.Popen(arguments, stdout=subprocess.PIPE)
+    output = process.stdout.read()
+    _, status, usage = os.wait4(process.pid, 0)
+    process.stdout.close()
+    exit_code = os.waitstatus_to_exitcode(status)
+    if exit_code != 0:
+        sys.exit(f"{source}: measuring process exited with {exit_code}")
+    return float(output), usage.ru_maxrss
+
+# source and input files of the workload
+def write_workload(name, scale, work_dir):
+    source_text, input_text = workloads[name](scale)
+    source = os.path.join(work_dir, f"{name}.xml")
+    input_path = os.path.join(work_dir, f"{name}.in")
+    with open(source, 'w') as source_file:
+        source_file.write(source_text)
+    with open(input_path, 'w') as input_file:
+        input_file.write(input_text)
+    return source, input_path
+
+# the host slows down in bursts of seconds, so every round times each
+# workload once in turn and a workload keeps its best round, the reference
+# tree runs next to this one, first in every other round,
+# (results, ratios of the run time to the reference run time of every round)
+def run_workloads(names, scale, runs, rounds, work_dir, reference=None):
+    files = {name: write_workload(name, scale, work_dir) for name in names}
+    instructions = {name: executed_instructions(*files[name], work_dir) for name in names}
+    run_times = {}
+    reference_ratios = {name: [] for name in names}
+    peak_rss = dict.fromkeys(names, 0)
+    for round_number in range(rounds):
+        for name in names:
+            if reference is not None and round_number % 2:
+                reference_time, _ = timed_runs(*files[name], runs, reference)
+            run_time, rss = timed_runs(*files[name], runs)
+            run_times[name] = min(run_times.get(name, run_time), run_time)
+            peak_rss[name] = max(peak_rss[name], rss)
+            if reference is not None:
+                if not round_number % 2:
+                    reference_time, _ = timed_runs(*files[name], runs, reference)
+                reference_ratios[name].append(run_time / reference_time)
+    return {name: {
+        "instructions": instructions[name],
+        "instructions_per_second": instructions[name] / run_times[name],
+        "run_time": run_times[name],
+        "peak_rss_kb": peak_rss[name],
+    } for name in names}, reference_ratios
+
+### REPORT ###
+
+def load_baseline(path):
+    if not os.path.exists(path):
+        return None
+    with open(path) as baseline_file:
+        return json.load(baseline_file)
+
+# slowdown against the baseline, positive when slower
+def regression(result, baseline_result):
+    return baseline_result["instructions_per_second"] / result["instructions_per_second"] - 1
+
+# regressed workloads and workloads whose instruction count differs from the baseline
+def print_report(results, baseline, threshold):
+    regressions = []
+    mismatches = []
+    print(f"{'workload':<10} {'instructions':>12} {'instr/s':>12} {'run':>8} {'peak RSS':>10} {'baseline':>12} {'change':>8}")
+    for name, result in results.items():
+        line = result_line(name, result)
+        baseline_result = baseline["workloads"].get(name) if baseline else None
+        if baseline_result is None:
+            print(f"{line} {'-':>12} {'-':>8}")
+            continue
+        if baseline_result["instructions"] != result["instructions"]:
+            # another program than the baseline measured, its speed does not compare
+            print(f"{line} {baseline_result['instructions']:>12} instructions")
+            mismatches.append(name)
+            continue
+        slowdown = regression(result, baseline_result)
+        flag = " REGRESSION" if slowdown > threshold else ""
+        print(f"{line} {baseline_result['instructions_per_second']:>12.0f} {-slowdown:>+7.1%}{flag}")
+        if flag:
+            regressions.append(name)
+    return regressions, mismatches
+
+def result_line(name, result):
+    return (f"{name:<10} {result['instructions']:>12} {result['instructions_per_second']:>12.0f}"
+        f" {result['run_time']:>7.3f}s {result['peak_rss_kb'] / 1024:>8.1f}MB")
+
+# regressed workloads against the reference tree, a slowdown is the median
+# of the rounds, a burst slows both runs of its round and not the ratio
+def print_reference_report(results, reference_ratios, threshold):
+    regressions = []
+    print(f"{'workload':<10} {'instructions':>12} {'instr/s':>12} {'run':>8} {'peak RSS':>10} {'change':>8} {'rounds':>16}")
+    for name, result in results.items():
+        slowdown = statistics.median(reference_ratios[name]) - 1
+        spread = f"{1 - max(reference_ratios[name]):+.0%}..{1 - min(reference_ratios[name]):+.0%}"
+        flag = " REGRESSION" if slowdown > threshold else ""
+        print(f"{result_line(name, result)} {-slowdown:>+7.1%} {spread:>16}{flag}")
+        if flag:
+            regressions.append(name)
+    return regressions
+
+if __name__ == '__main__':
+    argument_parser = argparse.ArgumentParser()
+    argument_parser.add_argument('names', metavar='workload', nargs='*', help='Workloads to run, all by default?')
+    argument_parser.add_argument('--runs', metavar='n', type=int, default=5, help='Timed runs per workload and round?')
+    argument_parser.add_argument('--rounds', metavar='n', type=int, default=3, help='Rounds over all workloads, each in fresh processes, the best run is reported?')
+    argument_parser.add_argument('--scale', metavar='f', type=float, default=1.0, help='Size factor of the generated workloads?')
+    argument_parser.add_argument('--baseline', metavar='file', default=baseline_path, help='Stored baseline to compare against?')
+    argument_parser.add_argument('--reference', metavar='dir', help='Tree of interpret.py timed in the same rounds and compared against instead of the baseline?')
+    argument_parser.add_argument('--threshold', metavar='f', type=float, default=0.30, help='Allowed slowdown against the baseline or reference?')
+    argument_parser.add_argument('--save', action='store_true', help='Store the results as the new baseline?')
+    argument_parser.add_argument('--measure', metavar='file', nargs=3, help=argparse.SUPPRESS)
+    program_args = argument_parser.parse_args()
+
+    # child of timed_runs : source, input and interpret.py directory, prints the best run time
+    if program_args.measure:
+        print(measure(*program_args.measure, program_args.runs))
+        exit(0)
+    for name in program_args.names:
+        if name not in workloads:
+            argument_parser.error(f"unknown workload {name}, choose from {', '.join(workloads)}")
+    reference = program_args.reference
+    if reference is not None:
+        if not os.path.isfile(os.path.join(reference, 'interpret.py')):
+            argument_parser.error(f"Reference: {reference} has no interpret.py")
+        if program_args.save:
+            argument_parser.error('--save stores a baseline, not a comparison with --reference')
+        reference = os.path.abspath(reference)
+
+    work_dir = tempfile.mkdtemp()
+    try:
+        results, reference_ratios = run_workloads(program_args.names or list(workloads), program_args.scale, program_args.runs,
+            program_args.rounds, work_dir, reference)
+    finally:
+        shutil.rmtree(work_dir)
+
+    if reference is not None:
+        regressions = print_reference_report(results, reference_ratios, program_args.threshold)
+        if regressions:
+            print(f"regressions over {program_args.threshold:.0%}: {', '.join(regressions)}", file=sys.stderr)
+            exit(1)
+        exit(0)
+
+    baseline = load_baseline(program_args.baseline)
+    regressions, mismatches = print_report(results, baseline, program_args.threshold)
+
+    if program_args.save:
+        with open(program_args.baseline, 'w') as baseline_file:
+            json.dump({"python": platform.python_version(), "scale": program_args.scale, "workloads": results}, baseline_file, indent=1)
+            baseline_file.write('\n')
+        print(f"baseline stored in {program_args.baseline}")
+    elif mismatches:
+        print(f"instruction counts differ from the baseline: {', '.join(mismatches)}, store a new one with --save", file=sys.stderr)
+        exit(1)
+    elif regressions:
+        print(f"regressions over {program_args.threshold:.0%}: {', '.join(regressions)}", file=sys.stderr)
+        exit(1)
@@ -0,0 +1,147 @@
+# Generated IPPcode23 workloads of the benchmark suite, every generator
+# returns the XML source and the input of the program.
+
+from xml.sax.saxutils import escape
+
+### PROGRAM BUILDER ###
+
+class Program_builder:
+    def __init__(self):
+        self.lines = ['<?xml version="1.0" encoding="UTF-8"?>', '<program language="IPPcode23">']
+        self.order = 0
+
+    # arguments as "GF@x", "int@1", "label:loop" or "type:int"
+    def add(self, opcode, *arguments):
+        self.order += 1
+        args = []
+        for number, argument in enumerate(arguments, 1):
+            if argument.startswith('label:') or argument.startswith('type:'):
+                arg_type, _, value = argument.partition(':')
+            elif argument[:3] in ('GF@', 'LF@', 'TF@'):
+                arg_type, value = 'var', argument
+            else:
+                arg_type, _, value = argument.partition('@')
+            args.append(f'<arg{number} type="{arg_type}">{escape(value)}</arg{number}>')
+        self.lines.append(f' <instruction order="{self.order}" opcode="{opcode}">{"".join(args)}</instruction>')
+        return self
+
+    def xml(self):
+        return '\n'.join(self.lines + ['</program>']) + '\n'
+
+### WORKLOADS ###
+
+# tight integer loop
+def int_loop(scale):
+    iterations = int(200000 * scale)
+    program = Program_builder()
+    program.add('DEFVAR', 'GF@i').add('DEFVAR', 'GF@acc').add('DEFVAR', 'GF@c')
+    program.add('MOVE', 'GF@i', 'int@0').add('MOVE', 'GF@acc', 'int@0')
+    program.add('LABEL', 'label:loop')
+    program.add('MUL', 'GF@c', 'GF@i', 'int@3')
+    program.add('SUB', 'GF@c', 'GF@c', 'int@1')
+    program.add('ADD', 'GF@acc', 'GF@acc', 'GF@c')
+    program.add('ADD', 'GF@i', 'GF@i', 'int@1')
+    program.add('LT', 'GF@c', 'GF@i', f'int@{iterations}')
+    program.add('JUMPIFEQ', 'label:loop', 'GF@c', 'bool@true')
+    program.add('WRITE', 'GF@acc')
+    return program.xml(), ''
+
+# recursion through CALL/RETURN, repeated from the top, the ADD after the
+# recursive CALL keeps it from being run as a tail call
+def recursion(scale):
+    depth = 2000
+    repeats = max(1, int(40 * scale))
+    program = Program_builder()
+    program.add('DEFVAR', 'GF@n').add('DEFVAR', 'GF@r').add('DEFVAR', 'GF@k')
+    program.add('MOVE', 'GF@k', 'int@0')
+    program.add('LABEL', 'label:again')
+    program.add('MOVE', 'GF@n', f'int@{depth}')
+    program.add('MOVE', 'GF@r', 'int@0')
+    program.add('CALL', 'label:sum')
+    program.add('ADD', 'GF@k', 'GF@k', 'int@1')
+    program.add('JUMPIFNEQ', 'label:again', 'GF@k', f'int@{repeats}')
+    program.add('WRITE', 'GF@r')
+    program.add('EXIT', 'int@0')
+    program.add('LABEL', 'label:sum')
+    program.add('JUMPIFEQ', 'label:sum_end', 'GF@n', 'int@0')
+    program.add('ADD', 'GF@r', 'GF@r', 'GF@n')
+    program.add('SUB', 'GF@n', 'GF@n', 'int@1')
+    program.add('CALL', 'label:sum')
+    program.add('ADD', 'GF@r', 'GF@r', 'int@1')
+    program.add('LABEL', 'label:sum_end')
+    program.add('RETURN')
+    return program.xml(), ''
+
+# string built by CONCAT one piece at a time
+def concat(scale):
+    iterations = int(100000 * scale)
+    program = Program_builder()
+    program.add('DEFVAR', 'GF@s').add('DEFVAR', 'GF@i').add('DEFVAR', 'GF@n')
+    program.add('MOVE', 'GF@s', 'string@').add('MOVE', 'GF@i', 'int@0')
+    program.add('LABEL', 'label:loop')
+    program.add('CONCAT', 'GF@s', 'GF@s', 'string@ab')
+    program.add('ADD', 'GF@i', 'GF@i', 'int@1')
+    program.add('JUMPIFNEQ', 'label:loop', 'GF@i', f'int@{iterations}')
+    program.add('STRLEN', 'GF@n', 'GF@s')
+    program.add('WRITE', 'GF@n')
+    return program.xml(), ''
+
+# data stack filled and drained
+def stack(scale):
+    iterations = int(20000 * scale)
+    program = Program_builder()
+    program.add('DEFVAR', 'GF@i').add('DEFVAR', 'GF@a').add('DEFVAR', 'GF@b')
+    program.add('MOVE', 'GF@i', 'int@0')
+    program.add('LABEL', 'label:loop')
+    for value in range(4):
+        program.add('PUSHS', f'int@{value}')
+    program.add('PUSHS', 'GF@i')
+    program.add('POPS', 'GF@a')
+    for _ in range(4):
+        program.add('POPS', 'GF@b')
+    program.add('ADD', 'GF@i', 'GF@i', 'int@1')
+    program.add('JUMPIFNEQ', 'label:loop', 'GF@i', f'int@{iterations}')
+    program.add('WRITE', 'GF@a')
+    return program.xml(), ''
+
+# temporary frames created, pushed and popped
+def frames(scale):
+    iterations = int(40000 * scale)
+    program = Program_builder()
+    program.add('DEFVAR', 'GF@i')
+    program.add('MOVE', 'GF@i', 'int@0')
+    program.add('LABEL', 'label:loop')
+    program.add('CREATEFRAME')
+    program.add('DEFVAR', 'TF@x')
+    program.add('MOVE', 'TF@x', 'GF@i')
+    program.add('PUSHFRAME')
+    program.add('ADD', 'LF@x', 'LF@x', 'int@1')
+    program.add('POPFRAME')
+    program.add('MOVE', 'GF@i', 'TF@x')
+    program.add('JUMPIFNEQ', 'label:loop', 'GF@i', f'int@{iterations}')
+    program.add('WRITE', 'GF@i')
+    return program.xml(), ''
+
+# every input line read and written back
+def io(scale):
+    lines = int(50000 * scale)
+    program = Program_builder()
+    program.add('DEFVAR', 'GF@line')
+    program.add('LABEL', 'label:loop')
+    program.add('READ', 'GF@line', 'type:string')
+    program.add('JUMPIFEQ', 'label:end', 'GF@line', 'nil@nil')
+    program.add('WRITE', 'GF@line')
+    program.add('WRITE', 'string@\\010')
+    program.add('JUMP', 'label:loop')
+    program.add('LABEL', 'label:end')
+    return program.xml(), ''.join(f"line {number}\n" for number in range(lines))
+
+# name : generator
+workloads = {
+    "int_loop": int_loop,
+    "recursion": recursion,
+    "concat": concat,
+    "stack": stack,
+    "frames": frames,
+    "io": io,
+}
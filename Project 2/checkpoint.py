@@ -0,0 +1,216 @@
+# Author: Baturov Illia (xbatur00)
+#
+# --checkpoint and --resume of interpret.py: snapshots of the interpreter
+# state taken by run_program_limited and restored before it continues.
+# Imported by interpret.py only when one of the options is given.
+
+import os
+import sys
+import stat
+import struct
+import hashlib
+
+import interpret
+from interpret import exit, nil, undefined, uninitialized, flush_output
+from interpret import ipp_global_frame, ipp_local_frames_stack, data_stack, output_buffer
+from program_cache import interpreter_fingerprint, cache_u8, cache_u32, cache_i64
+from program_cache import cache_kind_nil, cache_kind_true, cache_kind_false, cache_kind_int, cache_kind_big_int, cache_kind_string
+
+### CHECKPOINT ###
+
+# --checkpoint file, written every --checkpoint-every steps by run_program_limited
+#   header  b'IPPK', format, fingerprint, instruction_order, steps, input and
+#           output position, global slots, local frames, temporary frame
+#           defined, data stack length, call depth
+#   values  global frame, local frames from the bottom, temporary frame when
+#           defined, data stack, each as u8 kind and the payload of the kind,
+#           a local or temporary frame is u32 variable count and u32 slot
+#           before the value of every variable
+#   calls   u32 return index per call
+# the state is taken at a chunk boundary and written by a forked child, the
+# file is written aside and renamed, so a crash leaves the previous checkpoint
+checkpoint_magic = b'IPPK'
+checkpoint_format = 2
+checkpoint_header = struct.Struct('<4sI32sQQQQIIBII')
+checkpoint_kind_undefined = 10
+checkpoint_kind_uninitialized = 11
+
+checkpoint_child = None # pid of the child writing the last checkpoint
+
+# interpreter and decoded program, a checkpoint resumes only the program it was taken of
+def program_fingerprint(program):
+    # the handler names tell superinstructions of other opt levels apart
+    listing = repr([(instruction.order, instruction.opcode, instruction.handler.__name__,
+        [(argument.type, argument.value) for argument in instruction.arguments]) for instruction in program])
+    return hashlib.sha256(interpreter_fingerprint() + listing.encode('utf-8', 'surrogatepass')).digest()
+
+def encode_checkpoint_value(data, value):
+    value_type = type(value)
+    if value is undefined:
+        data += cache_u8.pack(checkpoint_kind_undefined)
+    elif value is uninitialized:
+        data += cache_u8.pack(checkpoint_kind_uninitialized)
+    elif value is nil:
+        data += cache_u8.pack(cache_kind_nil)
+    elif value_type is bool:
+        data += cache_u8.pack(cache_kind_true if value else cache_kind_false)
+    elif value_type is int and -2**63 <= value < 2**63:
+        data += cache_u8.pack(cache_kind_int) + cache_i64.pack(value)
+    else:
+        # IPP_string is written flat
+        kind = cache_kind_big_int if value_type is int else cache_kind_string
+        encoded = str(value).encode('utf-8', 'surrogatepass')
+        data += cache_u8.pack(kind) + cache_u32.pack(len(encoded)) + encoded
+
+def decode_checkpoint_value(data, position):
+    kind = data[position]
+    position += 1
+    if kind == checkpoint_kind_undefined:
+        return undefined, position
+    elif kind == checkpoint_kind_uninitialized:
+        return uninitialized, position
+    elif kind == cache_kind_nil:
+        return nil, position
+    elif kind == cache_kind_true:
+        return True, position
+    elif kind == cache_kind_false:
+        return False, position
+    elif kind == cache_kind_int:
+        return cache_i64.unpack_from(data, position)[0], position + 8
+    (length,) = cache_u32.unpack_from(data, position)
+    position += 4
+    text = str(data[position:position + length], 'utf-8', 'surrogatepass')
+    return (int(text) if kind == cache_kind_big_int else text), position + length
+
+def encode_checkpoint(fingerprint, steps):
+    temporary_frame_is_defined = interpret.temporary_frame_is_defined
+    call_depth = interpret.call_depth
+    frames = ipp_local_frames_stack + ([interpret.ipp_temporary_frame] if temporary_frame_is_defined else [])
+    data = bytearray(checkpoint_header.pack(checkpoint_magic, checkpoint_format, fingerprint,
+        interpret.instruction_order, steps, interpret.input_position, interpret.output_flushed + len(output_buffer),
+        len(ipp_global_frame), len(ipp_local_frames_stack), temporary_frame_is_defined, len(data_stack), call_depth))
+    for value in ipp_global_frame:
+        encode_checkpoint_value(data, value)
+    for slots in frames:
+        data += cache_u32.pack(len(slots))
+        for slot, value in slots.items():
+            data += cache_u32.pack(slot)
+            encode_checkpoint_value(data, value)
+    for value in data_stack:
+        encode_checkpoint_value(data, value)
+    data += struct.pack(f'<{call_depth}I', *interpret.ipp_calls[:call_depth])
+    return data
+
+# state of a checkpoint file, None when it is not one of this program
+def read_checkpoint(path, fingerprint):
+    with open(path, 'rb') as checkpoint_file:
+        data = checkpoint_file.read()
+    try:
+        (magic, file_format, file_fingerprint, order, steps, input_at, output_at, global_count,
+            local_frame_count, temporary_defined, stack_length, depth) = checkpoint_header.unpack_from(data, 0)
+        if magic != checkpoint_magic or file_format != checkpoint_format or file_fingerprint != fingerprint:
+            return None
+        position = checkpoint_header.size
+        global_values = []
+        for _ in range(global_count):
+            value, position = decode_checkpoint_value(data, position)
+            global_values.append(value)
+        frames = []
+        for _ in range(local_frame_count + temporary_defined):
+            slots = {}
+            (count,) = cache_u32.unpack_from(data, position)
+            position += 4
+            for _ in range(count):
+                (slot,) = cache_u32.unpack_from(data, position)
+                slots[slot], position = decode_checkpoint_value(data, position + 4)
+            frames.append(slots)
+        stack = []
+        for _ in range(stack_length):
+            value, position = decode_checkpoint_value(data, position)
+            stack.append(value)
+        calls = list(struct.unpack_from(f'<{depth}I', data, position))
+    except (struct.error, IndexError, ValueError, UnicodeDecodeError):
+        return None
+    temporary = frames.pop() if temporary_defined else None
+    return {"order": order, "steps": steps, "input": input_at, "output": output_at,
+        "global": global_values, "locals": frames, "temporary": temporary, "stack": stack, "calls": calls}
+
+# frames, stacks and position of a read checkpoint, after reset_frames
+def restore_checkpoint(state):
+    if len(state["global"]) != len(ipp_global_frame):
+        exit(99)
+    interpret.instruction_order = state["order"]
+    ipp_global_frame[:] = state["global"]
+    ipp_local_frames_stack[:] = state["locals"]
+    interpret.ipp_local_frame = ipp_local_frames_stack[-1] if ipp_local_frames_stack else None
+    if state["temporary"] is not None:
+        interpret.ipp_temporary_frame = state["temporary"]
+        interpret.temporary_frame_is_defined = True
+    data_stack[:] = state["stack"]
+    call_depth = len(state["calls"])
+    interpret.call_depth = call_depth
+    interpret.ipp_calls[:call_depth] = state["calls"]
+
+# input read before the checkpoint is skipped
+def skip_input(position):
+    if interpret.input_reader is None:
+        sys.stdin.buffer.read(position)
+    else:
+        interpret.input_reader.seek(position)
+    interpret.input_position = position
+
+def write_checkpoint_file(data):
+    checkpoint_path = interpret.checkpoint_path
+    temporary_path = f"{checkpoint_path}.{os.getpid()}.tmp"
+    try:
+        with open(temporary_path, 'wb') as checkpoint_file:
+            checkpoint_file.write(data)
+            checkpoint_file.flush()
+            os.fsync(checkpoint_file.fileno())
+        os.replace(temporary_path, checkpoint_path)
+    except OSError:
+        # the previous checkpoint stays, the partial one is removed
+        if os.path.isfile(temporary_path):
+            os.unlink(temporary_path)
+        raise
+
+# the run goes on without the checkpoint
+def checkpoint_failed(reason):
+    print(f"Checkpoint: {interpret.checkpoint_path} not written, {reason}", file=sys.stderr)
+
+# waits for the child writing the previous checkpoint, a child exiting with 1
+# has reported its failure
+def finish_checkpoint():
+    global checkpoint_child
+    if checkpoint_child is not None:
+        _, status = os.waitpid(checkpoint_child, 0)
+        checkpoint_child = None
+        if os.waitstatus_to_exitcode(status) not in (0, 1):
+            checkpoint_failed(f"writer ended with status {os.waitstatus_to_exitcode(status)}")
+
+# snapshot of the state, the output it refers to is written out first
+def write_checkpoint(fingerprint, steps):
+    global checkpoint_child
+    flush_output()
+    finish_checkpoint()
+    if not hasattr(os, 'fork'):
+        try:
+            write_checkpoint_file(encode_checkpoint(fingerprint, steps))
+        except OSError as error:
+            checkpoint_failed(error)
+        return
+    pid = os.fork()
+    if pid:
+        checkpoint_child = pid
+        return
+    # child: a copy of the state at the fork, ends without cleanup
+    try:
+        # a pipe or terminal cannot be synced
+        if interpret.output_file is not None and stat.S_ISREG(os.fstat(interpret.output_file.fileno()).st_mode):
+            os.fsync(interpret.output_file.fileno())
+        write_checkpoint_file(encode_checkpoint(fingerprint, steps))
+        os._exit(0)
+    except BaseException as error:
+        checkpoint_failed(error)
+        sys.stderr.flush()
+        os._exit(1)
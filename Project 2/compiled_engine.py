@@ -0,0 +1,488 @@
+# Author: Baturov Illia (xbatur00)
+#
+# --engine=compiled of interpret.py. Imported by interpret.py only when the
+# engine is chosen.
+
+import interpret
+from interpret import IPP_nil, nil, jump_opcodes
+from interpret import handle_case_tail_call, same_variable, reset_frames, ipp_global_frame, ipp_local_frames_stack
+
+### COMPILED ENGINE ###
+
+# --engine=compiled: every basic block of the linked program becomes a Python
+# function, generated as source and built by compile(), that returns the index
+# of the next block; a block jumping back to its own start loops inside its
+# function. Operands are read and checked in the order of the handle_case_*
+# handlers so errors keep their exit codes, opcodes without a compile_case_*
+# template call their handler. Values pushed inside a block stay in Python
+# locals until the block ends or a handler may look at the data stack.
+
+# python name of a value type in the generated source
+compiled_type_names = {int: "int", bool: "bool", str: "str", IPP_nil: "IPP_nil"}
+
+class IPP_block_compiler:
+    def __init__(self, program, block):
+        self.program = program
+        self.block = block
+        self.lines = []
+        self.depth = 0
+        # frames read since the last frame change, their check is done
+        self.frames = set()
+        self.globals = set()
+        # set by a type error known at compile time, the rest never runs
+        self.dead = False
+        # values pushed but not yet on data_stack, as (expression, known type)
+        self.stack = []
+        self.temporaries = 0
+        last = program[block.end - 1]
+        self.self_loop = last.opcode in jump_opcodes and last.opcode != "CALL" and last.target == block.start
+
+    def emit(self, line):
+        if not self.dead:
+            self.lines.append("    " * self.depth + line)
+
+    # G, L or T, missing local and temporary frames exit on first use
+    def frame(self, frame):
+        if frame == 'GF':
+            return 'G'
+        if frame not in self.frames:
+            self.frames.add(frame)
+            if frame == 'LF':
+                self.emit("L = ipp_local_frame")
+                self.emit("if L is None: exit(55)")
+            else:
+                self.emit("if not temporary_frame_is_defined: exit(55)")
+                self.emit("T = ipp_temporary_frame")
+        return 'L' if frame == 'LF' else 'T'
+
+    # (expression, type known at compile time or None)
+    def symbol(self, argument, name):
+        if argument.frame is None:
+            value = argument.value
+            return ("nil" if value is nil else repr(value)), type(value)
+        self.read(argument, name)
+        self.emit(f"if type({name}) in special_types: {name} = special_value({name})")
+        return name, None
+
+    # string operand of STRLEN, GETCHAR and CONCAT, an IPP_string is kept
+    def string_symbol(self, argument, name):
+        if argument.frame is None:
+            return self.symbol(argument, name)
+        self.read(argument, name)
+        self.emit(f"if {name} is undefined or {name} is uninitialized: special_value({name})")
+        return name, None
+
+    # a local or temporary frame has no slot of a variable without DEFVAR
+    def read(self, variable, name):
+        frame = self.frame(variable.frame)
+        if frame == 'G':
+            self.emit(f"{name} = G[{variable.slot}]")
+        else:
+            self.emit(f"try: {name} = {frame}[{variable.slot}]")
+            self.emit("except KeyError: exit(54)")
+
+    def assign(self, variable, expression):
+        frame = self.frame(variable.frame)
+        if frame == 'G':
+            self.emit(f"if G[{variable.slot}] is undefined: exit(54)")
+        else:
+            self.emit(f"if {variable.slot} not in {frame}: exit(54)")
+        self.emit(f"{frame}[{variable.slot}] = {expression}")
+
+    # exit 53 when any condition holds, True is known to hold, None never does
+    def type_error(self, *conditions):
+        if True in conditions:
+            self.emit("exit(53)")
+            self.dead = True
+            return
+        conditions = [condition for condition in conditions if condition is not None]
+        if conditions:
+            self.emit(f"if {' or '.join(conditions)}: exit(53)")
+
+    def temporary(self):
+        self.temporaries += 1
+        return f"s{self.temporaries}"
+
+    # pushed values to data_stack
+    def flush(self):
+        if len(self.stack) == 1:
+            self.emit(f"data_stack.append({self.stack[0][0]})")
+        elif self.stack:
+            self.emit(f"data_stack.extend(({', '.join(expression for expression, _ in self.stack)}))")
+        self.stack.clear()
+
+    # result of a stack instruction
+    def push(self, expression, known):
+        name = self.temporary()
+        self.emit(f"{name} = {expression}")
+        self.stack.append((name, known))
+
+    # top count values, from the pushed ones when there are enough
+    def pop(self, count):
+        if len(self.stack) >= count:
+            operands = self.stack[-count:]
+            del self.stack[-count:]
+            return operands
+        self.flush()
+        if count == 1:
+            self.emit("if not data_stack: exit(56)")
+            self.emit("a = data_stack.pop()")
+            return [("a", None)]
+        self.emit("if len(data_stack) < 2: exit(56)")
+        self.emit("b = data_stack.pop()")
+        self.emit("a = data_stack.pop()")
+        return [("a", None), ("b", None)]
+
+    def jump(self, target, condition=None):
+        self.flush()
+        action = "continue" if self.self_loop and target == self.block.start else f"return {target}"
+        self.emit(f"if {condition}: {action}" if condition else action)
+
+    def compile(self):
+        start = self.block.start
+        self.emit(f"def block_{start}(P=P, G=G, LFS=LFS):")
+        self.depth += 1
+        body = len(self.lines)
+        if self.self_loop:
+            self.emit("while True:")
+            self.depth += 1
+        for index in range(start, self.block.end):
+            instruction = self.program[index]
+            compiler = ipp_compilers.get(instruction.opcode)
+            if compiler is not None:
+                compiler(self, index, instruction)
+            else:
+                compile_handler_call(self, index, instruction)
+        self.flush()
+        self.emit(f"return {self.block.end}")
+        if self.globals:
+            self.lines.insert(body, "    " * (self.depth - self.self_loop) + f"global {', '.join(sorted(self.globals))}")
+        return self.lines
+
+# type check of an operand: None when known to pass, True when known to fail
+def type_condition(expression, known, required):
+    if known is not None:
+        return None if known is required else True
+    return f"type({expression}) is not {compiled_type_names[required]}"
+
+# type check of a string operand that may be an IPP_string
+def string_condition(expression, known):
+    if known is not None:
+        return None if known is str else True
+    return f"type({expression}) not in string_types"
+
+# same type, not nil: LT, GT, LTS and GTS
+def relation_condition(symb1, type1, symb2, type2):
+    if type1 is IPP_nil or type2 is IPP_nil:
+        return True
+    elif type1 is not None and type2 is not None:
+        return None if type1 is type2 else True
+    elif type1 is not None:
+        return type_condition(symb2, None, type1)
+    elif type2 is not None:
+        return type_condition(symb1, None, type2)
+    return f"type({symb1}) is not type({symb2}) or {symb1} is nil"
+
+# check_comparable: EQ, JUMPIFEQ, JUMPIFNEQ and their stack forms
+def comparable_condition(symb1, type1, symb2, type2):
+    if type1 is IPP_nil or type2 is IPP_nil:
+        return None
+    elif type1 is not None and type2 is not None:
+        return None if type1 is type2 else True
+    elif type1 is not None:
+        return f"type({symb2}) is not {compiled_type_names[type1]} and {symb2} is not nil"
+    elif type2 is not None:
+        return f"type({symb1}) is not {compiled_type_names[type2]} and {symb1} is not nil"
+    return f"type({symb1}) is not type({symb2}) and {symb1} is not nil and {symb2} is not nil"
+
+# handler of the instruction, frames and the data stack may change
+def compile_handler_call(compiler, index, instruction):
+    compiler.flush()
+    if instruction.opcode == 'BREAK':
+        compiler.globals.add('instruction_order')
+        compiler.emit(f"instruction_order = {index + 1}")
+    compiler.emit(f"P[{index}].handler(P[{index}])")
+    compiler.frames.clear()
+
+# case move (var) (symb)
+def compile_case_move(compiler, index, instruction):
+    symb1, _ = compiler.symbol(instruction.arguments[1], 'a')
+    compiler.assign(instruction.arguments[0], symb1)
+
+# case defvar (var)
+def compile_case_defvar(compiler, index, instruction):
+    var1 = instruction.arguments[0]
+    frame = compiler.frame(var1.frame)
+    if frame == 'G':
+        compiler.emit(f"if G[{var1.slot}] is not undefined: exit(52)")
+    else:
+        compiler.emit(f"if {var1.slot} in {frame}: exit(52)")
+    compiler.emit(f"{frame}[{var1.slot}] = uninitialized")
+
+# case createframe
+def compile_case_createframe(compiler, index, instruction):
+    compiler.globals.update(('ipp_temporary_frame', 'temporary_frame_is_defined'))
+    compiler.emit("ipp_temporary_frame = {}")
+    compiler.emit("temporary_frame_is_defined = True")
+    compiler.frames.discard('TF')
+
+# case pushframe
+def compile_case_pushframe(compiler, index, instruction):
+    compiler.globals.update(('ipp_local_frame', 'temporary_frame_is_defined'))
+    compiler.emit("if not temporary_frame_is_defined: exit(55)")
+    compiler.emit("ipp_local_frame = ipp_temporary_frame")
+    compiler.emit("LFS.append(ipp_local_frame)")
+    compiler.emit("temporary_frame_is_defined = False")
+    compiler.frames.clear()
+
+# case popframe
+def compile_case_popframe(compiler, index, instruction):
+    compiler.globals.update(('ipp_temporary_frame', 'temporary_frame_is_defined', 'ipp_local_frame'))
+    compiler.emit("if ipp_local_frame is None: exit(55)")
+    compiler.emit("ipp_temporary_frame = LFS.pop()")
+    compiler.emit("ipp_local_frame = LFS[-1] if LFS else None")
+    compiler.emit("temporary_frame_is_defined = True")
+    compiler.frames.clear()
+
+# case call (label)
+def compile_case_call(compiler, index, instruction):
+    compiler.flush()
+    if instruction.handler is not handle_case_tail_call:
+        compiler.globals.add('call_depth')
+        compiler.emit(f"try: ipp_calls[call_depth] = {index + 1}")
+        compiler.emit("except IndexError: call_depth_exceeded()")
+        compiler.emit("call_depth += 1")
+    compiler.emit(f"return {instruction.target}")
+
+# case return
+def compile_case_return(compiler, index, instruction):
+    compiler.flush()
+    compiler.globals.add('call_depth')
+    compiler.emit("if not call_depth: exit(56)")
+    compiler.emit("call_depth -= 1")
+    compiler.emit("return ipp_calls[call_depth]")
+
+# case pushs (symb), the variable is read now
+def compile_case_pushs(compiler, index, instruction):
+    compiler.stack.append(compiler.symbol(instruction.arguments[0], compiler.temporary()))
+
+# case pops (var)
+def compile_case_pops(compiler, index, instruction):
+    [(symb1, _)] = compiler.pop(1)
+    compiler.assign(instruction.arguments[0], symb1)
+
+# cases add, sub, mul and idiv (var) (symb) (symb)
+def compile_arithmetic(operator):
+    def compile_case(compiler, index, instruction):
+        symb1, type1 = compiler.symbol(instruction.arguments[1], 'a')
+        symb2, type2 = compiler.symbol(instruction.arguments[2], 'b')
+        compiler.type_error(type_condition(symb1, type1, int), type_condition(symb2, type2, int))
+        if operator == '//':
+            compiler.emit(f"if {symb2} == 0: exit(57)")
+        compiler.assign(instruction.arguments[0], f"{symb1} {operator} {symb2}")
+    return compile_case
+
+# cases lt and gt (var) (symb) (symb), same type, not nil
+def compile_relation(operator):
+    def compile_case(compiler, index, instruction):
+        symb1, type1 = compiler.symbol(instruction.arguments[1], 'a')
+        symb2, type2 = compiler.symbol(instruction.arguments[2], 'b')
+        compiler.type_error(relation_condition(symb1, type1, symb2, type2))
+        compiler.assign(instruction.arguments[0], f"{symb1} {operator} {symb2}")
+    return compile_case
+
+# check_comparable of EQ, JUMPIFEQ and JUMPIFNEQ
+def compile_comparable(compiler, instruction):
+    symb1, type1 = compiler.symbol(instruction.arguments[1], 'a')
+    symb2, type2 = compiler.symbol(instruction.arguments[2], 'b')
+    compiler.type_error(comparable_condition(symb1, type1, symb2, type2))
+    return symb1, symb2
+
+# case eq (var) (symb) (symb)
+def compile_case_eq(compiler, index, instruction):
+    symb1, symb2 = compile_comparable(compiler, instruction)
+    compiler.assign(instruction.arguments[0], f"{symb1} == {symb2}")
+
+# cases and and or (var) (symb) (symb)
+def compile_logic(operator):
+    def compile_case(compiler, index, instruction):
+        symb1, type1 = compiler.symbol(instruction.arguments[1], 'a')
+        symb2, type2 = compiler.symbol(instruction.arguments[2], 'b')
+        compiler.type_error(type_condition(symb1, type1, bool), type_condition(symb2, type2, bool))
+        compiler.assign(instruction.arguments[0], f"{symb1} {operator} {symb2}")
+    return compile_case
+
+# case not (var) (symb)
+def compile_case_not(compiler, index, instruction):
+    symb1, type1 = compiler.symbol(instruction.arguments[1], 'a')
+    compiler.type_error(type_condition(symb1, type1, bool))
+    compiler.assign(instruction.arguments[0], f"not {symb1}")
+
+# case write (symb)
+def compile_case_write(compiler, index, instruction):
+    symb1, type1 = compiler.symbol(instruction.arguments[0], 'a')
+    compiler.emit(f"write_output({symb1})" if type1 is str else f"write_output(value_to_string({symb1}))")
+
+# case concat (var) (symb) (symb)
+def compile_case_concat(compiler, index, instruction):
+    var1 = instruction.arguments[0]
+    if not same_variable(var1, instruction.arguments[1]):
+        symb1, type1 = compiler.symbol(instruction.arguments[1], 'a')
+        symb2, type2 = compiler.symbol(instruction.arguments[2], 'b')
+        compiler.type_error(type_condition(symb1, type1, str), type_condition(symb2, type2, str))
+        compiler.assign(var1, f"{symb1} + {symb2}")
+        return
+    # appended in place
+    symb1, type1 = compiler.string_symbol(instruction.arguments[1], 'a')
+    symb2, type2 = compiler.symbol(instruction.arguments[2], 'b')
+    compiler.type_error(string_condition(symb1, type1), type_condition(symb2, type2, str))
+    frame = compiler.frame(var1.frame)
+    compiler.emit(f"if type({symb1}) is str: {symb1} = {frame}[{var1.slot}] = IPP_string({symb1})")
+    compiler.emit(f"{symb1}.append({symb2})")
+
+# case strlen (var) (symb)
+def compile_case_strlen(compiler, index, instruction):
+    symb1, type1 = compiler.string_symbol(instruction.arguments[1], 'a')
+    compiler.type_error(string_condition(symb1, type1))
+    compiler.assign(instruction.arguments[0], f"len({symb1})")
+
+# case getchar (var) (symb) (symb)
+def compile_case_getchar(compiler, index, instruction):
+    symb1, type1 = compiler.string_symbol(instruction.arguments[1], 'a')
+    symb2, type2 = compiler.symbol(instruction.arguments[2], 'b')
+    compiler.type_error(string_condition(symb1, type1), type_condition(symb2, type2, int))
+    compiler.emit(f"if {symb2} < 0 or {symb2} >= len({symb1}): exit(58)")
+    compiler.assign(instruction.arguments[0], f"{symb1}[{symb2}]")
+
+# case jump (label)
+def compile_case_jump(compiler, index, instruction):
+    compiler.jump(instruction.target)
+
+# cases jumpifeq and jumpifneq (label) (symb) (symb)
+def compile_conditional_jump(operator):
+    def compile_case(compiler, index, instruction):
+        symb1, symb2 = compile_comparable(compiler, instruction)
+        compiler.jump(instruction.target, f"{symb1} {operator} {symb2}")
+    return compile_case
+
+# cases adds, subs, muls and idivs
+def compile_stack_arithmetic(operator):
+    def compile_case(compiler, index, instruction):
+        (symb1, type1), (symb2, type2) = compiler.pop(2)
+        compiler.type_error(type_condition(symb1, type1, int), type_condition(symb2, type2, int))
+        if operator == '//':
+            compiler.emit(f"if {symb2} == 0: exit(57)")
+        compiler.push(f"{symb1} {operator} {symb2}", int)
+    return compile_case
+
+# cases lts and gts
+def compile_stack_relation(operator):
+    def compile_case(compiler, index, instruction):
+        (symb1, type1), (symb2, type2) = compiler.pop(2)
+        compiler.type_error(relation_condition(symb1, type1, symb2, type2))
+        compiler.push(f"{symb1} {operator} {symb2}", bool)
+    return compile_case
+
+# cases ands and ors
+def compile_stack_logic(operator):
+    def compile_case(compiler, index, instruction):
+        (symb1, type1), (symb2, type2) = compiler.pop(2)
+        compiler.type_error(type_condition(symb1, type1, bool), type_condition(symb2, type2, bool))
+        compiler.push(f"{symb1} {operator} {symb2}", bool)
+    return compile_case
+
+# case eqs
+def compile_case_eqs(compiler, index, instruction):
+    (symb1, type1), (symb2, type2) = compiler.pop(2)
+    compiler.type_error(comparable_condition(symb1, type1, symb2, type2))
+    compiler.push(f"{symb1} == {symb2}", bool)
+
+# case nots
+def compile_case_nots(compiler, index, instruction):
+    [(symb1, type1)] = compiler.pop(1)
+    compiler.type_error(type_condition(symb1, type1, bool))
+    compiler.push(f"not {symb1}", bool)
+
+# case clears, pushed values are dropped too
+def compile_case_clears(compiler, index, instruction):
+    compiler.stack.clear()
+    compiler.emit("data_stack.clear()")
+
+# cases jumpifeqs and jumpifneqs (label)
+def compile_stack_jump(operator):
+    def compile_case(compiler, index, instruction):
+        (symb1, type1), (symb2, type2) = compiler.pop(2)
+        compiler.type_error(comparable_condition(symb1, type1, symb2, type2))
+        compiler.jump(instruction.target, f"{symb1} {operator} {symb2}")
+    return compile_case
+
+# opcode to template, the others call their handler
+ipp_compilers = {
+    "MOVE": compile_case_move,
+    "DEFVAR": compile_case_defvar,
+    "CREATEFRAME": compile_case_createframe,
+    "PUSHFRAME": compile_case_pushframe,
+    "POPFRAME": compile_case_popframe,
+    "CALL": compile_case_call,
+    "RETURN": compile_case_return,
+    "PUSHS": compile_case_pushs,
+    "POPS": compile_case_pops,
+    "ADD": compile_arithmetic('+'),
+    "SUB": compile_arithmetic('-'),
+    "MUL": compile_arithmetic('*'),
+    "IDIV": compile_arithmetic('//'),
+    "LT": compile_relation('<'),
+    "GT": compile_relation('>'),
+    "EQ": compile_case_eq,
+    "AND": compile_logic('and'),
+    "OR": compile_logic('or'),
+    "NOT": compile_case_not,
+    "WRITE": compile_case_write,
+    "CONCAT": compile_case_concat,
+    "STRLEN": compile_case_strlen,
+    "GETCHAR": compile_case_getchar,
+    "JUMP": compile_case_jump,
+    "JUMPIFEQ": compile_conditional_jump('=='),
+    "JUMPIFNEQ": compile_conditional_jump('!='),
+    "CLEARS": compile_case_clears,
+    "ADDS": compile_stack_arithmetic('+'),
+    "SUBS": compile_stack_arithmetic('-'),
+    "MULS": compile_stack_arithmetic('*'),
+    "IDIVS": compile_stack_arithmetic('//'),
+    "LTS": compile_stack_relation('<'),
+    "GTS": compile_stack_relation('>'),
+    "EQS": compile_case_eqs,
+    "ANDS": compile_stack_logic('and'),
+    "ORS": compile_stack_logic('or'),
+    "NOTS": compile_case_nots,
+    "JUMPIFEQS": compile_stack_jump('=='),
+    "JUMPIFNEQS": compile_stack_jump('!='),
+}
+
+# generated source of the linked program, a block_<start> function of every
+# block with the program P, global frame G and local frame stack LFS bound as
+# defaults, top level functions since compile() of nested ones is quadratic
+def compiled_source(program, blocks):
+    lines = []
+    for block in blocks:
+        lines.extend(IPP_block_compiler(program, block).compile())
+    return "\n".join(lines) + "\n"
+
+# block function of every block start, indexed by instruction index
+def compile_program(program, blocks):
+    namespace = {"P": program, "G": ipp_global_frame, "LFS": ipp_local_frames_stack}
+    # the blocks run in the namespace of the interpreter, as its handlers do
+    exec(compile(compiled_source(program, blocks), "<ipp compiled>", "exec"), vars(interpret), namespace)
+    block_at = [None] * (len(program) + 1)
+    for block in blocks:
+        block_at[block.start] = namespace[f"block_{block.start}"]
+    return block_at
+
+def run_compiled(program, blocks):
+    interpret.ipp_program = program
+    reset_frames()
+    block_at = compile_program(program, blocks)
+    index = 0
+    program_length = len(program)
+    while index < program_length:
+        index = block_at[index]()
@@ -0,0 +1,121 @@
+# Author: Baturov Illia (xbatur00)
+#
+# --test of interpret.py. Imported by interpret.py only in this mode.
+
+import os
+import sys
+import json
+import time
+import xml.etree.ElementTree as xmltree
+
+import batch
+from batch import pool_worker_start, run_timed
+
+### TEST RUNNER ###
+
+# --test: conformance corpus of .src programs with the .in input, .out
+# expected output and .rc expected exit code of the same name, missing
+# files are empty and exit code 0, the output is compared when 0 is expected
+# tests run in a pool of warm workers like --batch, the report is JUnit XML
+# for a .xml --report and JSON otherwise, the slowest tests are listed
+
+# stems of the .src files under the directory, in subdirectories too
+def test_cases(path):
+    for directory, subdirectories, names in os.walk(path):
+        subdirectories.sort()
+        for name in sorted(names):
+            if name.endswith('.src'):
+                yield os.path.join(directory, name[:-4])
+
+def read_test_file(path, default):
+    try:
+        with open(path, 'rb') as test_file:
+            return test_file.read()
+    except FileNotFoundError:
+        return default
+
+def test_worker(task):
+    stem, opt_level = task
+    start = time.perf_counter()
+    source_data = read_test_file(stem + '.src', b'')
+    input_data = read_test_file(stem + '.in', b'')
+    expected_output = read_test_file(stem + '.out', b'')
+    expected_code = read_test_file(stem + '.rc', b'0').strip()
+    expected_exit_code = int(expected_code) if expected_code.lstrip(b'-').isdigit() else None
+    output, errors, exit_code = run_timed(source_data, input_data, opt_level)
+
+    if exit_code is None:
+        message = f"timeout after {batch.worker_timeout:g} s"
+    elif expected_exit_code is None:
+        message = f"bad .rc file {expected_code[:20]!r}"
+    elif exit_code != expected_exit_code:
+        message = f"exit code {exit_code}, expected {expected_exit_code}"
+    elif exit_code == 0 and output != expected_output:
+        position = next((index for index, (got, expected) in enumerate(zip(output, expected_output)) if got != expected),
+            min(len(output), len(expected_output)))
+        message = f"output differs at byte {position}, {len(output)} bytes, expected {len(expected_output)}"
+    else:
+        message = None
+    return {
+        "name": stem,
+        "passed": message is None,
+        "message": message,
+        "exit_code": exit_code,
+        "expected_exit_code": expected_exit_code,
+        "stderr": errors,
+        "time": time.perf_counter() - start,
+    }
+
+def write_junit_report(report_path, results, elapsed):
+    suite = xmltree.Element('testsuite', name='interpret', tests=str(len(results)),
+        failures=str(sum(not result["passed"] for result in results)), errors='0', time=f"{elapsed:.3f}")
+    for result in results:
+        classname, name = os.path.split(result["name"])
+        case = xmltree.SubElement(suite, 'testcase', classname=classname.replace(os.sep, '.'), name=name, time=f"{result['time']:.6f}")
+        if not result["passed"]:
+            xmltree.SubElement(case, 'failure', message=result["message"]).text = result["stderr"]
+    xmltree.ElementTree(suite).write(report_path, encoding='utf-8', xml_declaration=True)
+
+def write_json_report(report_path, results, elapsed, slowest):
+    report = {
+        "tests": len(results),
+        "failures": sum(not result["passed"] for result in results),
+        "time": elapsed,
+        "slowest": [result["name"] for result in slowest],
+        "results": results,
+    }
+    with open(report_path, 'w') as report_file:
+        json.dump(report, report_file, indent=1)
+
+# exit code 0 when every test passed, 1 otherwise
+def run_tests(path, workers, report_path, opt_level, timeout, slowest_count):
+    import multiprocessing
+
+    tasks = [(stem, opt_level) for stem in test_cases(path)]
+    workers = workers or os.cpu_count() or 1
+    # small chunks, one slow test does not hold back many others
+    chunk_size = max(1, len(tasks) // (workers * 64))
+    start = time.perf_counter()
+    with multiprocessing.Pool(workers, pool_worker_start, (timeout,)) as pool:
+        results = list(pool.imap_unordered(test_worker, tasks, chunk_size))
+    elapsed = time.perf_counter() - start
+    results.sort(key=lambda result: result["name"])
+    slowest = sorted(results, key=lambda result: result["time"], reverse=True)[:slowest_count]
+    failed = [result for result in results if not result["passed"]]
+
+    if report_path and report_path.endswith('.xml'):
+        write_junit_report(report_path, results, elapsed)
+    elif report_path:
+        write_json_report(report_path, results, elapsed, slowest)
+
+    for result in failed:
+        print(f"FAIL {result['name']}: {result['message']}", file=sys.stderr)
+    if slowest:
+        # the median shows how far the slowest are from a typical test
+        median = sorted(result["time"] for result in results)[len(results) // 2]
+        print(f"slowest tests, median {median * 1000:.1f} ms:", file=sys.stderr)
+        for result in slowest:
+            print(f"{result['time'] * 1000:10.1f} ms {result['time'] / median if median else 0:8.1f}x {result['name']}", file=sys.stderr)
+    print(f"tests: {len(results)} passed: {len(results) - len(failed)} failed: {len(failed)} workers: {workers}", file=sys.stderr)
+    print(f"time: {elapsed:.3f} s throughput: {len(results) / elapsed if elapsed else 0:.1f} tests/s", file=sys.stderr)
+    return 1 if failed else 0
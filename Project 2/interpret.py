@@ -1,33 +1,137 @@
 # Author: Baturov Illia (xbatur00)
 
+import io
 import os
 import re
 import sys
+import stat
+import mmap
+import time
 import argparse
 import xml.etree.ElementTree as xmltree
 
+# exit() of the site module also closes stdin, which an embedding host keeps
+exit = sys.exit
+
 ### CLASSES ###
 
+# slots keep millions of decoded instructions small
 class IPP_instruction:
+    __slots__ = ('order', 'opcode', 'arguments', 'handler', 'fused', 'target')
     def __init__(self, order, opcode):
         self.order = order
         self.opcode = opcode
         self.arguments = []
+        self.handler = None
+        # instructions of a superinstruction, set by optimize_program
+        self.fused = None
+        # index of the jump target, set by build_cfg
+        self.target = None
     def new_argument(self, arg_type, arg_value):
         self.arguments.append( IPP_argument(arg_type, arg_value) )
 
 class IPP_argument:
+    __slots__ = ('type', 'value', 'frame', 'slot')
     def __init__(self, type, value):
         self.type = type
         self.value = value
+        # variable reference, set by decode_instruction
+        self.frame = None
+        self.slot = None
+
+### VALUES ###
+
+# int, bool and string values are native, nil is the only IPP_nil
+class IPP_nil:
+    def __repr__(self):
+        return "nil"
+
+nil = IPP_nil()
+
+# value of a variable after DEFVAR
+uninitialized = object()
+
+# string built in place by CONCAT and SETCHAR, appending and replacing a
+# character are amortized O(1); it is held only by the variable it was built
+# in and every other read of that variable gets the flat string
+class IPP_string:
+    __slots__ = ('buffer', 'length', 'flat')
+
+    def __init__(self, string):
+        self.buffer = io.StringIO()
+        self.buffer.write(string)
+        self.length = len(string)
+        # flat string, None after a change
+        self.flat = string
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, index):
+        if self.flat is not None:
+            return self.flat[index]
+        self.buffer.seek(index)
+        char = self.buffer.read(1)
+        self.buffer.seek(self.length)
+        return char
+
+    def __setitem__(self, index, char):
+        self.buffer.seek(index)
+        self.buffer.write(char)
+        self.buffer.seek(self.length)
+        self.flat = None
+
+    def append(self, string):
+        self.buffer.write(string)
+        self.length += len(string)
+        self.flat = None
+
+    def __str__(self):
+        if self.flat is None:
+            self.flat = self.buffer.getvalue()
+        return self.flat
+
+    def __repr__(self):
+        return repr(str(self))
+
+# operand types of STRLEN, GETCHAR and the first operand of CONCAT and SETCHAR
+string_types = (str, IPP_string)
+
+# value type : name returned by TYPE
+type_names = {int: "int", bool: "bool", str: "string", IPP_nil: "nil"}
 
 ### FRAMES ###
 
-ipp_global_frame = {}
+# variables are resolved to slots by decode_instruction, the global frame is
+# a slot array, a local or temporary frame is slot : value of the variables
+# defined in it, so CREATEFRAME costs the same for any number of local names
+ipp_global_frame = []
 ipp_local_frames_stack = []
+ipp_local_frame = None # top of ipp_local_frames_stack, None when empty
 ipp_temporary_frame = {}
 temporary_frame_is_defined = False
 
+# value of a global slot without DEFVAR
+undefined = object()
+
+# name : slot, local and temporary frames share slots
+ipp_global_names = {}
+ipp_local_names = {}
+
+### STATE ###
+
+program_args = None
+data_stack = []
+ipp_labels = {} # value : insctruction_order
+ipp_constants = {} # (type, text) : shared literal argument
+# call stack of return indices, pre-sized to max_call_depth, CALL beyond it
+# exits with the --max-call-depth code of limit_exit_codes
+max_call_depth = 100000
+ipp_calls = [0] * max_call_depth
+call_depth = 0 # used entries of ipp_calls
+instruction_order = 0
+ipp_program = [] # linked program being run
+
 ### REGEX ###
 
 GF_var_regex = r'^GF@[a-zA-Z_\-$&%*!?][a-zA-Z_\-$&%*!?0-9]*$'
@@ -36,325 +140,295 @@ TF_var_regex = r'^TF@[a-zA-Z_\-$&%*!?][a-zA-Z_\-$&%*!?0-9]*$'
 symbol_regex = r'^(var|int|bool|string|nil)$'
 type_regex = r'^(int|string|bool)$'
 
-### FUNCTIONS ###
+### OUTPUT ###
+
+# WRITE output is collected as bytes and written in bulk
+output_buffer = bytearray()
+output_buffer_limit = 1 << 20
+output_file = None # stdout when None
+output_flushed = 0 # bytes written out, the output position of a checkpoint
+
+def write_output(string):
+    output_buffer.extend(string.encode('utf-8'))
+    if len(output_buffer) >= output_buffer_limit:
+        flush_output()
+
+def flush_output():
+    global output_flushed
+    if output_buffer:
+        target = output_file if output_file is not None else sys.stdout.buffer
+        target.write(output_buffer)
+        target.flush()
+        output_flushed += len(output_buffer)
+        output_buffer.clear()
+
+# --output file instead of stdout, a resumed run keeps the output
+# written up to the checkpoint and continues after it
+def open_output(path, position=0):
+    global output_file, output_flushed
+    if position:
+        output_file = open(path, 'r+b')
+        output_file.truncate(position)
+        output_file.seek(position)
+    else:
+        output_file = open(path, 'wb')
+    output_flushed = position
+
+### INPUT ###
+
+# READ input is opened once and read line by line,
+# large --input files are memory mapped
+input_reader = None # stdin when None
+input_file = None
+input_map_size = 1 << 20
+input_position = 0 # bytes read, the input position of a checkpoint
+
+# --input file instead of stdin
+def open_input(path):
+    global input_reader, input_file
+    input_file = open(path, 'rb')
+    if os.fstat(input_file.fileno()).st_size >= input_map_size:
+        input_reader = mmap.mmap(input_file.fileno(), 0, access=mmap.ACCESS_READ)
+    else:
+        input_reader = input_file
+
+# next line without its newline, None at the end of input
+def read_input_line():
+    global input_position
+    if input_reader is None:
+        # prompts written before READ must be visible
+        flush_output()
+        line = sys.stdin.buffer.readline()
+    else:
+        line = input_reader.readline()
+    if not line:
+        return None
+    input_position += len(line)
+    if line.endswith(b'\n'):
+        line = line[:-1]
+        if line.endswith(b'\r'):
+            line = line[:-1]
+    return line.decode('utf-8', 'replace')
 
-# interpreter
-def interpreter(instruction):
+### FUNCTIONS ###
 
-    # correct order
-    global instruction_order
-    if ( int(instruction.order) != instruction_order ):
-        exit(32)
+# slot values that are not IPP values: a missing value exits,
+# an IPP_string is read as its flat string
+special_types = frozenset((object, IPP_string))
 
-    # desired case
-    case = instruction.opcode
-
-    # all cases
-    cases = {
-        "MOVE": handle_case_move,
-        "CREATEFRAME": handle_case_createframe,
-        "PUSHFRAME": handle_case_pushframe,
-        "POPFRAME": handle_case_popframe,
-        "DEFVAR": handle_case_defvar,
-        "CALL": handle_case_call,
-        "RETURN": handle_case_return,
-        "PUSHS": handle_case_pushs,
-        "POPS": handle_case_pops,
-        "ADD": handle_case_add,
-        "SUB": handle_case_sub,
-        "MUL": handle_case_mul,
-        "IDIV": handle_case_idiv,
-        "LT": handle_case_lt,
-        "GT": handle_case_gt,
-        "EQ": handle_case_eq,
-        "AND": handle_case_and,
-        "OR": handle_case_or,
-        "NOT": handle_case_not,
-        "INT2CHAR": handle_case_int2char,
-        "STRI2INT": handle_case_stri2int,
-        "READ": handle_case_read,
-        "WRITE": handle_case_write,
-        "CONCAT": handle_case_concat,
-        "STRLEN": handle_case_strlen,
-        "GETCHAR": handle_case_getchar,
-        "SETCHAR": handle_case_setchar,
-        "TYPE": handle_case_type,
-        "LABEL": handle_case_label,
-        "JUMP": handle_case_jump,
-        "JUMPIFEQ": handle_case_jumpifeq,
-        "JUMPIFNEQ": handle_case_jumpifneq,
-        "EXIT": handle_case_exit,
-        "DPRINT": handle_case_dprint,
-        "BREAK": handle_case_break,
-    }
-
-    # check case
-    if case in cases:
-        cases[case](instruction)
-    else:
-        exit(53)
+def special_value(value):
+    if value is undefined:
+        exit(54)
+    if value is uninitialized:
+        exit(56)
+    return str(value)
 
 # return argument value - only for and symbols
-def return_symbol_value(arg, arg_type):
+def return_symbol_value(arg):
     # symbol is var
-    if arg_type == 'var':
+    frame = arg.frame
+    if frame is not None:
         # global frame
-        if ( bool( re.match(GF_var_regex, arg)) ):
-            if arg in ipp_global_frame:
-                return ipp_global_frame[arg]
-            else:
-                exit(54)
+        if frame == 'GF':
+            value = ipp_global_frame[arg.slot]
         # local frame
-        elif ( bool( re.match(LF_var_regex, arg)) ):
-            if len(ipp_local_frames_stack) == 0:
+        elif frame == 'LF':
+            if ipp_local_frame is None:
                 exit(55)
-            else:
-                if arg in ipp_local_frames_stack[-1]:
-                    return ipp_local_frames_stack[-1][arg]
-                else:
-                    exit(54)
+            try:
+                value = ipp_local_frame[arg.slot]
+            except KeyError:
+                exit(54)
         # temporary frame
-        elif ( bool( re.match(TF_var_regex, arg)) ):
-            if temporary_frame_is_defined:
-                if arg in ipp_temporary_frame:
-                    return ipp_temporary_frame[arg]
-                else:
-                    exit(54)
-            else:
-                exit(55)
-        else:
-            exit(53)
-    # symbol is int, bool or string
-    elif ( bool(re.match(r'^(int|bool)$', arg_type)) ):
-        return arg
-    elif arg_type == 'string':
-        if arg is None:
-        # Note: Empty string case
-            return ""
         else:
-            return arg
-    # symbol is nil
-    elif arg_type == 'nil':
-        return ""
-    # others
-    else:
-        exit(53)
-
-def variable_value_assignment(variable, value):
+            if not temporary_frame_is_defined:
+                exit(55)
+            try:
+                value = ipp_temporary_frame[arg.slot]
+            except KeyError:
+                exit(54)
+        if type(value) in special_types:
+            return special_value(value)
+        return value
+    # symbol is int, bool, string or nil, converted by decode_instruction
+    return arg.value
+
+# string operand, a variable holding an IPP_string gives it without flattening
+def return_string_value(arg):
+    if arg.frame is not None:
+        value = variable_slot_value(arg)
+        if type(value) is IPP_string:
+            return value
+    return return_symbol_value(arg)
+
+# same variable, for CONCAT and SETCHAR building a string in place
+def same_variable(var1, symb1):
+    return var1.frame == symb1.frame and var1.slot == symb1.slot
+
+# frame slots of variable, checked for defined frame
+def variable_frame(variable):
+    frame = variable.frame
     # global frame
-    if ( bool(re.match(GF_var_regex, variable)) ):
-        if variable in ipp_global_frame:
-            ipp_global_frame[variable] = value
-        else:
-            exit(54)
+    if frame == 'GF':
+        return ipp_global_frame
     # local frame
-    elif ( bool(re.match(LF_var_regex, variable)) ):
-        if len(ipp_local_frames_stack) == 0:
+    elif frame == 'LF':
+        if ipp_local_frame is None:
             exit(55)
-        else:
-            if variable in ipp_local_frames_stack[-1]:
-                ipp_local_frames_stack[-1][variable] = value
-            else:
-                exit(54)
+        return ipp_local_frame
     # temporary frame
-    elif ( bool(re.match(TF_var_regex, variable)) ):
-        if temporary_frame_is_defined:
-            if variable in ipp_temporary_frame:
-                ipp_temporary_frame[variable] = value
-            else:
-                exit(54)
-        else:
+    elif frame == 'TF':
+        if not temporary_frame_is_defined:
             exit(55)
+        return ipp_temporary_frame
     # error
     else:
         exit(53)
 
-def detect_type(value):
-    if isinstance(value, int):
-        return "int"
-    elif value == "nil":
-        return "nil"
-    elif value in ["true", "false"]:
-        return "bool"
-    elif isinstance(value, str):
-        return "string"
+# value of variable, undefined without DEFVAR
+def variable_slot_value(variable):
+    slots = variable_frame(variable)
+    if variable.frame == 'GF':
+        return slots[variable.slot]
+    return slots.get(variable.slot, undefined)
 
-# case move (var) (symb)
-def handle_case_move(instruction):
-    # number of arguments is 2
-    if len(instruction.arguments) != 2:
-        exit(53)
+def variable_value_assignment(variable, value):
+    slots = variable_frame(variable)
+    if variable.frame == 'GF':
+        if slots[variable.slot] is undefined:
+            exit(54)
+    elif variable.slot not in slots:
+        exit(54)
+    slots[variable.slot] = value
+
+# frame slots to readable dictionary
+def frame_variables(prefix, names, slots):
+    if type(slots) is dict:
+        return {prefix + name: slots[slot] for name, slot in names.items() if slot in slots}
+    return {prefix + name: slots[slot] for name, slot in names.items() if slots[slot] is not undefined}
+
+# value as written by WRITE and DPRINT
+def value_to_string(value):
+    value_type = type(value)
+    if value_type is str:
+        return value
+    elif value_type is bool:
+        return "true" if value else "false"
+    elif value_type is int:
+        return str(value)
+    else:
+        return ""
 
-    # correct type
-    if instruction.arguments[0].type != 'var':
-        exit(53)
-    if not ( bool(re.match(symbol_regex, instruction.arguments[1].type)) ):
+# operands of EQ, JUMPIFEQ and JUMPIFNEQ
+def check_comparable(symb1, symb2):
+    type1 = type(symb1)
+    type2 = type(symb2)
+    if type1 is not type2 and type1 is not IPP_nil and type2 is not IPP_nil:
         exit(53)
 
+# case move (var) (symb)
+def handle_case_move(instruction):
     # arguments
-    var1 = instruction.arguments[0].value
-    symb1 = return_symbol_value(instruction.arguments[1].value, instruction.arguments[1].type)
+    var1 = instruction.arguments[0]
+    symb1 = return_symbol_value(instruction.arguments[1])
 
     # value assignment
     variable_value_assignment(var1, symb1)
 
 # case createframe
 def handle_case_createframe(instruction):
-    # number of arguments is 0
-    if len(instruction.arguments) != 0:
-        exit(53)
-
     # create frame
     global temporary_frame_is_defined, ipp_temporary_frame
-    if temporary_frame_is_defined == True:
-        ipp_temporary_frame.clear()
-    else:
-        temporary_frame_is_defined = True
+    ipp_temporary_frame = {}
+    temporary_frame_is_defined = True
 
 # case pushframe
 def handle_case_pushframe(instruction):
-    # number of arguments is 0
-    if len(instruction.arguments) != 0:
-        exit(53)
-
-    # push frame
-    global temporary_frame_is_defined, ipp_temporary_frame, ipp_local_frames_stack
+    # push frame, TF stays bound to it but undefined
+    global temporary_frame_is_defined, ipp_temporary_frame, ipp_local_frame
     if temporary_frame_is_defined == False:
         exit(55)
     else:
-        ipp_local_frames_stack.append(ipp_temporary_frame)
-        ipp_temporary_frame.clear()
+        ipp_local_frame = ipp_temporary_frame
+        ipp_local_frames_stack.append(ipp_local_frame)
         temporary_frame_is_defined = False
 
 # case popframe
 def handle_case_popframe(instruction):
-    # number of arguments is 0
-    if len(instruction.arguments) != 0:
-        exit(53)
-
     # pop frame
-    global temporary_frame_is_defined, ipp_temporary_frame, ipp_local_frames_stack
-    if len(ipp_local_frames_stack) == 0:
+    global temporary_frame_is_defined, ipp_temporary_frame, ipp_local_frame
+    if ipp_local_frame is None:
         exit(55)
     else:
-        if temporary_frame_is_defined == True:
-            ipp_temporary_frame.clear()
-            ipp_temporary_frame = ipp_local_frames_stack.pop()
-        else:
-            temporary_frame_is_defined = True
-            ipp_temporary_frame = ipp_local_frames_stack.pop()
+        ipp_temporary_frame = ipp_local_frames_stack.pop()
+        ipp_local_frame = ipp_local_frames_stack[-1] if ipp_local_frames_stack else None
+        temporary_frame_is_defined = True
 
 # case defvar (var)
 def handle_case_defvar(instruction):
-    # number of arguments is 1
-    if len(instruction.arguments) != 1:
-        exit(53)
-
-    # correct type
-    if instruction.arguments[0].type != 'var':
-        exit(53)
-
     # arguments
-    var1 = instruction.arguments[0].value
+    var1 = instruction.arguments[0]
 
     # frame definition
-    # global frame
-    if ( bool(re.match(GF_var_regex, var1)) ):
-        if var1 in ipp_global_frame:
+    slots = variable_frame(var1)
+    if var1.frame == 'GF':
+        if slots[var1.slot] is not undefined:
             exit(52)
-        else:
-            ipp_global_frame[var1] = ""
-    # local frame
-    elif ( bool(re.match(LF_var_regex, var1)) ):
-        if len(ipp_local_frames_stack) == 0:
-            exit(55)
-        else:
-            if var1 in ipp_local_frames_stack[-1]:
-                exit(52)
-            else:
-                ipp_local_frames_stack[-1][var1] = ""
-    # temporary frame
-    elif ( bool(re.match(TF_var_regex, var1)) ):
-        if temporary_frame_is_defined == False:
-            exit(55)
-        else:
-            if var1 in ipp_temporary_frame:
-                exit(52)
-            else:
-                ipp_temporary_frame[var1] = ""
-    # error
-    else:
-        sys.exit(53)
+    elif var1.slot in slots:
+        exit(52)
+    slots[var1.slot] = uninitialized
+
+# CALL beyond --max-call-depth, a resource limit like --max-steps
+def call_depth_exceeded():
+    print("Limit exceeded: --max-call-depth", file=sys.stderr)
+    print("Call depth:", call_depth, file=sys.stderr)
+    exit(limit_exit_codes["--max-call-depth"])
 
 # case call (label)
 def handle_case_call(instruction):
-    # number of arguments is 1
-    if len(instruction.arguments) != 1:
-        exit(53)
+    # instruction order
+    global instruction_order, call_depth
 
-    # correct type
-    if instruction.arguments[0].type != 'label':
-        exit(53)
+    # call stack, index of the next instruction
+    try:
+        ipp_calls[call_depth] = instruction_order
+    except IndexError:
+        call_depth_exceeded()
+    call_depth += 1
 
-    # arguments
-    label1 = instruction.arguments[0].value
+    # jump on label, resolved by build_cfg
+    instruction_order = instruction.target
 
-    # instruction order
+# case call (label) followed by return, set by build_cfg: the callee
+# returns straight to the caller, so nothing is pushed
+def handle_case_tail_call(instruction):
     global instruction_order
-
-    # call stack
-    ipp_calls.append(instruction_order+1)
-
-    # jump on existing label in dictionary
-    if label1 in ipp_labels:
-        instruction_order = int(ipp_labels[label1])
-    else:
-        exit(52)
+    instruction_order = instruction.target
 
 # case return
 def handle_case_return(instruction):
-    # number of arguments is 0
-    if len(instruction.arguments) != 0:
-        exit(53)
-
     # instruction order
-    global instruction_order
+    global instruction_order, call_depth
 
     # jump on position
-    if len(ipp_calls) == 0:
+    if call_depth == 0:
         exit(56)
     else:
-        return_on = ipp_calls.pop()
-        instruction_order = int(return_on)
+        call_depth -= 1
+        instruction_order = ipp_calls[call_depth]
 
 # case pushs (symb)
 def handle_case_pushs(instruction):
-    # number of arguments is 1
-    if len(instruction.arguments) != 1:
-        exit(53)
-
-    # correct type
-    if not ( bool(re.match(symbol_regex, instruction.arguments[0].type)) ):
-        exit(53)
-
     # arguments
-    symb1 = return_symbol_value(instruction.arguments[0].value, instruction.arguments[0].type)
+    symb1 = return_symbol_value(instruction.arguments[0])
 
     # push on stack
     data_stack.append(symb1)
 
 # case pops (var)
 def handle_case_pops(instruction):
-    # number of arguments is 1
-    if len(instruction.arguments) != 1:
-        exit(53)
-
-    # correct type
-    if instruction.arguments[0].type != 'var':
-        exit(53)
-
     # arguments
-    var1 = instruction.arguments[0].value
+    var1 = instruction.arguments[0]
     if len(data_stack) == 0:
         exit(56)
     else:
@@ -365,28 +439,13 @@ def handle_case_pops(instruction):
 
 # case add (var1) (symb1) (symb2)
 def handle_case_add(instruction):
-    # number of arguments is 3
-    if len(instruction.arguments) != 3:
-        exit(53)
-
-    # correct type
-    if instruction.arguments[0].type != 'var':
-        exit(53)
-    if not ( bool(re.match(symbol_regex, instruction.arguments[1].type)) ):
-        exit(53)
-    if not ( bool(re.match(symbol_regex, instruction.arguments[2].type)) ):
-        exit(53)
-
     # arguments
-    var1 = instruction.arguments[0].value
-    symb1 = return_symbol_value(instruction.arguments[1].value, instruction.arguments[1].type)
-    symb2 = return_symbol_value(instruction.arguments[2].value, instruction.arguments[2].type)
+    var1 = instruction.arguments[0]
+    symb1 = return_symbol_value(instruction.arguments[1])
+    symb2 = return_symbol_value(instruction.arguments[2])
 
-    # cast to integer
-    try:
-        symb1 = int(symb1)
-        symb2 = int(symb2)
-    except:
+    # integers only
+    if type(symb1) is not int or type(symb2) is not int:
         exit(53)
 
     # add
@@ -395,28 +454,13 @@ def handle_case_add(instruction):
 
 # case sub (var1) (symb1) (symb2)
 def handle_case_sub(instruction):
-    # number of arguments is 3
-    if len(instruction.arguments) != 3:
-        exit(53)
-
-    # correct type
-    if instruction.arguments[0].type != 'var':
-        exit(53)
-    if not ( bool(re.match(symbol_regex, instruction.arguments[1].type)) ):
-        exit(53)
-    if not ( bool(re.match(symbol_regex, instruction.arguments[2].type)) ):
-        exit(53)
-
     # arguments
-    var1 = instruction.arguments[0].value
-    symb1 = return_symbol_value(instruction.arguments[1].value, instruction.arguments[1].type)
-    symb2 = return_symbol_value(instruction.arguments[2].value, instruction.arguments[2].type)
+    var1 = instruction.arguments[0]
+    symb1 = return_symbol_value(instruction.arguments[1])
+    symb2 = return_symbol_value(instruction.arguments[2])
 
-    # cast to integer
-    try:
-        symb1 = int(symb1)
-        symb2 = int(symb2)
-    except:
+    # integers only
+    if type(symb1) is not int or type(symb2) is not int:
         exit(53)
 
     # sub
@@ -425,28 +469,13 @@ def handle_case_sub(instruction):
 
 # case mul (var1) (symb1) (symb2)
 def handle_case_mul(instruction):
-    # number of arguments is 3
-    if len(instruction.arguments) != 3:
-        exit(53)
-
-    # correct type
-    if instruction.arguments[0].type != 'var':
-        exit(53)
-    if not ( bool(re.match(symbol_regex, instruction.arguments[1].type)) ):
-        exit(53)
-    if not ( bool(re.match(symbol_regex, instruction.arguments[2].type)) ):
-        exit(53)
-
     # arguments
-    var1 = instruction.arguments[0].value
-    symb1 = return_symbol_value(instruction.arguments[1].value, instruction.arguments[1].type)
-    symb2 = return_symbol_value(instruction.arguments[2].value, instruction.arguments[2].type)
+    var1 = instruction.arguments[0]
+    symb1 = return_symbol_value(instruction.arguments[1])
+    symb2 = return_symbol_value(instruction.arguments[2])
 
-    # cast to integer
-    try:
-        symb1 = int(symb1)
-        symb2 = int(symb2)
-    except:
+    # integers only
+    if type(symb1) is not int or type(symb2) is not int:
         exit(53)
 
     # mul
@@ -455,252 +484,113 @@ def handle_case_mul(instruction):
 
 # case idiv (var1) (symb1) (symb2)
 def handle_case_idiv(instruction):
-    # number of arguments is 3
-    if len(instruction.arguments) != 3:
-        exit(53)
-
-    # correct type
-    if instruction.arguments[0].type != 'var':
-        exit(53)
-    if not ( bool(re.match(symbol_regex, instruction.arguments[1].type)) ):
-        exit(53)
-    if not ( bool(re.match(symbol_regex, instruction.arguments[2].type)) ):
-        exit(53)
-
     # arguments
-    var1 = instruction.arguments[0].value
-    symb1 = return_symbol_value(instruction.arguments[1].value, instruction.arguments[1].type)
-    symb2 = return_symbol_value(instruction.arguments[2].value, instruction.arguments[2].type)
+    var1 = instruction.arguments[0]
+    symb1 = return_symbol_value(instruction.arguments[1])
+    symb2 = return_symbol_value(instruction.arguments[2])
 
-    # cast to integer
-    try:
-        symb1 = int(symb1)
-        symb2 = int(symb2)
-    except:
+    # integers only
+    if type(symb1) is not int or type(symb2) is not int:
         exit(53)
 
     # idiv
-    try:
-        result = symb1 / symb2
-    except ZeroDivisionError:
+    if symb2 == 0:
         exit(57)
+    result = symb1 // symb2
     variable_value_assignment(var1, result)
 
 # case lt (var1) (symb1) (symb2)
 def handle_case_lt(instruction):
-    # number of arguments is 3
-    if len(instruction.arguments) != 3:
-        exit(53)
-
-    # correct type
-    if instruction.arguments[0].type != 'var':
-        exit(53)
-    if not ( bool(re.match(symbol_regex, instruction.arguments[1].type)) ):
-        exit(53)
-    if not ( bool(re.match(symbol_regex, instruction.arguments[2].type)) ):
-        exit(53)
-
     # arguments
-    var1 = instruction.arguments[0].value
-    symb1 = return_symbol_value(instruction.arguments[1].value, instruction.arguments[1].type)
-    symb2 = return_symbol_value(instruction.arguments[2].value, instruction.arguments[2].type)
+    var1 = instruction.arguments[0]
+    symb1 = return_symbol_value(instruction.arguments[1])
+    symb2 = return_symbol_value(instruction.arguments[2])
 
-    # cast to integer
-    try:
-        symb1 = int(symb1)
-        symb2 = int(symb2)
-    except:
+    # same type, not nil
+    if type(symb1) is not type(symb2) or symb1 is nil:
         exit(53)
 
     # symb1 is less than symb2
-    if symb1 < symb2:
-        result = "true"
-    else:
-        result = "false"
+    result = symb1 < symb2
     variable_value_assignment(var1, result)
 
 # case gt (var1) (symb1) (symb2)
 def handle_case_gt(instruction):
-    # number of arguments is 3
-    if len(instruction.arguments) != 3:
-        exit(53)
-
-    # correct type
-    if instruction.arguments[0].type != 'var':
-        exit(53)
-    if not ( bool(re.match(symbol_regex, instruction.arguments[1].type)) ):
-        exit(53)
-    if not ( bool(re.match(symbol_regex, instruction.arguments[2].type)) ):
-        exit(53)
-
     # arguments
-    var1 = instruction.arguments[0].value
-    symb1 = return_symbol_value(instruction.arguments[1].value, instruction.arguments[1].type)
-    symb2 = return_symbol_value(instruction.arguments[2].value, instruction.arguments[2].type)
+    var1 = instruction.arguments[0]
+    symb1 = return_symbol_value(instruction.arguments[1])
+    symb2 = return_symbol_value(instruction.arguments[2])
 
-    # cast to integer
-    try:
-        symb1 = int(symb1)
-        symb2 = int(symb2)
-    except:
+    # same type, not nil
+    if type(symb1) is not type(symb2) or symb1 is nil:
         exit(53)
 
     # symb1 is greater than symb2
-    if symb1 > symb2:
-        result = "true"
-    else:
-        result = "false"
+    result = symb1 > symb2
     variable_value_assignment(var1, result)
 
 # case eq (var1) (symb1) (symb2)
 def handle_case_eq(instruction):
-    # number of arguments is 3
-    if len(instruction.arguments) != 3:
-        exit(53)
-
-    # correct type
-    if instruction.arguments[0].type != 'var':
-        exit(53)
-    if not ( bool(re.match(symbol_regex, instruction.arguments[1].type)) ):
-        exit(53)
-    if not ( bool(re.match(symbol_regex, instruction.arguments[2].type)) ):
-        exit(53)
-
     # arguments
-    var1 = instruction.arguments[0].value
-    symb1 = return_symbol_value(instruction.arguments[1].value, instruction.arguments[1].type)
-    symb2 = return_symbol_value(instruction.arguments[2].value, instruction.arguments[2].type)
+    var1 = instruction.arguments[0]
+    symb1 = return_symbol_value(instruction.arguments[1])
+    symb2 = return_symbol_value(instruction.arguments[2])
 
-    # cast to integer
-    try:
-        symb1 = int(symb1)
-        symb2 = int(symb2)
-    except:
-        exit(53)
+    # same type or nil
+    check_comparable(symb1, symb2)
 
-    # symb1 is greater than symb2
-    if symb1 == symb2:
-        result = "true"
-    else:
-        result = "false"
+    # symb1 is equal to symb2
+    result = symb1 == symb2
     variable_value_assignment(var1, result)
 
 # case and (var1) (symb1) (symb2)
 def handle_case_and(instruction):
-    # number of arguments is 3
-    if len(instruction.arguments) != 3:
-        exit(53)
-
-    # correct type
-    if instruction.arguments[0].type != 'var':
-        exit(53)
-    if not ( bool(re.match(symbol_regex, instruction.arguments[1].type)) ):
-        exit(53)
-    if not ( bool(re.match(symbol_regex, instruction.arguments[2].type)) ):
-        exit(53)
-
     # arguments
-    var1 = instruction.arguments[0].value
-    symb1 = return_symbol_value(instruction.arguments[1].value, instruction.arguments[1].type)
-    symb2 = return_symbol_value(instruction.arguments[2].value, instruction.arguments[2].type)
+    var1 = instruction.arguments[0]
+    symb1 = return_symbol_value(instruction.arguments[1])
+    symb2 = return_symbol_value(instruction.arguments[2])
 
-    if detect_type(symb1) != "bool":
-        exit(53)
-    if detect_type(symb2) != "bool":
+    if type(symb1) is not bool or type(symb2) is not bool:
         exit(53)
 
     # symb1 and symb2
-    if symb1 == "true" and symb2 == "false":
-        result = "false"
-    elif symb1 == "false" and symb2 == "true":
-        result = "false"
-    elif symb1 == "false" and symb2 == "false":
-        result = "false"
-    else:
-        result = "true"
+    result = symb1 and symb2
     variable_value_assignment(var1, result)
 
 # case or (var1) (symb1) (symb2)
 def handle_case_or(instruction):
-    # number of arguments is 3
-    if len(instruction.arguments) != 3:
-        exit(53)
-
-    # correct type
-    if instruction.arguments[0].type != 'var':
-        exit(53)
-    if not ( bool(re.match(symbol_regex, instruction.arguments[1].type)) ):
-        exit(53)
-    if not ( bool(re.match(symbol_regex, instruction.arguments[2].type)) ):
-        exit(53)
-
     # arguments
-    var1 = instruction.arguments[0].value
-    symb1 = return_symbol_value(instruction.arguments[1].value, instruction.arguments[1].type)
-    symb2 = return_symbol_value(instruction.arguments[2].value, instruction.arguments[2].type)
+    var1 = instruction.arguments[0]
+    symb1 = return_symbol_value(instruction.arguments[1])
+    symb2 = return_symbol_value(instruction.arguments[2])
 
-    if detect_type(symb1) != "bool":
-        exit(53)
-    if detect_type(symb2) != "bool":
+    if type(symb1) is not bool or type(symb2) is not bool:
         exit(53)
 
     # symb1 or symb2
-    if symb1 == "true" and symb2 == "false":
-        result = "true"
-    elif symb1 == "false" and symb2 == "true":
-        result = "true"
-    elif symb1 == "true" and symb2 == "true":
-        result = "true"
-    else:
-        result = "false"
+    result = symb1 or symb2
     variable_value_assignment(var1, result)
 
 # case not (var1) (symb1)
 def handle_case_not(instruction):
-    # number of arguments is 2
-    if len(instruction.arguments) != 2:
-        exit(53)
-
-    # correct type
-    if instruction.arguments[0].type != 'var':
-        exit(53)
-    if not ( bool(re.match(symbol_regex, instruction.arguments[1].type)) ):
-        exit(53)
-
     # arguments
-    var1 = instruction.arguments[0].value
-    symb1 = return_symbol_value(instruction.arguments[1].value, instruction.arguments[1].type)
+    var1 = instruction.arguments[0]
+    symb1 = return_symbol_value(instruction.arguments[1])
 
-    if detect_type(symb1) != "bool":
+    if type(symb1) is not bool:
         exit(53)
 
     # not symb1
-    if symb1 == "true":
-        result = "false"
-    else:
-        result = "true"
+    result = not symb1
     variable_value_assignment(var1, result)
 
 # case int2char (var1) (symb1)
 def handle_case_int2char(instruction):
-    # number of arguments is 2
-    if len(instruction.arguments) != 2:
-        exit(53)
-
-    # correct typetry
-    if instruction.arguments[0].type != 'var':
-        exit(53)
-    if not ( bool(re.match(symbol_regex, instruction.arguments[1].type)) ):
-        exit(53)
-
     # arguments
-    var1 = instruction.arguments[0].value
-    symb1 = return_symbol_value(instruction.arguments[1].value, instruction.arguments[1].type)
+    var1 = instruction.arguments[0]
+    symb1 = return_symbol_value(instruction.arguments[1])
 
-    # cast to int
-    try:
-        symb1 = int(symb1)
-    except:
+    if type(symb1) is not int:
         exit(53)
 
     # cast to char
@@ -712,33 +602,12 @@ def handle_case_int2char(instruction):
 
 # case stri2int (var1) (symb1) (symb2)
 def handle_case_stri2int(instruction):
-    # number of arguments is 3
-    if len(instruction.arguments) != 3:
-        exit(53)
-
-    # correct type
-    if instruction.arguments[0].type != 'var':
-        exit(53)
-    if not ( bool(re.match(symbol_regex, instruction.arguments[1].type)) ):
-        exit(53)
-    if not ( bool(re.match(symbol_regex, instruction.arguments[2].type)) ):
-        exit(53)
-
     # arguments
-    var1 = instruction.arguments[0].value
-    symb1 = return_symbol_value(instruction.arguments[1].value, instruction.arguments[1].type)
-    symb2 = return_symbol_value(instruction.arguments[2].value, instruction.arguments[2].type)
+    var1 = instruction.arguments[0]
+    symb1 = return_symbol_value(instruction.arguments[1])
+    symb2 = return_symbol_value(instruction.arguments[2])
 
-    # cast to str
-    try:
-        symb1 = str(symb1)
-    except:
-        exit(53)
-
-    # cast to int
-    try:
-        symb2 = int(symb2)
-    except:
+    if type(symb1) is not str or type(symb2) is not int:
         exit(53)
     if symb2 < 0 or symb2 >= len(symb1):
         exit(58)
@@ -750,228 +619,119 @@ def handle_case_stri2int(instruction):
 
 # case read (var1) (type1)
 def handle_case_read(instruction):
-    # number of arguments is 2
-    if len(instruction.arguments) != 2:
-        exit(53)
-
-    # correct type
-    if instruction.arguments[0].type != 'var':
-        exit(53)
-    if not ( bool(re.match(type_regex, instruction.arguments[1].value)) ):
-        exit(53)
-
     # arguments
-    var1 = instruction.arguments[0].value
+    var1 = instruction.arguments[0]
     type1 = instruction.arguments[1].value
 
-    # read stdin
-    if program_args.input is None:
-        data = input()
-    else:
-        with open(program_args.input, 'r') as input_file:
-            sys.stdin = input_file
-            while True:
-                try:
-                    data = input()
-                except EOFError:
-                    break
-            sys.stdin = sys.__stdin__
-
-    # cast
-    try:
-        if type1 == 'int':
+    # next line of input
+    data = read_input_line()
+
+    # cast, nil for missing or wrong input
+    if data is None:
+        result = nil
+    elif type1 == 'int':
+        try:
             result = int(data)
-        elif type1 == 'string':
-            result = str(data)
-        elif type1 == 'bool':
-            result = bool(data)
-        else:
-            exit(57)
-    except:
-        exit(57)
+        except ValueError:
+            try:
+                result = int(data.strip(), 0)
+            except ValueError:
+                result = nil
+    elif type1 == 'string':
+        result = data
+    else:
+        result = data.lower() == 'true'
+
     # result
     variable_value_assignment(var1, result)
 
 # case write (symb)
 def handle_case_write(instruction):
-    # number of arguments is 1
-    if len(instruction.arguments) != 1:
-        exit(53)
-
-    # correct type
-    arg_type = instruction.arguments[0].type
-    if not ( bool(re.match(symbol_regex, arg_type)) ):
-        exit(53)
-
     # arguments
-    symb1 = return_symbol_value(instruction.arguments[0].value, instruction.arguments[0].type)
+    symb1 = return_symbol_value(instruction.arguments[0])
 
     # print symbol
-    replace_ascii_escape_and_print(symb1)
-
-# escape sequences
-def replace_ascii_escape_and_print(string):
-    # cast to string
-    try:
-        string = str(string)
-    except:
-        exit(57)
-    new_string = re.sub(r'\\[0-9]{3}', lambda match: chr(int(match.group(0)[1:])), string)
-    print(new_string, end='')
+    write_output(value_to_string(symb1))
 
 # case concat (var) (symb) (symb)
 def handle_case_concat(instruction):
-    # number of arguments is 3
-    if len(instruction.arguments) != 3:
-        exit(53)
+    # arguments
+    var1 = instruction.arguments[0]
+    symb1 = return_string_value(instruction.arguments[1])
+    symb2 = return_symbol_value(instruction.arguments[2])
 
-    # correct type
-    if instruction.arguments[0].type != 'var':
-        exit(53)
-    if not ( bool(re.match(symbol_regex, instruction.arguments[1].type)) ):
-        exit(53)
-    if not ( bool(re.match(symbol_regex, instruction.arguments[2].type)) ):
+    if type(symb1) not in string_types or type(symb2) is not str:
         exit(53)
 
-    # arguments
-    var1 = instruction.arguments[0].value
-    symb1 = return_symbol_value(instruction.arguments[1].value, instruction.arguments[1].type)
-    symb2 = return_symbol_value(instruction.arguments[2].value, instruction.arguments[2].type)
-
-    # concat
-    result = str(symb1) + str(symb2)
-    variable_value_assignment(var1, result)
+    # concat, appended in place when the variable is its own first operand
+    if same_variable(var1, instruction.arguments[1]):
+        if type(symb1) is str:
+            symb1 = IPP_string(symb1)
+            variable_value_assignment(var1, symb1)
+        symb1.append(symb2)
+    else:
+        result = str(symb1) + symb2
+        variable_value_assignment(var1, result)
 
 # case strlen (var1) (symb1)
 def handle_case_strlen(instruction):
-    # number of arguments is 2
-    if len(instruction.arguments) != 2:
-        exit(53)
-
-    # correct type
-    if instruction.arguments[0].type != 'var':
-        exit(53)
-    if not ( bool(re.match(symbol_regex, instruction.arguments[1].type)) ):
-        exit(53)
-
     # arguments
-    var1 = instruction.arguments[0].value
-    symb1 = return_symbol_value(instruction.arguments[1].value, instruction.arguments[1].type)
+    var1 = instruction.arguments[0]
+    symb1 = return_string_value(instruction.arguments[1])
     
-    if detect_type(symb1) != "string":
+    if type(symb1) not in string_types:
         exit(53)
 
-    # cast to string
-    try:
-        symb1 = str(symb1)
-    except:
-        exit(57)
-
     # strlen
     result = len(symb1)
     variable_value_assignment(var1, result)
 
 # case getchar (var) (symb) (symb)
 def handle_case_getchar(instruction):
-    # number of arguments is 3
-    if len(instruction.arguments) != 3:
-        exit(53)
-
-    # correct type
-    if instruction.arguments[0].type != 'var':
-        exit(53)
-    if not ( bool(re.match(symbol_regex, instruction.arguments[1].type)) ):
-        exit(53)
-    if not ( bool(re.match(symbol_regex, instruction.arguments[2].type)) ):
-        exit(53)
-
     # arguments
-    var1 = instruction.arguments[0].value
-    symb1 = return_symbol_value(instruction.arguments[1].value, instruction.arguments[1].type)
-    symb2 = return_symbol_value(instruction.arguments[2].value, instruction.arguments[2].type)
-
-    # cast to str
-    try:
-        symb1 = str(symb1)
-    except:
-        exit(53)
+    var1 = instruction.arguments[0]
+    symb1 = return_string_value(instruction.arguments[1])
+    symb2 = return_symbol_value(instruction.arguments[2])
 
-    # cast to int
-    try:
-        symb2 = int(symb2)
-    except:
+    if type(symb1) not in string_types or type(symb2) is not int:
         exit(53)
     if symb2 < 0 or symb2 >= len(symb1):
         exit(58)
 
     # getchar
-    result = str(symb1[symb2])
+    result = symb1[symb2]
     variable_value_assignment(var1, result)
 
 # case setchar (var) (symb) (symb)
 def handle_case_setchar(instruction):
-    # number of arguments is 3
-    if len(instruction.arguments) != 3:
-        exit(53)
-
-    # correct type
-    if instruction.arguments[0].type != 'var':
-        exit(53)
-    if not ( bool(re.match(symbol_regex, instruction.arguments[1].type)) ):
-        exit(53)
-    if not ( bool(re.match(symbol_regex, instruction.arguments[2].type)) ):
-        exit(53)
-
     # arguments
-    var1 = instruction.arguments[0].value
-    var1_value = return_symbol_value(instruction.arguments[0].value, instruction.arguments[0].type)
-    symb1 = return_symbol_value(instruction.arguments[1].value, instruction.arguments[1].type)
-    symb2 = return_symbol_value(instruction.arguments[2].value, instruction.arguments[2].type)
+    var1 = instruction.arguments[0]
+    string = return_string_value(instruction.arguments[0])
+    symb1 = return_symbol_value(instruction.arguments[1])
+    symb2 = return_symbol_value(instruction.arguments[2])
 
-    if detect_type(var1_value) != "string":
-        exit(53)
-    if detect_type(symb1) != "int":
+    if type(string) not in string_types or type(symb1) is not int or type(symb2) is not str:
         exit(53)
-    if detect_type(symb2) != "string":
-        exit(53)
-
-    # cast to str
-    try:
-        string = str(var1_value)
-        symb2 = str(symb2)
-    except:
-        exit(53)
-
-    # cast to int
-    try:
-        symb1 = int(symb1)
-    except:
-        exit(53)
-    if symb1 < 0 or symb1 >= len(string):
+    if symb1 < 0 or symb1 >= len(string) or len(symb2) == 0:
         exit(58)
 
-    # setchar
-    result = string[:symb1] + symb2[0] + string[symb1:]
-    variable_value_assignment(var1, result)
+    # setchar, the character at symb1 is replaced in place
+    if type(string) is str:
+        string = IPP_string(string)
+        variable_value_assignment(var1, string)
+    string[symb1] = symb2[0]
 
 # case type (var1) (symb1)
 def handle_case_type(instruction):
-    # number of arguments is 2
-    if len(instruction.arguments) != 2:
-        exit(53)
-
-    # correct type
-    if instruction.arguments[0].type != 'var':
-        exit(53)
-    if not ( bool(re.match(symbol_regex, instruction.arguments[1].type)) ):
-        exit(53)
-
     # arguments
-    var1 = instruction.arguments[0].value
-    symb1 = return_symbol_value(instruction.arguments[1].value, instruction.arguments[1].type)
+    var1 = instruction.arguments[0]
+    symb1 = instruction.arguments[1]
 
-    # type
-    result = type(symb1)
+    # type, empty for uninitialized variable
+    if symb1.frame is not None and variable_slot_value(symb1) is uninitialized:
+        result = ""
+    else:
+        result = type_names[type(return_symbol_value(symb1))]
     variable_value_assignment(var1, result)
 
 # case label (label)
@@ -980,109 +740,50 @@ def handle_case_label(instruction):
 
 # case jump (label)
 def handle_case_jump(instruction):
-    # number of arguments is 1
-    if len(instruction.arguments) != 1:
-        exit(53)
-
-    # correct type
-    if instruction.arguments[0].type != 'label':
-        exit(53)
-
-    # arguments
-    label1 = instruction.arguments[0].value
-
     # instruction order
     global instruction_order
 
-    # jump on existing label in dictionary
-    if label1 in ipp_labels:
-        instruction_order = int(ipp_labels[label1])
-    else:
-        exit(53)
+    # jump on label, resolved by build_cfg
+    instruction_order = instruction.target
 
 # case jumpifeq (label) (symb) (symb)
 def handle_case_jumpifeq(instruction):
-    # number of arguments is 3
-    if len(instruction.arguments) != 3:
-        exit(53)
-
-    # correct type
-    if instruction.arguments[0].type != 'label':
-        exit(53)
-    if not ( bool(re.match(symbol_regex, instruction.arguments[1].type)) ):
-        exit(53)
-    if not ( bool(re.match(symbol_regex, instruction.arguments[2].type)) ):
-        exit(53)
-    
     # arguments
-    label1 = instruction.arguments[0].value
-    symb1 = return_symbol_value(instruction.arguments[1].value, instruction.arguments[1].type)
-    symb2 = return_symbol_value(instruction.arguments[2].value, instruction.arguments[2].type)
+    symb1 = return_symbol_value(instruction.arguments[1])
+    symb2 = return_symbol_value(instruction.arguments[2])
 
-    if detect_type(symb1) != detect_type(symb2):
-        exit(53)
+    check_comparable(symb1, symb2)
 
     # instruction order
     global instruction_order
 
-    # jump on existing label in dictionary
-    if label1 in ipp_labels:
-        if symb1 == symb2:
-            instruction_order = int(ipp_labels[label1])
-    else:
-        exit(52)
+    # jump on label, resolved by build_cfg
+    if symb1 == symb2:
+        instruction_order = instruction.target
 
 # case jumpifneq
 def handle_case_jumpifneq(instruction):
-    # number of arguments is 3
-    if len(instruction.arguments) != 3:
-        exit(53)
-
-    # correct type
-    if instruction.arguments[0].type != 'label':
-        exit(53)
-    if not ( bool(re.match(symbol_regex, instruction.arguments[1].type)) ):
-        exit(53)
-    if not ( bool(re.match(symbol_regex, instruction.arguments[2].type)) ):
-        exit(53)
-    
     # arguments
-    label1 = instruction.arguments[0].value
-    symb1 = return_symbol_value(instruction.arguments[1].value, instruction.arguments[1].type)
-    symb2 = return_symbol_value(instruction.arguments[2].value, instruction.arguments[2].type)
+    symb1 = return_symbol_value(instruction.arguments[1])
+    symb2 = return_symbol_value(instruction.arguments[2])
 
-    if detect_type(symb1) != detect_type(symb2):
-        exit(53)
+    check_comparable(symb1, symb2)
 
     # instruction order
     global instruction_order
 
-    # jump on existing label in dictionary
-    if label1 in ipp_labels:
-        if symb1 != symb2:
-            instruction_order = int(ipp_labels[label1])
-    else:
-        exit(52)
+    # jump on label, resolved by build_cfg
+    if symb1 != symb2:
+        instruction_order = instruction.target
 
 # case exit (symb)
 def handle_case_exit(instruction):
-    # number of arguments is 1
-    if len(instruction.arguments) != 1:
-        exit(53)
-
-    # correct type
-    arg_type = instruction.arguments[0].type
-    if not ( bool(re.match(symbol_regex, arg_type)) ):
-        exit(53)
-
     # arguments
-    symb1 = return_symbol_value(instruction.arguments[0].value, instruction.arguments[0].type)
+    symb1 = return_symbol_value(instruction.arguments[0])
 
-    # cast to int
-    try:
-        exit_code = int(symb1)
-    except:
+    if type(symb1) is not int:
         exit(53)
+    exit_code = symb1
     if exit_code < 0 or exit_code > 49:
         exit(57)
 
@@ -1091,147 +792,1129 @@ def handle_case_exit(instruction):
 
 # case dprint (symb)
 def handle_case_dprint(instruction):
-    # number of arguments is 1
-    if len(instruction.arguments) != 1:
-        exit(53)
-
-    # correct type
-    arg_type = instruction.arguments[0].type
-    if not ( bool(re.match(symbol_regex, arg_type)) ):
-        exit(53)
-
     # arguments
-    symb1 = return_symbol_value(instruction.arguments[0].value, instruction.arguments[0].type)
+    symb1 = return_symbol_value(instruction.arguments[0])
 
     # write to stderr
-    sys.stderr.write(symb1)
+    sys.stderr.write(value_to_string(symb1))
 
 # case break
 def handle_case_break(instruction):
-    # number of arguments is 0
-    if len(instruction.arguments) != 0:
+    # write to stderr
+    print("Code position:", ipp_program[instruction_order - 1].order, file=sys.stderr)
+    print("Global frame:", frame_variables("GF@", ipp_global_names, ipp_global_frame), file=sys.stderr)
+    print("Local frame:", [frame_variables("LF@", ipp_local_names, slots) for slots in ipp_local_frames_stack], file=sys.stderr)
+    if temporary_frame_is_defined:
+        print("Temporary frame:", frame_variables("TF@", ipp_local_names, ipp_temporary_frame), file=sys.stderr)
+    else:
+        print("Temporary frame:", None, file=sys.stderr)
+
+# STACK extension, operands are popped from the data stack and the result
+# is pushed back, the last pushed value is the last operand
+
+# case clears
+def handle_case_clears(instruction):
+    data_stack.clear()
+
+# case adds
+def handle_case_adds(instruction):
+    # operands
+    if len(data_stack) < 2:
+        exit(56)
+    symb2 = data_stack.pop()
+    symb1 = data_stack.pop()
+
+    # integers only
+    if type(symb1) is not int or type(symb2) is not int:
         exit(53)
+    data_stack.append(symb1 + symb2)
 
-    # write to stderr
-    print("Code position:", instruction_order)
-    print("Global frame:", ipp_global_frame)
-    print("Local frame:", ipp_local_frames_stack)
-    print("Temporary frame:", ipp_temporary_frame)
+# case subs
+def handle_case_subs(instruction):
+    # operands
+    if len(data_stack) < 2:
+        exit(56)
+    symb2 = data_stack.pop()
+    symb1 = data_stack.pop()
 
-### ARGUMENT PARSING ###
+    # integers only
+    if type(symb1) is not int or type(symb2) is not int:
+        exit(53)
+    data_stack.append(symb1 - symb2)
 
-# arguments of program
-argument_parser = argparse.ArgumentParser()
-argument_parser.add_argument('--source', metavar='file', help='Path to source file?')
-argument_parser.add_argument('--input', metavar='file', help='Path to input file?')
-program_args = argument_parser.parse_args()
+# case muls
+def handle_case_muls(instruction):
+    # operands
+    if len(data_stack) < 2:
+        exit(56)
+    symb2 = data_stack.pop()
+    symb1 = data_stack.pop()
 
-# mandatory argument source or input
-if not (program_args.source or program_args.input):
-    argument_parser.error('No source file')
+    # integers only
+    if type(symb1) is not int or type(symb2) is not int:
+        exit(53)
+    data_stack.append(symb1 * symb2)
 
-# source : file does not exist
-if program_args.source and not os.path.isfile(program_args.source):
-    argument_parser.error(f"Source: {program_args.source} does not exist")
+# case idivs
+def handle_case_idivs(instruction):
+    # operands
+    if len(data_stack) < 2:
+        exit(56)
+    symb2 = data_stack.pop()
+    symb1 = data_stack.pop()
 
-# input : file does not exist
-if program_args.input and not os.path.isfile(program_args.input):
-    argument_parser.error(f"Input: {program_args.input} does not exist")
+    # integers only
+    if type(symb1) is not int or type(symb2) is not int:
+        exit(53)
+    if symb2 == 0:
+        exit(57)
+    data_stack.append(symb1 // symb2)
 
-### LOADING XML FILE ###
+# case lts
+def handle_case_lts(instruction):
+    # operands
+    if len(data_stack) < 2:
+        exit(56)
+    symb2 = data_stack.pop()
+    symb1 = data_stack.pop()
+
+    # same type, not nil
+    if type(symb1) is not type(symb2) or symb1 is nil:
+        exit(53)
+    data_stack.append(symb1 < symb2)
+
+# case gts
+def handle_case_gts(instruction):
+    # operands
+    if len(data_stack) < 2:
+        exit(56)
+    symb2 = data_stack.pop()
+    symb1 = data_stack.pop()
+
+    # same type, not nil
+    if type(symb1) is not type(symb2) or symb1 is nil:
+        exit(53)
+    data_stack.append(symb1 > symb2)
 
-# xml element tree
-element_tree = xmltree.parse(program_args.source)
+# case eqs
+def handle_case_eqs(instruction):
+    # operands
+    if len(data_stack) < 2:
+        exit(56)
+    symb2 = data_stack.pop()
+    symb1 = data_stack.pop()
 
-# root of the tree
-tree_root = element_tree.getroot()
+    # same type or nil
+    check_comparable(symb1, symb2)
+    data_stack.append(symb1 == symb2)
 
-### XML CHECK ###
+# case ands
+def handle_case_ands(instruction):
+    # operands
+    if len(data_stack) < 2:
+        exit(56)
+    symb2 = data_stack.pop()
+    symb1 = data_stack.pop()
 
-# root must be a program
-if tree_root.tag != 'program':
-    exit(31)
+    if type(symb1) is not bool or type(symb2) is not bool:
+        exit(53)
+    data_stack.append(symb1 and symb2)
 
-# childs of the root
-for root_child in tree_root:
+# case ors
+def handle_case_ors(instruction):
+    # operands
+    if len(data_stack) < 2:
+        exit(56)
+    symb2 = data_stack.pop()
+    symb1 = data_stack.pop()
 
+    if type(symb1) is not bool or type(symb2) is not bool:
+        exit(53)
+    data_stack.append(symb1 or symb2)
+
+# case nots
+def handle_case_nots(instruction):
+    # operand
+    if len(data_stack) == 0:
+        exit(56)
+    symb1 = data_stack.pop()
+
+    if type(symb1) is not bool:
+        exit(53)
+    data_stack.append(not symb1)
+
+# case int2chars
+def handle_case_int2chars(instruction):
+    # operand
+    if len(data_stack) == 0:
+        exit(56)
+    symb1 = data_stack.pop()
+
+    if type(symb1) is not int:
+        exit(53)
+
+    # cast to char, as INT2CHAR
+    try:
+        data_stack.append(chr(symb1))
+    except (ValueError, OverflowError):
+        exit(53)
+
+# case stri2ints
+def handle_case_stri2ints(instruction):
+    # operands
+    if len(data_stack) < 2:
+        exit(56)
+    symb2 = data_stack.pop()
+    symb1 = data_stack.pop()
+
+    if type(symb1) is not str or type(symb2) is not int:
+        exit(53)
+    if symb2 < 0 or symb2 >= len(symb1):
+        exit(58)
+    data_stack.append(ord(symb1[symb2]))
+
+# case jumpifeqs (label)
+def handle_case_jumpifeqs(instruction):
+    global instruction_order
+    # operands
+    if len(data_stack) < 2:
+        exit(56)
+    symb2 = data_stack.pop()
+    symb1 = data_stack.pop()
+
+    check_comparable(symb1, symb2)
+
+    # jump on label, resolved by build_cfg
+    if symb1 == symb2:
+        instruction_order = instruction.target
+
+# case jumpifneqs (label)
+def handle_case_jumpifneqs(instruction):
+    global instruction_order
+    # operands
+    if len(data_stack) < 2:
+        exit(56)
+    symb2 = data_stack.pop()
+    symb1 = data_stack.pop()
+
+    check_comparable(symb1, symb2)
+
+    # jump on label, resolved by build_cfg
+    if symb1 != symb2:
+        instruction_order = instruction.target
+
+### DISPATCH ###
+
+# opcode to handler, bound to instructions once by decode_instruction
+ipp_handlers = {
+    "MOVE": handle_case_move,
+    "CREATEFRAME": handle_case_createframe,
+    "PUSHFRAME": handle_case_pushframe,
+    "POPFRAME": handle_case_popframe,
+    "DEFVAR": handle_case_defvar,
+    "CALL": handle_case_call,
+    "RETURN": handle_case_return,
+    "PUSHS": handle_case_pushs,
+    "POPS": handle_case_pops,
+    "ADD": handle_case_add,
+    "SUB": handle_case_sub,
+    "MUL": handle_case_mul,
+    "IDIV": handle_case_idiv,
+    "LT": handle_case_lt,
+    "GT": handle_case_gt,
+    "EQ": handle_case_eq,
+    "AND": handle_case_and,
+    "OR": handle_case_or,
+    "NOT": handle_case_not,
+    "INT2CHAR": handle_case_int2char,
+    "STRI2INT": handle_case_stri2int,
+    "READ": handle_case_read,
+    "WRITE": handle_case_write,
+    "CONCAT": handle_case_concat,
+    "STRLEN": handle_case_strlen,
+    "GETCHAR": handle_case_getchar,
+    "SETCHAR": handle_case_setchar,
+    "TYPE": handle_case_type,
+    "LABEL": handle_case_label,
+    "JUMP": handle_case_jump,
+    "JUMPIFEQ": handle_case_jumpifeq,
+    "JUMPIFNEQ": handle_case_jumpifneq,
+    "EXIT": handle_case_exit,
+    "DPRINT": handle_case_dprint,
+    "BREAK": handle_case_break,
+    "CLEARS": handle_case_clears,
+    "ADDS": handle_case_adds,
+    "SUBS": handle_case_subs,
+    "MULS": handle_case_muls,
+    "IDIVS": handle_case_idivs,
+    "LTS": handle_case_lts,
+    "GTS": handle_case_gts,
+    "EQS": handle_case_eqs,
+    "ANDS": handle_case_ands,
+    "ORS": handle_case_ors,
+    "NOTS": handle_case_nots,
+    "INT2CHARS": handle_case_int2chars,
+    "STRI2INTS": handle_case_stri2ints,
+    "JUMPIFEQS": handle_case_jumpifeqs,
+    "JUMPIFNEQS": handle_case_jumpifneqs,
+}
+
+# opcode : kinds of its arguments
+ipp_operands = {
+    "MOVE": ("var", "symb"),
+    "CREATEFRAME": (),
+    "PUSHFRAME": (),
+    "POPFRAME": (),
+    "DEFVAR": ("var",),
+    "CALL": ("label",),
+    "RETURN": (),
+    "PUSHS": ("symb",),
+    "POPS": ("var",),
+    "ADD": ("var", "symb", "symb"),
+    "SUB": ("var", "symb", "symb"),
+    "MUL": ("var", "symb", "symb"),
+    "IDIV": ("var", "symb", "symb"),
+    "LT": ("var", "symb", "symb"),
+    "GT": ("var", "symb", "symb"),
+    "EQ": ("var", "symb", "symb"),
+    "AND": ("var", "symb", "symb"),
+    "OR": ("var", "symb", "symb"),
+    "NOT": ("var", "symb"),
+    "INT2CHAR": ("var", "symb"),
+    "STRI2INT": ("var", "symb", "symb"),
+    "READ": ("var", "type"),
+    "WRITE": ("symb",),
+    "CONCAT": ("var", "symb", "symb"),
+    "STRLEN": ("var", "symb"),
+    "GETCHAR": ("var", "symb", "symb"),
+    "SETCHAR": ("var", "symb", "symb"),
+    "TYPE": ("var", "symb"),
+    "LABEL": ("label",),
+    "JUMP": ("label",),
+    "JUMPIFEQ": ("label", "symb", "symb"),
+    "JUMPIFNEQ": ("label", "symb", "symb"),
+    "EXIT": ("symb",),
+    "DPRINT": ("symb",),
+    "BREAK": (),
+    "CLEARS": (),
+    "ADDS": (),
+    "SUBS": (),
+    "MULS": (),
+    "IDIVS": (),
+    "LTS": (),
+    "GTS": (),
+    "EQS": (),
+    "ANDS": (),
+    "ORS": (),
+    "NOTS": (),
+    "INT2CHARS": (),
+    "STRI2INTS": (),
+    "JUMPIFEQS": ("label",),
+    "JUMPIFNEQS": ("label",),
+}
+
+### LOADING XML FILE ###
+
+# single streaming pass over the XML source, every instruction is checked
+# as soon as its element ends and the element is freed, the program is
+# decoded after the whole document is well formed so XML errors win
+def load_program(source):
+    # names, labels and constants of the previous program
+    ipp_labels.clear()
+    ipp_constants.clear()
+    ipp_global_names.clear()
+    ipp_local_names.clear()
+
+    # array of all instructions
+    program = []
+
+    # depth of the element, root is 1
+    depth = 0
+    tree_root = None
+    try:
+        for event, element in xmltree.iterparse(source, events=('start', 'end')):
+            if event == 'start':
+                depth += 1
+
+                # root must be a program
+                if depth == 1:
+                    if element.tag != 'program':
+                        exit(31)
+                    tree_root = element
+                continue
+
+            depth -= 1
+            if depth != 1:
+                continue
+
+            # root child is instruction
+            program.append(load_instruction(element, len(program) + 1))
+
+            # instruction keeps its arguments, drop its element
+            tree_root.clear()
+    except xmltree.ParseError:
+        exit(31)
+
+    for order_count, instruction in enumerate(program, 1):
+        decode_instruction(instruction)
+        if instruction.opcode == 'LABEL':
+            load_label(instruction, order_count)
+
+    verify_labels(program)
+    return program
+
+# checked instruction of the XML element
+def load_instruction(element, order_count):
     # root child is instruction
-    if root_child.tag != 'instruction':
+    if element.tag != 'instruction':
         exit(31)
 
     # child_attrib[0] is order, child_attrib[1] is opcode
-    child_attrib = list(root_child.attrib.keys())
-    if child_attrib[0] != 'order' or child_attrib[1] != 'opcode':
+    child_attrib = list(element.attrib.keys())
+    if child_attrib[:2] != ['order', 'opcode']:
         exit(31)
 
-    # child_arg is arg[123]
-    for child_arg in root_child:
-        if not (re.match(r"arg[123]", child_arg.tag)):
+    # new instruction
+    instruction = IPP_instruction(order=element.attrib['order'], opcode=element.attrib['opcode'].upper())
+
+    # instruction arguments
+    child_args = []
+    for child_arg in element:
+        # child_arg is arg[123]
+        if not (re.match(r"^arg[123]$", child_arg.tag)):
             exit(31)
+        if 'type' not in child_arg.attrib:
+            exit(57)
+        child_args.append(child_arg)
 
-### XML TO INSTRUCTIONS ###
+    # arg1, arg2, arg3 in any order of the document, none missing
+    child_args.sort(key=lambda child_arg: child_arg.tag)
+    for number, child_arg in enumerate(child_args, 1):
+        if child_arg.tag != f"arg{number}":
+            exit(32)
+        instruction.new_argument(child_arg.attrib['type'], child_arg.text)
 
-# stack
-data_stack = []
+    # correct order
+    try:
+        if ( int(instruction.order) != order_count ):
+            exit(32)
+    except ValueError:
+        exit(32)
 
-# array of all instructions
-ipp_instructions = []
+    return instruction
 
-# dictionary of all labels
-ipp_labels = {} # value : insctruction_order
-ipp_calls = [] # instruction_order
+# adding label to dictionary, with order of instruction
+def load_label(instruction, order_count):
+    # check if there's identical label
+    if instruction.arguments[0].value in ipp_labels:
+        exit(52)
 
-# instruction factory
-for root_child in tree_root:
+    ipp_labels[instruction.arguments[0].value] = order_count
 
-    # new instruction
-    instruction = IPP_instruction(order=root_child.attrib['order'], opcode=root_child.attrib['opcode'])
+### DECODING ###
 
-    # instruction arguments
-    for child_arg in root_child:
-        if 'type' in child_arg.attrib:
-            instruction.new_argument(child_arg.attrib['type'], child_arg.text)
-        else:
-            exit(57)
+# bind instruction to its handler once, before execution
+def decode_instruction(instruction):
+    # known opcode
+    if instruction.opcode in ipp_handlers:
+        instruction.handler = ipp_handlers[instruction.opcode]
+    else:
+        exit(53)
 
-    # add instruction to array
-    ipp_instructions.append(instruction)
+    verify_instruction(instruction)
 
-### INTERPRETER ###
+    # variables to frame slots, literals to shared constants
+    arguments = instruction.arguments
+    for index, argument in enumerate(arguments):
+        if argument.type == 'var':
+            resolve_variable(argument)
+        elif argument.type in literal_types:
+            arguments[index] = constant_argument(argument)
 
-# ONLY LABELS
-# order count
-order_count = 1
-for instruction in ipp_instructions:
-    if instruction.opcode == 'LABEL':
-        # correct order
-        if ( int(instruction.order) != order_count ):
-            exit(32)
+### VERIFICATION ###
 
-        # number of arguments is 1
-        if len(instruction.arguments) != 1:
-            exit(53)
+# number and kinds of arguments, checked once so that handlers do not
+def verify_instruction(instruction):
+    operands = ipp_operands[instruction.opcode]
+
+    # number of arguments
+    if len(instruction.arguments) != len(operands):
+        exit(53)
 
-        # correct type
-        if instruction.arguments[0].type != 'label':
+    # correct type
+    for operand, argument in zip(operands, instruction.arguments):
+        if operand == 'symb':
+            if not ( bool(re.match(symbol_regex, argument.type)) ):
+                exit(53)
+        elif operand == 'type':
+            if argument.type != 'type' or not ( bool(re.match(type_regex, argument.value or '')) ):
+                exit(53)
+        elif argument.type != operand:
             exit(53)
 
-        # check if there's identical label
-        if instruction.arguments[0].value in ipp_labels:
-            exit(52)
+# every jump and CALL has its label
+def verify_labels(program):
+    for instruction in program:
+        if instruction.opcode != 'LABEL':
+            for argument in instruction.arguments:
+                if argument.type == 'label' and argument.value not in ipp_labels:
+                    exit(52)
+
+# frame and slot of variable
+def resolve_variable(argument):
+    variable = argument.value or ''
+    if ( bool(re.match(GF_var_regex, variable)) ):
+        names = ipp_global_names
+    elif ( bool(re.match(LF_var_regex, variable)) or bool(re.match(TF_var_regex, variable)) ):
+        names = ipp_local_names
+    else:
+        exit(53)
+
+    # same name is the same slot in every frame of its kind
+    name = variable[3:]
+    if name not in names:
+        names[name] = len(names)
+    argument.frame = variable[:2]
+    argument.slot = names[name]
 
-        # adding label to dictionary, with order of instruction
-        ipp_labels[instruction.arguments[0].value] = order_count
-    # add 1 to order count
-    order_count += 1
-
-# ALL INSTRUCTIONS
-# order of instruction
-instruction_order = 1
-# every index of instructions array
-while instruction_order - 1 < len(ipp_instructions):
-    interpreter(ipp_instructions[instruction_order - 1])
+# equal literals of the program share one decoded argument
+def constant_argument(argument):
+    key = (argument.type, argument.value or '')
+    if key not in ipp_constants:
+        argument.value = literal_types[argument.type](key[1])
+        ipp_constants[key] = argument
+    return ipp_constants[key]
+
+def int_literal(text):
+    try:
+        return int(text)
+    except ValueError:
+        pass
+    try:
+        return int(text, 0)
+    except ValueError:
+        exit(32)
+
+def bool_literal(text):
+    if text == 'true':
+        return True
+    elif text == 'false':
+        return False
+    else:
+        exit(32)
+
+def nil_literal(text):
+    if text != 'nil':
+        exit(32)
+    return nil
+
+# escape sequences
+def string_literal(text):
+    if '\\' not in text:
+        return text
+    return re.sub(r'\\[0-9]{3}', lambda match: chr(int(match.group(0)[1:])), text)
+
+# literal type : conversion
+literal_types = {"int": int_literal, "bool": bool_literal, "string": string_literal, "nil": nil_literal}
+
+# --max-call-depth, the call stack is allocated once for every run
+def set_max_call_depth(depth):
+    global max_call_depth, ipp_calls
+    max_call_depth = depth
+    ipp_calls = [0] * depth
+
+# global frame sized to the decoded program, no local frames, empty call stack
+def reset_frames():
+    global ipp_temporary_frame, temporary_frame_is_defined, ipp_local_frame, call_depth
+    ipp_global_frame[:] = [undefined] * len(ipp_global_names)
+    ipp_local_frames_stack.clear()
+    ipp_local_frame = None
+    ipp_temporary_frame = {}
+    temporary_frame_is_defined = False
+    call_depth = 0
+
+### CONTROL FLOW GRAPH ###
+
+class IPP_block:
+    def __init__(self, start, end, labels):
+        # program[start:end] of the linked program
+        self.start = start
+        self.end = end
+        self.labels = labels
+        self.successors = [] # (kind, block index)
+
+# opcodes with a label to jump to, the conditional ones fall through too
+jump_opcodes = ("JUMP", "JUMPIFEQ", "JUMPIFNEQ", "JUMPIFEQS", "JUMPIFNEQS", "CALL")
+
+# opcodes that end a basic block
+branch_opcodes = jump_opcodes + ("RETURN", "EXIT")
+
+# labels are dropped from the executed program and every branch gets the
+# index of its target, the blocks of the linked program are returned too
+def build_cfg(program):
+    # index in the linked program of each instruction, labels included
+    linked = []
+    linked_index = []
+    label_index = {}
+    for instruction in program:
+        linked_index.append(len(linked))
+        if instruction.opcode == 'LABEL':
+            label_index[instruction.arguments[0].value] = len(linked)
+        else:
+            linked.append(instruction)
+
+    # jump targets
+    for instruction in linked:
+        if instruction.opcode in jump_opcodes:
+            instruction.target = label_index[instruction.arguments[0].value]
+
+    # tail calls, the RETURN after them would only pop what they pushed
+    for index, instruction in enumerate(linked[:-1]):
+        if instruction.opcode == "CALL" and linked[index + 1].opcode == "RETURN":
+            instruction.handler = handle_case_tail_call
+
+    # leaders : labels of the block
+    leaders = {0: []}
+    for label, index in label_index.items():
+        leaders.setdefault(index, []).append(label)
+    for index, instruction in enumerate(linked):
+        if instruction.opcode in branch_opcodes:
+            leaders.setdefault(index + 1, [])
+
+    # blocks
+    starts = sorted(index for index in leaders if index < len(linked))
+    block_of = {}
+    blocks = []
+    for number, start in enumerate(starts):
+        end = starts[number + 1] if number + 1 < len(starts) else len(linked)
+        block_of[start] = number
+        blocks.append(IPP_block(start, end, leaders[start]))
+
+    # edges
+    for block in blocks:
+        last = linked[block.end - 1]
+        if last.opcode in jump_opcodes and last.target in block_of:
+            kind = "call" if last.opcode == "CALL" else "jump"
+            block.successors.append((kind, block_of[last.target]))
+        if last.opcode not in ("JUMP", "RETURN", "EXIT") and block.end in block_of:
+            kind = "return" if last.opcode == "CALL" else "fallthrough"
+            block.successors.append((kind, block_of[block.end]))
+
+    return linked, blocks
+
+# control flow graph as JSON for tooling
+def dump_cfg(program, blocks, target):
+    import json
+    cfg = {"blocks": [{
+        "id": number,
+        "labels": block.labels,
+        "orders": [int(instruction.order) for instruction in program[block.start:block.end]],
+        "opcodes": [instruction.opcode for instruction in program[block.start:block.end]],
+        "successors": [{"kind": kind, "block": successor} for kind, successor in block.successors],
+    } for number, block in enumerate(blocks)]}
+    json.dump(cfg, target, indent=1)
+    target.write('\n')
+
+### OPTIMIZER ###
+
+# superinstructions replace the handler of the first instruction of a
+# pattern, the other instructions keep their handlers, so a jump into the
+# middle of a pattern still runs correctly
+
+# case pushs (symb) + pops (var)
+def handle_fused_pushs_pops(instruction):
+    global instruction_order
+    variable_value_assignment(instruction.fused[0].arguments[0], return_symbol_value(instruction.arguments[0]))
     instruction_order += 1
 
-### EXIT ###
-exit(0)
+# case defvar (var) + move (var) (symb)
+def handle_fused_defvar_move(instruction):
+    global instruction_order
+    var1 = instruction.arguments[0]
+    slots = variable_frame(var1)
+    if var1.frame == 'GF':
+        if slots[var1.slot] is not undefined:
+            exit(52)
+    elif var1.slot in slots:
+        exit(52)
+    slots[var1.slot] = uninitialized
+    slots[var1.slot] = return_symbol_value(instruction.fused[0].arguments[1])
+    instruction_order += 1
+
+# case add (var) (symb) (symb) + jumpifneq (label) (symb) (symb)
+def handle_fused_add_jumpifneq(instruction):
+    global instruction_order
+
+    # add
+    arguments = instruction.arguments
+    symb1 = return_symbol_value(arguments[1])
+    symb2 = return_symbol_value(arguments[2])
+    if type(symb1) is not int or type(symb2) is not int:
+        exit(53)
+    variable_value_assignment(arguments[0], symb1 + symb2)
+
+    # jumpifneq
+    jump = instruction.fused[0]
+    symb1 = return_symbol_value(jump.arguments[1])
+    symb2 = return_symbol_value(jump.arguments[2])
+    check_comparable(symb1, symb2)
+    if symb1 != symb2:
+        instruction_order = jump.target
+    else:
+        instruction_order += 1
+
+# case createframe + pushframe + call (label)
+def handle_fused_call_frame(instruction):
+    global instruction_order, temporary_frame_is_defined, ipp_local_frame
+    handle_case_createframe(instruction)
+    ipp_local_frame = ipp_temporary_frame
+    ipp_local_frames_stack.append(ipp_local_frame)
+    temporary_frame_is_defined = False
+    instruction_order += 2
+    instruction.fused[1].handler(instruction.fused[1])
+
+# operands are checked by verify_instruction
+def fusable_always(window):
+    return True
+
+def fusable_defvar_move(window):
+    defvar, move = window
+    return move.arguments[0].value == defvar.arguments[0].value
+
+# (name, opcodes, check, handler)
+ipp_superinstructions = [
+    ("PUSHS+POPS", ("PUSHS", "POPS"), fusable_always, handle_fused_pushs_pops),
+    ("DEFVAR+MOVE", ("DEFVAR", "MOVE"), fusable_defvar_move, handle_fused_defvar_move),
+    ("ADD+JUMPIFNEQ", ("ADD", "JUMPIFNEQ"), fusable_always, handle_fused_add_jumpifneq),
+    ("CREATEFRAME+PUSHFRAME+CALL", ("CREATEFRAME", "PUSHFRAME", "CALL"), fusable_always, handle_fused_call_frame),
+]
+
+# name : [fused sites, executions], executions are counted with --opt-stats
+ipp_optimizer_stats = {}
+
+# peephole pass over the decoded program
+def optimize_program(program, opt_level, count_hits=False):
+    ipp_optimizer_stats.clear()
+    for name, _, _, _ in ipp_superinstructions:
+        ipp_optimizer_stats[name] = [0, 0]
+    if opt_level < 1:
+        return program
+
+    index = 0
+    while index < len(program):
+        for name, opcodes, fusable, handler in ipp_superinstructions:
+            window = program[index:index + len(opcodes)]
+            if tuple(instruction.opcode for instruction in window) == opcodes and fusable(window):
+                first = window[0]
+                first.fused = window[1:]
+                first.handler = counted_handler(name, handler) if count_hits else handler
+                ipp_optimizer_stats[name][0] += 1
+                index += len(opcodes)
+                break
+        else:
+            index += 1
+
+    return program
+
+def counted_handler(name, handler):
+    counter = ipp_optimizer_stats[name]
+    def counting(instruction):
+        counter[1] += 1
+        handler(instruction)
+    return counting
+
+def print_optimizer_stats():
+    for name, (sites, hits) in ipp_optimizer_stats.items():
+        print(f"{name}: sites={sites} hits={hits}", file=sys.stderr)
+
+### INTERPRETER ###
+
+# dispatch loop over linked program
+# instruction_order is the index of the next instruction,
+# handlers that jump set it to the index of their target
+def run_program(program):
+    global instruction_order, ipp_program
+    ipp_program = program
+    reset_frames()
+    instruction_order = 0
+    program_length = len(program)
+    while instruction_order < program_length:
+        instruction = program[instruction_order]
+        instruction_order += 1
+        instruction.handler(instruction)
+
+### LIMITS ###
+
+# --max-steps, --timeout and --max-memory: run_program_limited runs the
+# program in chunks of limit_check_interval instructions and checks the
+# limits between them, a superinstruction counts as one step
+max_steps = None
+time_limit = None # seconds
+max_memory = None # bytes
+limit_check_interval = 10000
+
+# exit codes and summaries of the limits, --max-call-depth is checked by CALL
+limit_exit_codes = {"--max-steps": 60, "--timeout": 61, "--max-memory": 62, "--max-call-depth": 63}
+limit_steps = 0
+limit_start = 0.0
+
+# --checkpoint file and the steps between two snapshots, written by the
+# checkpoint module
+checkpoint_path = None
+checkpoint_every = 10000000
+
+# raised by the instruction after the end of the program
+class IPP_program_end(BaseException):
+    pass
+
+def handle_program_end(instruction):
+    raise IPP_program_end()
+
+program_end = IPP_instruction("", "END")
+program_end.handler = handle_program_end
+
+def limits_enabled():
+    return max_steps is not None or time_limit is not None or max_memory is not None
+
+# peak resident memory in bytes
+def peak_memory():
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+def limit_exceeded(limit):
+    print("Limit exceeded:", limit, file=sys.stderr)
+    print("Steps:", limit_steps, file=sys.stderr)
+    print("Time:", f"{time.monotonic() - limit_start:.3f} s", file=sys.stderr)
+    print("Memory:", f"{peak_memory() / (1 << 20):.1f} MB", file=sys.stderr)
+    if instruction_order < len(ipp_program):
+        print("Stopped before:", ipp_program[instruction_order].order, file=sys.stderr)
+    exit(limit_exit_codes[limit])
+
+def check_limits():
+    if time_limit is not None and time.monotonic() - limit_start >= time_limit:
+        limit_exceeded("--timeout")
+    if max_memory is not None and peak_memory() > max_memory:
+        limit_exceeded("--max-memory")
+
+# run_program with limits and checkpoints, the program end is an instruction
+# so the inner loop does not compare instruction_order with the program length
+# a superinstruction costs a step for every instruction it fused, so the
+# limits stop at the same instruction at every --opt-level
+# resume is the state of a read checkpoint
+def run_program_limited(program, resume=None):
+    global instruction_order, ipp_program, limit_steps, limit_start
+    ipp_program = program
+    reset_frames()
+    instruction_order = 0
+    limit_steps = 0
+    if resume is not None or checkpoint_path is not None:
+        import checkpoint
+    if resume is not None:
+        checkpoint.restore_checkpoint(resume)
+        limit_steps = resume["steps"]
+    if checkpoint_path is not None:
+        fingerprint = checkpoint.program_fingerprint(program)
+        next_checkpoint = limit_steps + checkpoint_every
+    program_length = len(program)
+    costs = [1 if instruction.fused is None else 1 + len(instruction.fused) for instruction in program] + [0]
+    max_cost = max(costs)
+    program = program + [program_end]
+    limit_start = time.monotonic()
+
+    # allocations beyond the ceiling fail between two checks
+    if max_memory is not None:
+        import resource
+        _, hard = resource.getrlimit(resource.RLIMIT_DATA)
+        resource.setrlimit(resource.RLIMIT_DATA, (max_memory if hard == resource.RLIM_INFINITY else min(max_memory, hard), hard))
+
+    steps = limit_steps
+    index = cost = 0
+    try:
+        while True:
+            count = limit_check_interval
+            if checkpoint_path is not None:
+                if limit_steps >= next_checkpoint:
+                    checkpoint.write_checkpoint(fingerprint, limit_steps)
+                    next_checkpoint = limit_steps + checkpoint_every
+                count = min(count, next_checkpoint - limit_steps)
+            if max_steps is not None:
+                count = min(count, max_steps - limit_steps)
+                if count == 0:
+                    if instruction_order < program_length:
+                        limit_exceeded("--max-steps")
+                    return
+            end = steps + count
+            # no superinstruction reaches past the end of the chunk
+            safe_end = end - max_cost + 1
+            while steps < safe_end:
+                index = instruction_order
+                instruction = program[index]
+                cost = costs[index]
+                instruction_order = index + 1
+                steps += cost
+                instruction.handler(instruction)
+            while steps < end:
+                index = instruction_order
+                instruction = program[index]
+                cost = costs[index]
+                instruction_order = index + 1
+                if steps + cost > end:
+                    # superinstruction across the end of the chunk, its first
+                    # instruction runs alone and the fused ones after it
+                    cost = 1
+                    steps += 1
+                    ipp_handlers[instruction.opcode](instruction)
+                else:
+                    steps += cost
+                    instruction.handler(instruction)
+            limit_steps = steps
+            check_limits()
+    except IPP_program_end:
+        limit_steps = steps
+    except MemoryError:
+        if max_memory is None:
+            raise
+        limit_steps = steps - cost
+        instruction_order = index
+        limit_exceeded("--max-memory")
+
+### LIBRARY ###
+
+# embedding without the command line, one run at a time per process
+#   interpreter = Interpreter.load(xml_bytes)
+#   exit_code = interpreter.run(input_bytes, output_file)
+# exit codes are returned, the host process keeps running
+
+# load error of Interpreter.load with its exit code
+class IPP_error(Exception):
+    def __init__(self, exit_code):
+        super().__init__(f"exit code {exit_code}")
+        self.exit_code = exit_code
+
+# exit code of a SystemExit the way the interpreter process would report it
+def exit_status(error):
+    if error.code is None:
+        return 0
+    if isinstance(error.code, int):
+        return error.code
+    return 1
+
+class Interpreter:
+    __slots__ = ('program', 'global_names', 'local_names')
+    def __init__(self, program, global_names, local_names):
+        # linked and optimized program, names it was decoded with
+        self.program = program
+        self.global_names = global_names
+        self.local_names = local_names
+
+    # decoded once, run any number of times
+    @classmethod
+    def load(cls, xml_bytes, opt_level=1):
+        try:
+            program, _ = build_cfg(load_program(io.BytesIO(xml_bytes)))
+        except SystemExit as error:
+            raise IPP_error(exit_status(error)) from None
+        program = optimize_program(program, opt_level)
+        return cls(program, dict(ipp_global_names), dict(ipp_local_names))
+
+    # input is bytes, str or a binary file, None reads stdin,
+    # output is a binary file, None writes stdout
+    def run(self, input=b'', output=None):
+        global input_reader, input_file, output_file
+        saved = (input_reader, input_file, output_file)
+        if isinstance(input, str):
+            input = input.encode('utf-8')
+        input_reader = io.BytesIO(input) if isinstance(input, bytes) else input
+        input_file = None
+        output_file = output
+
+        # shared structures are cleared in place, frames and the call stack
+        # are reset by run_program
+        ipp_global_names.clear()
+        ipp_global_names.update(self.global_names)
+        ipp_local_names.clear()
+        ipp_local_names.update(self.local_names)
+        output_buffer.clear()
+        data_stack.clear()
+        try:
+            run_program(self.program)
+            return 0
+        except SystemExit as error:
+            return exit_status(error)
+        finally:
+            flush_output()
+            input_reader, input_file, output_file = saved
+
+### ARGUMENT PARSING ###
+
+if __name__ == '__main__':
+    # the modules of the optional modes import this script as interpret and
+    # share its state, not a second copy of it
+    sys.modules['interpret'] = sys.modules['__main__']
+
+    # arguments of program
+    argument_parser = argparse.ArgumentParser()
+    argument_parser.add_argument('--source', metavar='file', help='Path to source file?')
+    argument_parser.add_argument('--input', metavar='file', help='Path to input file?')
+    argument_parser.add_argument('--cache-dir', metavar='dir', help='Directory of compiled programs?')
+    argument_parser.add_argument('--output', metavar='file', help='Path to output file?')
+    argument_parser.add_argument('--opt-level', metavar='level', type=int, default=1, help='0 disables superinstructions?')
+    argument_parser.add_argument('--opt-stats', action='store_true', help='Superinstruction statistics to stderr?')
+    argument_parser.add_argument('--dump-cfg', action='store_true', help='Print control flow graph as JSON and exit?')
+    argument_parser.add_argument('--profile', metavar='file', help='Path to JSON profile report?')
+    argument_parser.add_argument('--trace', metavar='file', help='Path to binary execution trace?')
+    argument_parser.add_argument('--engine', choices=('interpreted', 'compiled'), default='interpreted', help='Dispatch loop or program compiled to Python?')
+    argument_parser.add_argument('--batch', metavar='path', help='Directory or manifest of programs to run in worker processes?')
+    argument_parser.add_argument('--workers', metavar='n', type=int, help='Worker processes of --batch, --serve and --test, CPU count by default?')
+    argument_parser.add_argument('--results', metavar='file', default='results.jsonl', help='JSON lines results of --batch?')
+    argument_parser.add_argument('--test', metavar='dir', help='Conformance corpus of .src, .in, .out and .rc files to check?')
+    argument_parser.add_argument('--report', metavar='file', help='JUnit XML (.xml) or JSON report of --test?')
+    argument_parser.add_argument('--test-timeout', metavar='seconds', type=float, default=10.0, help='Time limit of one --test program?')
+    argument_parser.add_argument('--slowest', metavar='n', type=int, default=10, help='Slowest tests listed by --test?')
+    argument_parser.add_argument('--serve', metavar='socket', help='Serve requests on Unix domain socket?')
+    argument_parser.add_argument('--request-timeout', metavar='seconds', type=float, default=10.0, help='Default time limit of --serve request, time limit of --batch program?')
+    argument_parser.add_argument('--max-call-depth', metavar='n', type=int, default=max_call_depth, help='Call stack size, a deeper CALL exits with 63?')
+    argument_parser.add_argument('--max-steps', metavar='n', type=int, help='Instruction budget, exits with 60 when used up?')
+    argument_parser.add_argument('--timeout', metavar='seconds', type=float, help='Run time limit, exits with 61?')
+    argument_parser.add_argument('--max-memory', metavar='MB', type=float, help='Memory ceiling, exits with 62?')
+    argument_parser.add_argument('--checkpoint', metavar='file', help='Path to snapshot of the running program?')
+    argument_parser.add_argument('--checkpoint-every', metavar='n', type=int, default=checkpoint_every, help='Steps between two snapshots?')
+    argument_parser.add_argument('--resume', metavar='file', help='Continue from snapshot of --checkpoint?')
+    program_args = argument_parser.parse_args()
+
+    # call stack : allocated before workers are started
+    if program_args.max_call_depth < 1:
+        argument_parser.error('--max-call-depth must be positive')
+    if program_args.max_call_depth != max_call_depth:
+        set_max_call_depth(program_args.max_call_depth)
+
+    # serve : runs until interrupted
+    if program_args.serve:
+        if os.path.lexists(program_args.serve) and not stat.S_ISSOCK(os.lstat(program_args.serve).st_mode):
+            argument_parser.error(f"Serve: {program_args.serve} exists and is not a socket")
+        from server import run_server
+        run_server(program_args.serve, program_args.workers, program_args.request_timeout, program_args.opt_level)
+        exit(0)
+
+    # batch : programs and their inputs are listed by the directory or manifest
+    if program_args.batch:
+        if not os.path.exists(program_args.batch):
+            argument_parser.error(f"Batch: {program_args.batch} does not exist")
+        if program_args.request_timeout <= 0:
+            argument_parser.error('--request-timeout must be positive')
+        from batch import run_batch
+        run_batch(program_args.batch, program_args.workers, program_args.results, program_args.opt_level, program_args.request_timeout)
+        exit(0)
+
+    # test : exits with 1 when a test fails
+    if program_args.test:
+        if not os.path.isdir(program_args.test):
+            argument_parser.error(f"Test: {program_args.test} is not a directory")
+        if program_args.test_timeout <= 0:
+            argument_parser.error('--test-timeout must be positive')
+        from conformance import run_tests
+        exit(run_tests(program_args.test, program_args.workers, program_args.report, program_args.opt_level,
+            program_args.test_timeout, max(0, program_args.slowest)))
+
+    # mandatory argument source or input
+    if not (program_args.source or program_args.input):
+        argument_parser.error('No source file')
+
+    # source : file does not exist
+    if program_args.source and not os.path.isfile(program_args.source):
+        argument_parser.error(f"Source: {program_args.source} does not exist")
+
+    # input : file does not exist
+    if program_args.input and not os.path.isfile(program_args.input):
+        argument_parser.error(f"Input: {program_args.input} does not exist")
+
+    # compiled engine : no per-instruction hooks
+    if program_args.engine == 'compiled' and (program_args.profile or program_args.trace):
+        argument_parser.error('--profile and --trace need --engine=interpreted')
+
+    # limits : checked by their own dispatch loop
+    for limit in ('max_steps', 'timeout', 'max_memory'):
+        if getattr(program_args, limit) is not None and getattr(program_args, limit) <= 0:
+            argument_parser.error(f"--{limit.replace('_', '-')} must be positive")
+    max_steps = program_args.max_steps
+    time_limit = program_args.timeout
+    max_memory = int(program_args.max_memory * (1 << 20)) if program_args.max_memory is not None else None
+    if limits_enabled() and (program_args.engine == 'compiled' or program_args.profile or program_args.trace):
+        argument_parser.error('--max-steps, --timeout and --max-memory need the plain dispatch loop')
+
+    # checkpoint and resume : taken between the chunks of the limited dispatch loop
+    if program_args.checkpoint_every < 1:
+        argument_parser.error('--checkpoint-every must be positive')
+    if program_args.resume and not os.path.isfile(program_args.resume):
+        argument_parser.error(f"Resume: {program_args.resume} does not exist")
+    checkpoint_path = program_args.checkpoint
+    checkpoint_every = program_args.checkpoint_every
+    if (checkpoint_path or program_args.resume) and (program_args.engine == 'compiled' or program_args.profile or program_args.trace):
+        argument_parser.error('--checkpoint and --resume need the plain dispatch loop')
+
+    # input : stdin by default
+    if program_args.input:
+        open_input(program_args.input)
+
+    # output : stdout by default, a resumed run opens it after the checkpoint is read
+    if program_args.output and not program_args.resume:
+        open_output(program_args.output)
+
+    # source from stdin when only input is given
+    source = program_args.source or sys.stdin.buffer
+    try:
+        if program_args.cache_dir:
+            from program_cache import load_program_cached
+            program = load_program_cached(source, program_args.cache_dir)
+        else:
+            program = load_program(source)
+        program, blocks = build_cfg(program)
+        if program_args.dump_cfg:
+            dump_cfg(program, blocks, sys.stdout)
+            exit(0)
+        if program_args.engine == 'compiled':
+            from compiled_engine import run_compiled
+            run_compiled(program, blocks)
+            exit(0)
+        program = optimize_program(program, program_args.opt_level, program_args.opt_stats)
+        if program_args.profile:
+            from profiler import run_program_profiled
+            run_program_profiled(program)
+        elif program_args.trace:
+            from tracer import run_program_traced
+            run_program_traced(program, program_args.trace)
+        elif program_args.resume:
+            from checkpoint import read_checkpoint, program_fingerprint, skip_input
+            resume = read_checkpoint(program_args.resume, program_fingerprint(program))
+            if resume is None:
+                argument_parser.error(f"Resume: {program_args.resume} is not a checkpoint of this program")
+            if len(resume["calls"]) > max_call_depth:
+                argument_parser.error(f"Resume: {program_args.resume} needs --max-call-depth of at least {len(resume['calls'])}")
+            # input and output continue where the checkpoint was taken, stdout is not rewound
+            skip_input(resume["input"])
+            if program_args.output:
+                # the output file holds what was written before the checkpoint
+                if resume["output"] and not os.path.isfile(program_args.output):
+                    argument_parser.error(f"Output: {program_args.output} does not exist, resume continues it")
+                if resume["output"] and os.path.getsize(program_args.output) < resume["output"]:
+                    argument_parser.error(f"Output: {program_args.output} is shorter than the output of {program_args.resume}")
+                open_output(program_args.output, resume["output"])
+            run_program_limited(program, resume)
+        elif limits_enabled() or checkpoint_path:
+            run_program_limited(program)
+        else:
+            run_program(program)
+    finally:
+        # normal end, EXIT and error codes
+        flush_output()
+        if checkpoint_path:
+            from checkpoint import finish_checkpoint
+            finish_checkpoint()
+        if program_args.profile:
+            from profiler import write_profile
+            write_profile(program_args.profile)
+        if program_args.opt_stats:
+            print_optimizer_stats()
+
+    ### EXIT ###
+    exit(0)
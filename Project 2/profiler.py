@@ -0,0 +1,117 @@
+# Author: Baturov Illia (xbatur00)
+#
+# --profile of interpret.py. Imported by interpret.py only in this mode.
+
+import json
+import time
+
+import interpret
+from interpret import handle_case_tail_call, reset_frames
+
+### PROFILER ###
+
+# --profile runs this copy of the dispatch loop, run_program stays as it is,
+# instruction_order and call_depth are the globals of the interpreter
+ipp_profile = None
+
+def run_program_profiled(program):
+    global ipp_profile
+    interpret.ipp_program = program
+    reset_frames()
+    interpret.instruction_order = 0
+    program_length = len(program)
+
+    # opcode : [count, time], hits per index, a superinstruction hits every
+    # instruction it fused, label : [calls, inclusive, exclusive]
+    opcodes = {}
+    hits = [0] * program_length
+    labels = {}
+    # active calls : [label, start, time of nested calls, entered by a tail call]
+    calls = [["", time.perf_counter(), 0.0, False]]
+    active = {}
+    ipp_profile = (program, opcodes, hits, labels, calls)
+    tail_calls = {index for index, instruction in enumerate(program)
+        if (instruction.fused[-1] if instruction.fused else instruction).handler is handle_case_tail_call}
+
+    clock = time.perf_counter
+    while interpret.instruction_order < program_length:
+        index = interpret.instruction_order
+        instruction = program[index]
+        interpret.instruction_order = index + 1
+        # counted first, EXIT and errors end inside the handler
+        name = profile_name(instruction)
+        if name not in opcodes:
+            opcodes[name] = [0, 0.0]
+        opcodes[name][0] += 1
+        hits[index] += 1
+        # the fused instructions follow the head and run with it
+        if instruction.fused is not None:
+            for fused_index in range(index + 1, index + 1 + len(instruction.fused)):
+                hits[fused_index] += 1
+
+        depth = interpret.call_depth
+        start = clock()
+        instruction.handler(instruction)
+        end = clock()
+        opcodes[name][1] += end - start
+
+        # entered or left a subroutine
+        call_depth = interpret.call_depth
+        if call_depth > depth or index in tail_calls:
+            label = call_label(instruction)
+            calls.append([label, end, 0.0, call_depth == depth])
+            active[label] = active.get(label, 0) + 1
+            if label not in labels:
+                labels[label] = [0, 0.0, 0.0]
+            labels[label][0] += 1
+        elif call_depth < depth and len(calls) > 1:
+            leave_call(calls, active, labels, end)
+
+# closes the innermost call and the calls it was tail called from,
+# recursive calls count once in inclusive time
+def leave_call(calls, active, labels, end):
+    tail = True
+    while tail and len(calls) > 1:
+        label, start, nested, tail = calls.pop()
+        elapsed = end - start
+        active[label] -= 1
+        if active[label] == 0:
+            labels[label][1] += elapsed
+        labels[label][2] += elapsed - nested
+        calls[-1][2] += elapsed
+
+# opcode, or the opcodes of a superinstruction
+def profile_name(instruction):
+    if instruction.fused is None:
+        return instruction.opcode
+    return "+".join([instruction.opcode] + [fused.opcode for fused in instruction.fused])
+
+def call_label(instruction):
+    if instruction.fused is not None:
+        instruction = instruction.fused[-1]
+    return instruction.arguments[0].value
+
+# JSON report, calls still active at the end are closed
+def write_profile(path):
+    if ipp_profile is None:
+        return
+    program, opcodes, hits, labels, calls = ipp_profile
+    end = time.perf_counter()
+    active = {}
+    for label, _, _, _ in calls[1:]:
+        active[label] = active.get(label, 0) + 1
+    while len(calls) > 1:
+        leave_call(calls, active, labels, end)
+
+    report = {
+        "instructions": sum(hits),
+        "time": end - calls[0][1],
+        "opcodes": {name: {"count": count, "time": elapsed}
+            for name, (count, elapsed) in sorted(opcodes.items(), key=lambda item: -item[1][1])},
+        "orders": {program[index].order: count for index, count in enumerate(hits) if count},
+        "labels": {label: {"calls": count, "inclusive": inclusive, "exclusive": exclusive}
+            for label, (count, inclusive, exclusive) in sorted(labels.items(), key=lambda item: -item[1][1])},
+    }
+    with open(path, 'w') as profile_file:
+        json.dump(report, profile_file, indent=1)
+        profile_file.write('\n')
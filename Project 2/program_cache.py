@@ -0,0 +1,224 @@
+# Author: Baturov Illia (xbatur00)
+#
+# --cache-dir of interpret.py: decoded programs stored as .ippc files and
+# mapped back without parsing the XML. Imported by interpret.py only when
+# the option is given.
+
+import io
+import os
+import mmap
+import struct
+import hashlib
+
+import interpret
+from interpret import IPP_argument, IPP_instruction, nil, literal_types, ipp_handlers, ipp_labels
+from interpret import ipp_global_names, ipp_local_names, load_label, load_program
+
+### PROGRAM CACHE ###
+
+# .ippc file: header, string table, variable names, instructions
+#   header       b'IPPC', format, interpreter fingerprint, four counts
+#   string       u32 length, utf-8 bytes
+#   names        u32 string index per slot, global then local
+#   instruction  u32 opcode string, u8 argument count, arguments
+#   argument     u8 kind, payload of the kind
+cache_magic = b'IPPC'
+cache_format = 2
+cache_header = struct.Struct('<4sI32sIIII')
+cache_u8 = struct.Struct('<B')
+cache_u32 = struct.Struct('<I')
+cache_i64 = struct.Struct('<q')
+cache_instruction = struct.Struct('<IB')
+
+# argument kinds, var kinds are followed by the slot
+cache_kind_gf = 0
+cache_kind_lf = 1
+cache_kind_tf = 2
+cache_kind_int = 3
+cache_kind_big_int = 4
+cache_kind_true = 5
+cache_kind_false = 6
+cache_kind_nil = 7
+cache_kind_string = 8
+cache_kind_other = 9
+
+# no string, for arguments without text
+cache_none = 0xFFFFFFFF
+
+cache_frame_kinds = {'GF': cache_kind_gf, 'LF': cache_kind_lf, 'TF': cache_kind_tf}
+
+# hash of interpret.py and this file, any change of the interpreter invalidates the cache
+def interpreter_fingerprint():
+    digest = hashlib.sha256()
+    for path in (interpret.__file__, __file__):
+        with open(os.path.abspath(path), 'rb') as interpreter_file:
+            digest.update(interpreter_file.read())
+    return digest.digest()
+
+# cache file of the source content and the interpreter version
+def cache_path(cache_dir, source_data, fingerprint):
+    key = hashlib.sha256(fingerprint + source_data).hexdigest()
+    return os.path.join(cache_dir, key + '.ippc')
+
+# decoded program, or the XML loader when there is no valid cache file
+def load_program_cached(source, cache_dir):
+    if isinstance(source, str):
+        with open(source, 'rb') as source_file:
+            source_data = source_file.read()
+    else:
+        source_data = source.read()
+
+    fingerprint = interpreter_fingerprint()
+    path = cache_path(cache_dir, source_data, fingerprint)
+    program = load_cache_file(path, fingerprint)
+    if program is None:
+        program = load_program(io.BytesIO(source_data))
+        store_cache_file(path, fingerprint, program)
+    return program
+
+def store_cache_file(path, fingerprint, program):
+    strings = {}
+    def string_index(text):
+        if text is None:
+            return cache_none
+        if text not in strings:
+            strings[text] = len(strings)
+        return strings[text]
+
+    # instructions first, they fill the string table
+    body = bytearray()
+    for instruction in program:
+        body += cache_instruction.pack(string_index(instruction.opcode), len(instruction.arguments))
+        for argument in instruction.arguments:
+            value = argument.value
+            if argument.frame is not None:
+                body += cache_u8.pack(cache_frame_kinds[argument.frame]) + cache_u32.pack(argument.slot)
+            elif argument.type not in literal_types:
+                body += cache_u8.pack(cache_kind_other)
+                body += cache_u32.pack(string_index(argument.type)) + cache_u32.pack(string_index(value))
+            elif value is nil:
+                body += cache_u8.pack(cache_kind_nil)
+            elif value is True:
+                body += cache_u8.pack(cache_kind_true)
+            elif value is False:
+                body += cache_u8.pack(cache_kind_false)
+            elif type(value) is str:
+                body += cache_u8.pack(cache_kind_string) + cache_u32.pack(string_index(value))
+            elif -2**63 <= value < 2**63:
+                body += cache_u8.pack(cache_kind_int) + cache_i64.pack(value)
+            else:
+                body += cache_u8.pack(cache_kind_big_int) + cache_u32.pack(string_index(str(value)))
+
+    names = bytearray()
+    for frame_names in (ipp_global_names, ipp_local_names):
+        for name in frame_names:
+            names += cache_u32.pack(string_index(name))
+
+    data = bytearray(cache_header.pack(cache_magic, cache_format, fingerprint,
+        len(strings), len(ipp_global_names), len(ipp_local_names), len(program)))
+    for text in strings:
+        encoded = text.encode('utf-8', 'surrogatepass')
+        data += cache_u32.pack(len(encoded)) + encoded
+    data += names
+    data += body
+
+    # written aside and renamed, readers never see a partial file
+    try:
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        temporary_path = f"{path}.{os.getpid()}.tmp"
+        with open(temporary_path, 'wb') as cache_file:
+            cache_file.write(data)
+        os.replace(temporary_path, path)
+    except OSError:
+        pass
+
+# decoded program from the cache file, None when missing or stale
+def load_cache_file(path, fingerprint):
+    try:
+        with open(path, 'rb') as cache_file:
+            data = mmap.mmap(cache_file.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+
+    with data:
+        try:
+            return decode_cache_data(data, fingerprint)
+        except (struct.error, IndexError, KeyError, UnicodeDecodeError):
+            return None
+
+def decode_cache_data(data, fingerprint):
+    magic, file_format, file_fingerprint, string_count, global_count, local_count, instruction_count = cache_header.unpack_from(data, 0)
+    if magic != cache_magic or file_format != cache_format or file_fingerprint != fingerprint:
+        return None
+    position = cache_header.size
+
+    # string table
+    strings = []
+    for _ in range(string_count):
+        (length,) = cache_u32.unpack_from(data, position)
+        position += 4
+        strings.append(str(data[position:position + length], 'utf-8', 'surrogatepass'))
+        position += length
+    strings_or_none = lambda index: None if index == cache_none else strings[index]
+
+    # variable names
+    ipp_labels.clear()
+    ipp_global_names.clear()
+    ipp_local_names.clear()
+    for frame_names, count in ((ipp_global_names, global_count), (ipp_local_names, local_count)):
+        for slot in range(count):
+            (index,) = cache_u32.unpack_from(data, position)
+            position += 4
+            frame_names[strings[index]] = slot
+    global_by_slot = list(ipp_global_names)
+    local_by_slot = list(ipp_local_names)
+
+    # instructions, equal constants share one argument
+    program = []
+    constants = {}
+    for order_count in range(1, instruction_count + 1):
+        opcode_index, argument_count = cache_instruction.unpack_from(data, position)
+        position += cache_instruction.size
+        instruction = IPP_instruction(order=str(order_count), opcode=strings[opcode_index])
+        instruction.handler = ipp_handlers[instruction.opcode]
+        for _ in range(argument_count):
+            kind = data[position]
+            position += 1
+            if kind <= cache_kind_tf:
+                (slot,) = cache_u32.unpack_from(data, position)
+                position += 4
+                frame = ('GF', 'LF', 'TF')[kind]
+                name = global_by_slot[slot] if kind == cache_kind_gf else local_by_slot[slot]
+                argument = IPP_argument('var', frame + '@' + name)
+                argument.frame = frame
+                argument.slot = slot
+            elif kind == cache_kind_int:
+                (value,) = cache_i64.unpack_from(data, position)
+                position += 8
+                argument = IPP_argument('int', value)
+            elif kind == cache_kind_big_int:
+                (index,) = cache_u32.unpack_from(data, position)
+                position += 4
+                argument = IPP_argument('int', int(strings[index]))
+            elif kind == cache_kind_true:
+                argument = IPP_argument('bool', True)
+            elif kind == cache_kind_false:
+                argument = IPP_argument('bool', False)
+            elif kind == cache_kind_nil:
+                argument = IPP_argument('nil', nil)
+            elif kind == cache_kind_string:
+                (index,) = cache_u32.unpack_from(data, position)
+                position += 4
+                argument = IPP_argument('string', strings[index])
+            else:
+                arg_type, value = struct.unpack_from('<II', data, position)
+                position += 8
+                argument = IPP_argument(strings_or_none(arg_type), strings_or_none(value))
+            if cache_kind_int <= kind <= cache_kind_string:
+                argument = constants.setdefault((kind, argument.value), argument)
+            instruction.arguments.append(argument)
+        if instruction.opcode == 'LABEL':
+            load_label(instruction, order_count)
+        program.append(instruction)
+
+    return program
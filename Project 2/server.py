@@ -0,0 +1,184 @@
+# Author: Baturov Illia (xbatur00)
+#
+# --serve of interpret.py. Imported by interpret.py only in this mode.
+
+import os
+import sys
+import json
+import stat
+import time
+import hashlib
+
+from batch import IPP_timeout, request_timer, run_isolated
+
+### SERVER ###
+
+# --serve: requests over a Unix domain socket, one JSON object per line
+#   request   {"source": path} or {"xml": text}, optional "input" and "timeout"
+#   response  {"exit_code", "stdout", "stderr", "time"}
+#             or {"exit_code": null, "error": "timeout" | message}
+# requests run in pre-forked workers, every worker keeps its loaded interpreters
+
+class IPP_worker:
+    __slots__ = ('process', 'connection')
+    def __init__(self, process, connection):
+        self.process = process
+        self.connection = connection
+
+serve_workers = []
+serve_idle = [] # indices of workers waiting for a request
+serve_condition = None
+serve_context = None # multiprocessing fork context
+serve_timeout = 10.0
+serve_opt_level = 1
+
+def serve_worker(connection):
+    import signal
+    signal.signal(signal.SIGALRM, request_timer)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    programs = {}
+    while True:
+        try:
+            request = connection.recv()
+        except EOFError:
+            break
+        source_data, input_data, timeout = request
+        start = time.perf_counter()
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+        try:
+            output, errors, exit_code = run_isolated(source_data, input_data, serve_opt_level, programs)
+            response = {"exit_code": exit_code, "stdout": output.decode('utf-8', 'replace'), "stderr": errors}
+        except IPP_timeout:
+            response = {"exit_code": None, "error": "timeout"}
+        finally:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+        response["time"] = time.perf_counter() - start
+        connection.send(response)
+
+def start_worker():
+    connection, worker_connection = serve_context.Pipe()
+    process = serve_context.Process(target=serve_worker, args=(worker_connection,), daemon=True)
+    process.start()
+    worker_connection.close()
+    return IPP_worker(process, connection)
+
+# idle worker, the preferred one when it is idle so programs are decoded once
+def acquire_worker(preferred):
+    with serve_condition:
+        while not serve_idle:
+            serve_condition.wait()
+        index = preferred if preferred in serve_idle else serve_idle[0]
+        serve_idle.remove(index)
+        return index
+
+def release_worker(index):
+    with serve_condition:
+        serve_idle.append(index)
+        serve_condition.notify()
+
+# message of a malformed request, None when its fields have the right types
+def request_error(request):
+    if not isinstance(request, dict):
+        return "request is not an object"
+    for field in ("xml", "source", "input"):
+        if field in request and not isinstance(request[field], str):
+            return f"{field} is not a string"
+    if "timeout" in request:
+        timeout = request["timeout"]
+        if type(timeout) not in (int, float) or not 0 < timeout < float('inf'):
+            return "timeout is not a positive number"
+    return None
+
+def serve_request(request):
+    error = request_error(request)
+    if error is not None:
+        return {"exit_code": None, "error": f"bad request: {error}"}
+    if "xml" in request:
+        # lone surrogates of JSON escapes fail as XML, not here
+        source_data = request["xml"].encode('utf-8', 'surrogatepass')
+    elif "source" in request:
+        try:
+            with open(request["source"], 'rb') as source_file:
+                source_data = source_file.read()
+        except (OSError, ValueError) as error:
+            return {"exit_code": None, "error": str(error)}
+    else:
+        return {"exit_code": None, "error": "no source or xml"}
+    input_data = request.get("input", "").encode('utf-8', 'surrogatepass')
+    timeout = float(request.get("timeout", serve_timeout))
+
+    digest = hashlib.sha256(source_data).digest()
+    index = acquire_worker(int.from_bytes(digest[:4], 'little') % len(serve_workers))
+    worker = serve_workers[index]
+    replace = False
+    try:
+        worker.connection.send((source_data, input_data, timeout))
+        # the worker stops the program itself, a worker stuck past that is replaced
+        if worker.connection.poll(timeout + 1.0):
+            return worker.connection.recv()
+        response = {"exit_code": None, "error": "timeout"}
+        replace = True
+    except (EOFError, OSError):
+        response = {"exit_code": None, "error": "worker died"}
+        replace = True
+    finally:
+        if replace:
+            worker.process.kill()
+            worker.process.join()
+            serve_workers[index] = start_worker()
+        release_worker(index)
+    return response
+
+def serve_connection(client):
+    with client, client.makefile('rb') as requests, client.makefile('wb') as responses:
+        for line in requests:
+            try:
+                request = json.loads(line)
+            except ValueError as error:
+                response = {"exit_code": None, "error": f"bad request: {error}"}
+            else:
+                response = serve_request(request)
+            responses.write(json.dumps(response).encode('utf-8') + b'\n')
+            responses.flush()
+
+# socket of an earlier server, any other file at the path is kept
+def remove_socket(socket_path):
+    if os.path.lexists(socket_path) and stat.S_ISSOCK(os.lstat(socket_path).st_mode):
+        os.unlink(socket_path)
+
+def run_server(socket_path, workers, timeout, opt_level):
+    # only the server needs these, they cost every other run startup time
+    import socket
+    import signal
+    import threading
+    import multiprocessing
+    global serve_condition, serve_context, serve_timeout, serve_opt_level
+
+    serve_timeout = timeout
+    serve_opt_level = opt_level
+    serve_condition = threading.Condition()
+    serve_context = multiprocessing.get_context('fork')
+    # workers are forked warm, before any thread runs
+    for index in range(workers or os.cpu_count() or 1):
+        serve_workers.append(start_worker())
+        serve_idle.append(index)
+    # SIGTERM stops the server like ^C
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+
+    remove_socket(socket_path)
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(socket_path)
+    server.listen()
+    print(f"serving on {socket_path} with {len(serve_workers)} workers", file=sys.stderr)
+    try:
+        while True:
+            client, _ = server.accept()
+            threading.Thread(target=serve_connection, args=(client,), daemon=True).start()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        remove_socket(socket_path)
+        for worker in serve_workers:
+            worker.process.kill()
@@ -0,0 +1,170 @@
+# Differential harness of the test suite: runs a program in-process with
+# every engine of interpret.py and generates random programs for them.
+
+import io
+import os
+import sys
+import random
+import subprocess
+
+tests_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(tests_dir, '..'))
+sys.path.insert(0, os.path.join(tests_dir, '..', 'benchmarks'))
+import interpret
+import checkpoint
+from compiled_engine import run_compiled
+from workloads import Program_builder
+
+corpus_dir = os.path.join(tests_dir, 'corpus')
+interpret_path = os.path.join(tests_dir, '..', 'interpret.py')
+
+# dispatch loop without and with superinstructions, compiled engine and the
+# chunked loop of --max-steps, every one gives the same output and exit code
+engines = ('opt0', 'opt1', 'compiled', 'limited')
+
+### PROGRAMS ###
+
+# XML of instruction lines in the argument syntax of Program_builder,
+# "JUMP label:end", "MOVE GF@x int@1", "READ GF@x type:int"
+def program(*lines):
+    builder = Program_builder()
+    for line in lines:
+        builder.add(*line.split(' '))
+    return builder.xml().encode()
+
+# stems of the corpus, each with .src and the optional .in, .out and .rc
+def corpus_cases():
+    return sorted(name[:-4] for name in os.listdir(corpus_dir) if name.endswith('.src'))
+
+def read_case(stem, extension, default):
+    path = os.path.join(corpus_dir, stem + extension)
+    if not os.path.isfile(path):
+        return default
+    with open(path, 'rb') as case_file:
+        return case_file.read()
+
+### RUNNING ###
+
+def reset_io(input_data):
+    output = io.BytesIO()
+    interpret.output_file = output
+    interpret.output_buffer.clear()
+    interpret.output_flushed = 0
+    interpret.input_reader = io.BytesIO(input_data)
+    interpret.input_position = 0
+    interpret.data_stack.clear()
+    return output
+
+# (exit code, stdout bytes) of the program, max_steps stops the limited engine
+# running at opt_level, resume is a checkpoint state it continues from
+def run(xml, input_data=b'', engine='opt1', max_steps=None, resume=None, opt_level=1):
+    output = reset_io(input_data)
+    stderr, sys.stderr = sys.stderr, io.StringIO()
+    try:
+        program, blocks = interpret.build_cfg(interpret.load_program(io.BytesIO(xml)))
+        if engine == 'compiled':
+            run_compiled(program, blocks)
+        else:
+            program = interpret.optimize_program(program, {'opt0': 0, 'opt1': 1}.get(engine, opt_level))
+            if engine == 'limited':
+                interpret.max_steps = max_steps
+                if resume is not None:
+                    checkpoint.skip_input(resume["input"])
+                interpret.run_program_limited(program, resume)
+            else:
+                interpret.run_program(program)
+        exit_code = 0
+    except SystemExit as error:
+        exit_code = interpret.exit_status(error)
+    finally:
+        interpret.flush_output()
+        interpret.max_steps = None
+        sys.stderr = stderr
+    return exit_code, output.getvalue()
+
+# interpret.py with the arguments in a process, stdout and stderr are captured
+def run_process(*arguments, input_data=b'', timeout=60):
+    return subprocess.run([sys.executable, interpret_path, *arguments], input=input_data,
+        capture_output=True, timeout=timeout)
+
+### RANDOM PROGRAMS ###
+
+random_input = b'12\nab\ntrue\n'
+random_variables = ['GF@a', 'GF@b', 'GF@c', 'LF@x', 'LF@y', 'TF@x', 'TF@z']
+random_constants = ['int@0', 'int@1', 'int@-3', 'int@65', 'bool@true', 'bool@false', 'string@ab', 'string@', 'nil@nil', 'string@x']
+random_labels = ['l0', 'l1', 'l2']
+
+# short programs of every instruction group with errors of every kind,
+# loops may not end, the tests bound them with max_steps
+def random_program(seed):
+    generator = random.Random(seed)
+    symbol = lambda: generator.choice(random_variables + random_constants)
+    variable = lambda: generator.choice(random_variables)
+    label = lambda: 'label:' + generator.choice(random_labels)
+    builder = Program_builder()
+    for name in ('GF@a', 'GF@b'):
+        if generator.random() < 0.9:
+            builder.add('DEFVAR', name)
+    if generator.random() < 0.8:
+        builder.add('MOVE', 'GF@a', generator.choice(random_constants))
+    placed = set()
+    for _ in range(generator.randint(3, 25)):
+        kind = generator.random()
+        if kind < 0.35:
+            builder.add(generator.choice(['ADD', 'SUB', 'MUL', 'IDIV', 'LT', 'GT', 'EQ', 'AND', 'OR', 'CONCAT',
+                'GETCHAR', 'STRI2INT', 'SETCHAR']), variable(), symbol(), symbol())
+        elif kind < 0.55:
+            builder.add(generator.choice(['MOVE', 'NOT', 'STRLEN', 'INT2CHAR', 'TYPE']), variable(), symbol())
+        elif kind < 0.62:
+            builder.add('DEFVAR', variable())
+        elif kind < 0.68:
+            builder.add(generator.choice(['CREATEFRAME', 'PUSHFRAME', 'POPFRAME']))
+        elif kind < 0.73:
+            for _ in range(generator.randint(1, 3)):
+                builder.add('PUSHS', symbol())
+            if generator.random() < 0.7:
+                builder.add(generator.choice(['ADDS', 'SUBS', 'MULS', 'IDIVS', 'LTS', 'GTS', 'EQS', 'ANDS', 'ORS',
+                    'NOTS', 'INT2CHARS', 'STRI2INTS', 'CLEARS']))
+            if generator.random() < 0.3:
+                builder.add(generator.choice(['JUMPIFEQS', 'JUMPIFNEQS']), label())
+        elif kind < 0.78:
+            builder.add('POPS', variable())
+        elif kind < 0.83:
+            builder.add('WRITE', symbol())
+        elif kind < 0.87:
+            name = generator.choice(random_labels)
+            if name not in placed:
+                placed.add(name)
+                builder.add('LABEL', 'label:' + name)
+        elif kind < 0.92:
+            builder.add(generator.choice(['JUMPIFEQ', 'JUMPIFNEQ']), label(), symbol(), symbol())
+        elif kind < 0.94:
+            builder.add('CALL', label())
+        elif kind < 0.96:
+            builder.add('RETURN')
+        elif kind < 0.98:
+            builder.add('READ', variable(), 'type:' + generator.choice(['int', 'string', 'bool']))
+        else:
+            builder.add('EXIT', symbol())
+    for name in random_labels:
+        if name not in placed:
+            builder.add('LABEL', 'label:' + name)
+    return builder.xml().encode()
+
+# loops of the instructions the optimizer fuses, with a call through a frame
+def fusable_program(seed):
+    generator = random.Random(seed)
+    builder = Program_builder()
+    builder.add('DEFVAR', 'GF@i').add('MOVE', 'GF@i', 'int@0').add('LABEL', 'label:top')
+    for _ in range(generator.randint(1, 6)):
+        kind = generator.random()
+        if kind < 0.3:
+            builder.add('PUSHS', 'GF@i').add('POPS', 'GF@i')
+        elif kind < 0.6:
+            builder.add('CREATEFRAME').add('DEFVAR', 'TF@x').add('MOVE', 'TF@x', 'GF@i').add('PUSHFRAME').add('POPFRAME')
+        else:
+            builder.add('WRITE', 'GF@i')
+    builder.add('ADD', 'GF@i', 'GF@i', 'int@1').add('JUMPIFNEQ', 'label:top', 'GF@i', f'int@{generator.randint(2, 9)}')
+    builder.add('CREATEFRAME').add('PUSHFRAME').add('CALL', 'label:f').add('WRITE', 'string@end').add('EXIT', 'int@0')
+    builder.add('LABEL', 'label:f').add('POPFRAME').add('RETURN')
+    return builder.xml().encode()
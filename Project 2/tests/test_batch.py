@@ -0,0 +1,63 @@
+# --batch of interpret.py: programs of a directory or a manifest run in
+# worker processes, one JSON line of results per program.
+
+import os
+import json
+
+from harness import program, run_process
+
+# the number read plus one, a division by zero, an endless loop
+echo_program = program('DEFVAR GF@n', 'READ GF@n type:int', 'ADD GF@n GF@n int@1', 'WRITE GF@n')
+error_program = program('DEFVAR GF@n', 'WRITE string@before', 'IDIV GF@n int@1 int@0')
+endless_program = program('LABEL label:top', 'JUMP label:top')
+
+def write_file(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as written:
+        written.write(data)
+
+# (summary on stderr, results in the order of the programs)
+def run_batch(path, results_path, *arguments):
+    process = run_process('--batch', path, '--workers', '2', '--results', results_path, *arguments)
+    assert process.returncode == 0
+    with open(results_path) as results:
+        return process.stderr.decode(), [json.loads(line) for line in results]
+
+def test_batch_directory(tmp_path):
+    directory = os.path.join(tmp_path, 'programs')
+    write_file(os.path.join(directory, 'a.xml'), echo_program)
+    write_file(os.path.join(directory, 'a.in'), b'41\n')
+    write_file(os.path.join(directory, 'b.src'), error_program)
+    write_file(os.path.join(directory, 'c.xml'), program('WRITE string@c'))
+    write_file(os.path.join(directory, 'notes.txt'), b'not a program')
+    summary, results = run_batch(directory, os.path.join(tmp_path, 'results.jsonl'))
+    assert [(os.path.basename(result["source"]), result["exit_code"], result["stdout"]) for result in results] == [
+        ('a.xml', 0, '42'), ('b.src', 57, 'before'), ('c.xml', 0, 'c')]
+    assert results[0]["input"] == os.path.join(directory, 'a.in')
+    assert results[2]["input"] is None
+    assert "programs: 3 nonzero exit: 1 timeout: 0 workers: 2" in summary
+
+# paths relative to the manifest, comments and empty lines are skipped, a
+# program without input reads nil
+def test_batch_manifest(tmp_path):
+    write_file(os.path.join(tmp_path, 'programs', 'echo.xml'), echo_program)
+    write_file(os.path.join(tmp_path, 'inputs', 'one.in'), b'1\n')
+    write_file(os.path.join(tmp_path, 'inputs', 'two.in'), b'2\n')
+    manifest = os.path.join(tmp_path, 'manifest.tsv')
+    write_file(manifest, b'# source\tinput\nprograms/echo.xml\tinputs/one.in\n\nprograms/echo.xml\tinputs/two.in\n'
+        b'programs/echo.xml\n')
+    summary, results = run_batch(manifest, os.path.join(tmp_path, 'results.jsonl'))
+    assert [(result["input"], result["exit_code"], result["stdout"]) for result in results] == [
+        (os.path.join(tmp_path, 'inputs', 'one.in'), 0, '2'), (os.path.join(tmp_path, 'inputs', 'two.in'), 0, '3'),
+        (None, 53, '')]
+    assert "programs: 3 nonzero exit: 1 timeout: 0" in summary
+
+# a program over the time limit is stopped, the others still run
+def test_batch_timeout(tmp_path):
+    directory = os.path.join(tmp_path, 'programs')
+    write_file(os.path.join(directory, 'a.xml'), endless_program)
+    write_file(os.path.join(directory, 'b.xml'), error_program)
+    summary, results = run_batch(directory, os.path.join(tmp_path, 'results.jsonl'), '--request-timeout', '0.5')
+    assert (results[0]["exit_code"], results[0]["error"], results[0]["stdout"]) == (None, "timeout", '')
+    assert results[1]["exit_code"] == 57
+    assert "programs: 2 nonzero exit: 2 timeout: 1" in summary
@@ -0,0 +1,78 @@
+# --cache-dir of interpret.py: the cached program runs like the parsed one.
+
+import io
+import os
+
+import pytest
+
+import interpret
+import program_cache
+from harness import program, run_process
+
+# constants of every kind, one beyond 64 bits, variables of every frame
+cached_program = program('DEFVAR GF@a', 'MOVE GF@a int@100000000000000000000', 'MUL GF@a GF@a int@-1',
+    'WRITE GF@a', 'WRITE string@\\032ok\\010', 'CREATEFRAME', 'DEFVAR TF@b', 'MOVE TF@b bool@true',
+    'PUSHFRAME', 'WRITE LF@b', 'MOVE GF@a nil@nil', 'WRITE GF@a', 'READ GF@a type:int', 'WRITE GF@a',
+    'JUMPIFEQ label:end GF@a int@-9223372036854775809', 'WRITE string@missed', 'LABEL label:end')
+cached_input = b'-9223372036854775809\n'
+cached_output = (0, b'-100000000000000000000 ok\ntrue-9223372036854775809')
+
+def source_path(tmp_path):
+    path = os.path.join(tmp_path, 'program.xml')
+    with open(path, 'wb') as source_file:
+        source_file.write(cached_program)
+    return path
+
+def run_cached(source, cache_dir):
+    process = run_process('--source', source, '--cache-dir', cache_dir, input_data=cached_input)
+    return process.returncode, process.stdout
+
+# decoded instructions with the values and slots of their arguments
+def listing(decoded):
+    return [(instruction.opcode, [(argument.type, argument.value, getattr(argument, 'slot', None))
+        for argument in instruction.arguments]) for instruction in decoded]
+
+def cache_files(cache_dir):
+    return [os.path.join(cache_dir, name) for name in os.listdir(cache_dir) if name.endswith('.ippc')]
+
+# the first run stores the program, the second one runs it from the file
+def test_cache_cold_warm(tmp_path):
+    source = source_path(tmp_path)
+    cache_dir = os.path.join(tmp_path, 'cache')
+    os.mkdir(cache_dir)
+    assert run_cached(source, cache_dir) == cached_output
+    assert len(cache_files(cache_dir)) == 1
+    assert run_cached(source, cache_dir) == cached_output
+
+# the cache file decodes to the program the XML loader gives
+def test_cache_decodes_program(tmp_path):
+    parsed = listing(interpret.load_program(io.BytesIO(cached_program)))
+    program_cache.load_program_cached(io.BytesIO(cached_program), str(tmp_path))
+    (path,) = cache_files(tmp_path)
+    cached = program_cache.load_cache_file(path, program_cache.interpreter_fingerprint())
+    assert cached is not None
+    assert listing(cached) == parsed
+
+# a damaged file or one of another interpreter is not used, the run parses
+# the XML and stores the file again
+@pytest.mark.parametrize('damage', ['truncated', 'garbage', 'fingerprint'])
+def test_cache_invalid_file(tmp_path, damage):
+    source = source_path(tmp_path)
+    cache_dir = os.path.join(tmp_path, 'cache')
+    os.mkdir(cache_dir)
+    run_cached(source, cache_dir)
+    (path,) = cache_files(cache_dir)
+    with open(path, 'rb') as cache_file:
+        data = bytearray(cache_file.read())
+    if damage == 'truncated':
+        data = data[:len(data) // 2]
+    elif damage == 'garbage':
+        data[program_cache.cache_header.size:] = b'\xff' * (len(data) - program_cache.cache_header.size)
+    else:
+        data[8:40] = bytes(32)
+    with open(path, 'wb') as cache_file:
+        cache_file.write(data)
+    fingerprint = program_cache.interpreter_fingerprint()
+    assert program_cache.load_cache_file(path, fingerprint) is None
+    assert run_cached(source, cache_dir) == cached_output
+    assert program_cache.load_cache_file(path, fingerprint) is not None
@@ -0,0 +1,58 @@
+# --checkpoint and --resume of interpret.py run as a process.
+
+import os
+
+from harness import program, run_process
+
+# counts to 3000 and writes the count
+def loop_source(tmp_path):
+    path = os.path.join(tmp_path, 'loop.xml')
+    with open(path, 'wb') as source_file:
+        source_file.write(program('DEFVAR GF@i', 'MOVE GF@i int@0', 'LABEL label:top',
+            'ADD GF@i GF@i int@1', 'JUMPIFNEQ label:top GF@i int@3000', 'WRITE GF@i'))
+    return path
+
+# a checkpoint that cannot be written is reported and leaves no partial file,
+# the run goes on
+def test_checkpoint_not_written(tmp_path):
+    source = loop_source(tmp_path)
+    directory = os.path.join(tmp_path, 'directory')
+    os.mkdir(directory)
+    process = run_process('--source', source, '--checkpoint', directory, '--checkpoint-every', '1000')
+    assert (process.returncode, process.stdout) == (0, b'3000')
+    assert f"Checkpoint: {directory} not written".encode() in process.stderr
+    assert sorted(os.listdir(tmp_path)) == ['directory', 'loop.xml']
+
+# the run continues the output file of the interrupted one
+def test_resume(tmp_path):
+    source = loop_source(tmp_path)
+    path = os.path.join(tmp_path, 'checkpoint')
+    output = os.path.join(tmp_path, 'output')
+    interrupted = run_process('--source', source, '--output', output, '--checkpoint', path, '--checkpoint-every', '1000',
+        '--max-steps', '2500')
+    assert interrupted.returncode == 60
+    resumed = run_process('--source', source, '--output', output, '--resume', path)
+    assert resumed.returncode == 0
+    with open(output, 'rb') as output_file:
+        assert output_file.read() == b'3000'
+
+# the output before the checkpoint has to be there
+def test_resume_output_error(tmp_path):
+    source = loop_source(tmp_path)
+    path = os.path.join(tmp_path, 'checkpoint')
+    output = os.path.join(tmp_path, 'output')
+    # WRITE before the loop, the checkpoint is taken after it
+    with open(source, 'wb') as source_file:
+        source_file.write(program('WRITE string@counted:', 'DEFVAR GF@i', 'MOVE GF@i int@0', 'LABEL label:top',
+            'ADD GF@i GF@i int@1', 'JUMPIFNEQ label:top GF@i int@3000', 'WRITE GF@i'))
+    run_process('--source', source, '--output', output, '--checkpoint', path, '--checkpoint-every', '1000', '--max-steps', '2500')
+    with open(output, 'wb') as output_file:
+        output_file.write(b'count')
+    process = run_process('--source', source, '--output', output, '--resume', path)
+    assert process.returncode == 2
+    assert b'is shorter than the output of' in process.stderr
+    os.unlink(output)
+    process = run_process('--source', source, '--output', output, '--resume', path)
+    assert process.returncode == 2
+    assert b'does not exist, resume continues it' in process.stderr
+    assert not os.path.exists(output)
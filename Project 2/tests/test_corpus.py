@@ -0,0 +1,29 @@
+# The conformance corpus under tests/corpus, with every engine in-process and
+# through --test of interpret.py.
+
+import os
+import sys
+import json
+import subprocess
+
+import pytest
+
+from harness import corpus_dir, corpus_cases, engines, interpret_path, read_case, run
+
+@pytest.mark.parametrize('engine', engines)
+@pytest.mark.parametrize('stem', corpus_cases())
+def test_corpus(stem, engine):
+    expected_code = int(read_case(stem, '.rc', b'0'))
+    result = run(read_case(stem, '.src', b''), read_case(stem, '.in', b''), engine)
+    # output written before an error is compared too
+    assert result == (expected_code, read_case(stem, '.out', b''))
+
+def test_runner(tmp_path):
+    report_path = os.path.join(tmp_path, 'report.json')
+    process = subprocess.run([sys.executable, interpret_path, '--test', corpus_dir, '--workers', '2',
+        '--report', report_path], capture_output=True)
+    with open(report_path) as report_file:
+        report = json.load(report_file)
+    assert [result["message"] for result in report["results"] if not result["passed"]] == []
+    assert report["tests"] == len(corpus_cases())
+    assert process.returncode == 0
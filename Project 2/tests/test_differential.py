@@ -0,0 +1,56 @@
+# Random programs run in different ways, the results of the runs have to agree.
+
+import pytest
+
+import interpret
+import checkpoint
+from harness import engines, fusable_program, random_input, random_program, run
+
+seeds = range(200)
+max_steps_code = interpret.limit_exit_codes["--max-steps"]
+
+# program of the seed, the fusable ones make sure superinstructions are hit
+def seed_program(seed):
+    return fusable_program(seed) if seed % 4 == 0 else random_program(seed)
+
+# programs ending within the step budget give the same result everywhere
+@pytest.mark.parametrize('seed', seeds)
+def test_engines_agree(seed):
+    xml = seed_program(seed)
+    reference = run(xml, random_input, 'limited', max_steps=2000)
+    if reference[0] == max_steps_code:
+        return
+    for engine in engines:
+        assert run(xml, random_input, engine) == reference, engine
+
+# a superinstruction costs a step for every instruction it fused, so both
+# opt levels stop before the same instruction, fused instructions keep
+# their index in the program
+@pytest.mark.parametrize('seed', seeds)
+def test_step_limits_agree(seed):
+    xml = seed_program(seed)
+    for max_steps in range(1, 40):
+        unfused = run(xml, random_input, 'limited', max_steps, opt_level=0)
+        unfused_position = (interpret.limit_steps, interpret.instruction_order)
+        fused = run(xml, random_input, 'limited', max_steps, opt_level=1)
+        assert fused == unfused, max_steps
+        assert (interpret.limit_steps, interpret.instruction_order) == unfused_position, max_steps
+
+# a run stopped at any step and resumed from its checkpoint ends like an
+# uninterrupted one
+@pytest.mark.parametrize('seed', seeds)
+def test_checkpoint_resume(seed, tmp_path):
+    xml = seed_program(seed)
+    reference = run(xml, random_input, 'limited', max_steps=400)
+    path = str(tmp_path / 'checkpoint')
+    for max_steps in range(1, 12):
+        exit_code, output = run(xml, random_input, 'limited', max_steps)
+        if exit_code != max_steps_code:
+            break
+        fingerprint = checkpoint.program_fingerprint(interpret.ipp_program)
+        with open(path, 'wb') as checkpoint_file:
+            checkpoint_file.write(checkpoint.encode_checkpoint(fingerprint, interpret.limit_steps))
+        state = checkpoint.read_checkpoint(path, fingerprint)
+        assert state is not None
+        exit_code, resumed_output = run(xml, random_input, 'limited', 400, resume=state)
+        assert (exit_code, output[:state["output"]] + resumed_output) == reference, max_steps
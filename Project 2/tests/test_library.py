@@ -0,0 +1,60 @@
+# Interpreter of interpret.py used as a library: a program loaded once runs
+# any number of times, next to other loaded programs.
+
+import io
+
+import pytest
+
+from interpret import Interpreter, IPP_error
+from harness import program
+
+# sum of the numbers read until the end of input, through a call with a frame
+sum_program = program('DEFVAR GF@sum', 'DEFVAR GF@n', 'MOVE GF@sum int@0', 'LABEL label:read',
+    'READ GF@n type:int', 'JUMPIFEQ label:end GF@n nil@nil', 'CREATEFRAME', 'DEFVAR TF@a', 'MOVE TF@a GF@n',
+    'CALL label:add', 'JUMP label:read', 'LABEL label:end', 'WRITE GF@sum', 'EXIT int@0',
+    'LABEL label:add', 'PUSHFRAME', 'ADD GF@sum GF@sum LF@a', 'POPFRAME', 'RETURN')
+
+# other names in other slots, the line read is written back reversed
+reverse_program = program('DEFVAR GF@line', 'DEFVAR GF@out', 'DEFVAR GF@i', 'DEFVAR GF@c',
+    'READ GF@line type:string', 'MOVE GF@out string@', 'STRLEN GF@i GF@line', 'LABEL label:next',
+    'JUMPIFEQ label:end GF@i int@0', 'SUB GF@i GF@i int@1', 'GETCHAR GF@c GF@line GF@i',
+    'CONCAT GF@out GF@out GF@c', 'JUMP label:next', 'LABEL label:end', 'WRITE GF@out')
+
+def run(interpreter, input_data):
+    output = io.BytesIO()
+    exit_code = interpreter.run(input_data, output)
+    return exit_code, output.getvalue()
+
+# every run starts with empty frames and stacks
+def test_run_repeatedly():
+    interpreter = Interpreter.load(sum_program)
+    assert run(interpreter, b'1\n2\n3\n') == (0, b'6')
+    assert run(interpreter, b'') == (0, b'0')
+    assert run(interpreter, '40\n2\n') == (0, b'42')
+    assert run(interpreter, io.BytesIO(b'-5\n')) == (0, b'-5')
+
+def test_alternating_programs():
+    summing = Interpreter.load(sum_program)
+    reversing = Interpreter.load(reverse_program, opt_level=0)
+    for round_number in range(3):
+        assert run(reversing, f'abc{round_number}\n') == (0, f'{round_number}cba'.encode())
+        assert run(summing, f'{round_number}\n10\n') == (0, f'{round_number + 10}'.encode())
+
+# errors of a run are exit codes, the output before them is kept
+def test_run_error():
+    interpreter = Interpreter.load(program('WRITE string@before', 'WRITE GF@x'))
+    assert run(interpreter, b'') == (54, b'before')
+    interpreter = Interpreter.load(program('DEFVAR GF@x', 'WRITE string@before', 'IDIV GF@x int@1 int@0'))
+    assert run(interpreter, b'') == (57, b'before')
+
+# errors of loading are IPP_error with the exit code interpret.py exits with
+@pytest.mark.parametrize('xml, exit_code', [
+    (b'<program language="IPPcode23"><instruction', 31),
+    (b'<program language="IPPcode23"><instruction order="1" opcode="NOSUCH"/></program>', 53),
+    (program('JUMP label:missing'), 52),
+    (program('LABEL label:twice', 'LABEL label:twice'), 52),
+])
+def test_load_error(xml, exit_code):
+    with pytest.raises(IPP_error) as error:
+        Interpreter.load(xml)
+    assert error.value.exit_code == exit_code
@@ -0,0 +1,53 @@
+# --timeout and --max-memory of interpret.py: the exit code of the limit and
+# the summary on stderr.
+
+import os
+
+from harness import program, run_process
+
+# counts forever, order 4 is the ADD
+endless_program = program('DEFVAR GF@i', 'MOVE GF@i int@0', 'LABEL label:top', 'ADD GF@i GF@i int@1', 'JUMP label:top')
+
+# doubles a string until an allocation fails, order 5 is the CONCAT
+growing_program = program('DEFVAR GF@s', 'MOVE GF@s string@ab', 'WRITE string@start', 'LABEL label:top',
+    'CONCAT GF@s GF@s GF@s', 'JUMP label:top')
+
+def source_path(tmp_path, xml):
+    path = os.path.join(tmp_path, 'program.xml')
+    with open(path, 'wb') as source_file:
+        source_file.write(xml)
+    return path
+
+# "name: value" lines of the summary
+def summary(process):
+    lines = process.stderr.decode().splitlines()
+    return dict(line.split(': ', 1) for line in lines if ': ' in line)
+
+def test_timeout(tmp_path):
+    process = run_process('--source', source_path(tmp_path, endless_program), '--timeout', '0.3')
+    assert process.returncode == 61
+    report = summary(process)
+    assert report["Limit exceeded"] == "--timeout"
+    # checked between chunks of 10000 steps
+    steps = int(report["Steps"])
+    assert steps > 0 and steps % 10000 == 0
+    assert float(report["Time"].removesuffix(" s")) >= 0.3
+    assert report["Memory"].endswith(" MB")
+    assert report["Stopped before"] in ('4', '5')
+
+# a ceiling below the memory of the interpreter itself stops at the first check
+def test_max_memory_between_chunks(tmp_path):
+    process = run_process('--source', source_path(tmp_path, endless_program), '--max-memory', '5')
+    assert process.returncode == 62
+    report = summary(process)
+    assert (report["Limit exceeded"], report["Steps"]) == ("--max-memory", "10000")
+
+# an allocation beyond the ceiling fails inside a chunk, the instruction that
+# made it is reported and the output before it is kept
+def test_max_memory_allocation(tmp_path):
+    process = run_process('--source', source_path(tmp_path, growing_program), '--max-memory', '200')
+    assert (process.returncode, process.stdout) == (62, b'start')
+    report = summary(process)
+    assert report["Limit exceeded"] == "--max-memory"
+    assert 0 < int(report["Steps"]) < 10000
+    assert report["Stopped before"] == '5'
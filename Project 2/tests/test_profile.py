@@ -0,0 +1,78 @@
+# --profile and --trace of interpret.py and the report of trace_analyzer.py
+# on programs with known instruction counts and call depths.
+
+import os
+import sys
+import json
+import subprocess
+
+import pytest
+
+from harness import program, run_process, tests_dir
+
+analyzer_path = os.path.join(tests_dir, '..', 'trace_analyzer.py')
+
+# three rounds of a call to f calling g, 27 instructions, call depth 2
+calls_program = program('DEFVAR GF@i', 'MOVE GF@i int@0', 'LABEL label:top', 'CALL label:f',
+    'ADD GF@i GF@i int@1', 'JUMPIFNEQ label:top GF@i int@3', 'EXIT int@0',
+    'LABEL label:f', 'CALL label:g', 'WRITE string@f', 'RETURN',
+    'LABEL label:g', 'WRITE GF@i', 'RETURN')
+
+# recursion four levels below the first call, 26 instructions, call depth 5
+recursion_program = program('DEFVAR GF@n', 'MOVE GF@n int@4', 'CALL label:down', 'EXIT int@0',
+    'LABEL label:down', 'JUMPIFEQ label:bottom GF@n int@0', 'SUB GF@n GF@n int@1', 'CALL label:down',
+    'WRITE GF@n', 'LABEL label:bottom', 'RETURN')
+
+def source_path(tmp_path, xml):
+    path = os.path.join(tmp_path, 'program.xml')
+    with open(path, 'wb') as source_file:
+        source_file.write(xml)
+    return path
+
+# superinstructions are counted once under their joined name, the
+# instructions they fused are counted in orders
+@pytest.mark.parametrize('opt_level, opcodes', [
+    ('0', {'DEFVAR': 1, 'MOVE': 1, 'CALL': 6, 'WRITE': 6, 'RETURN': 6, 'ADD': 3, 'JUMPIFNEQ': 3, 'EXIT': 1}),
+    ('1', {'DEFVAR+MOVE': 1, 'CALL': 6, 'WRITE': 6, 'RETURN': 6, 'ADD+JUMPIFNEQ': 3, 'EXIT': 1}),
+])
+def test_profile(tmp_path, opt_level, opcodes):
+    report_path = os.path.join(tmp_path, 'profile.json')
+    process = run_process('--source', source_path(tmp_path, calls_program), '--opt-level', opt_level,
+        '--profile', report_path)
+    assert (process.returncode, process.stdout) == (0, b'0f1f2f')
+    with open(report_path) as report_file:
+        report = json.load(report_file)
+    assert report["instructions"] == 27
+    assert {name: opcode["count"] for name, opcode in report["opcodes"].items()} == opcodes
+    assert report["orders"] == {'1': 1, '2': 1, '4': 3, '5': 3, '6': 3, '7': 1, '9': 3, '10': 3, '11': 3, '13': 3, '14': 3}
+    assert {label: entry["calls"] for label, entry in report["labels"].items()} == {'f': 3, 'g': 3}
+    # f includes g
+    labels = report["labels"]
+    assert labels["f"]["inclusive"] >= labels["g"]["inclusive"]
+    assert labels["f"]["exclusive"] <= labels["f"]["inclusive"]
+
+# a recursion counts its calls once per level, its inclusive time once
+def test_profile_recursion(tmp_path):
+    report_path = os.path.join(tmp_path, 'profile.json')
+    process = run_process('--source', source_path(tmp_path, recursion_program), '--profile', report_path)
+    assert (process.returncode, process.stdout) == (0, b'0000')
+    with open(report_path) as report_file:
+        report = json.load(report_file)
+    assert report["instructions"] == 26
+    assert report["labels"]["down"]["calls"] == 5
+    assert report["labels"]["down"]["inclusive"] <= report["time"]
+
+@pytest.mark.parametrize('opt_level', ['0', '1'])
+@pytest.mark.parametrize('xml, output, executed, depth', [
+    (calls_program, b'0f1f2f', 27, 2),
+    (recursion_program, b'0000', 26, 5),
+], ids=['calls', 'recursion'])
+def test_trace_analyzer(tmp_path, opt_level, xml, output, executed, depth):
+    trace_path = os.path.join(tmp_path, 'trace.bin')
+    process = run_process('--source', source_path(tmp_path, xml), '--opt-level', opt_level, '--trace', trace_path)
+    assert (process.returncode, process.stdout) == (0, output)
+    analysis = subprocess.run([sys.executable, analyzer_path, trace_path], capture_output=True, timeout=60)
+    assert analysis.returncode == 0
+    lines = analysis.stdout.decode().splitlines()
+    assert f"executed instructions: {executed}" in lines
+    assert f"maximal call depth: {depth}" in lines
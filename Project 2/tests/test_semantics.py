@@ -0,0 +1,174 @@
+# Semantics of single instructions, checked with every engine.
+
+import pytest
+
+from harness import engines, program, run
+
+### IDIV ###
+
+# integer division rounding towards minus infinity, exact for big integers
+@pytest.mark.parametrize('engine', engines)
+def test_idiv(engine):
+    xml = program('DEFVAR GF@r', 'DEFVAR GF@t',
+        'IDIV GF@r int@7 int@2', 'WRITE GF@r', 'WRITE string@|',
+        'IDIV GF@r int@-7 int@2', 'WRITE GF@r', 'WRITE string@|',
+        'IDIV GF@r int@7 int@-2', 'WRITE GF@r', 'WRITE string@|',
+        'IDIV GF@r int@-8 int@-2', 'WRITE GF@r', 'WRITE string@|',
+        'IDIV GF@r int@1000000000000000000000000000000 int@7', 'WRITE GF@r', 'WRITE string@|',
+        'TYPE GF@t GF@r', 'WRITE GF@t')
+    assert run(xml, engine=engine) == (0, b'3|-4|-4|4|142857142857142857142857142857|int')
+
+@pytest.mark.parametrize('engine', engines)
+def test_idivs(engine):
+    xml = program('DEFVAR GF@r', 'PUSHS int@-7', 'PUSHS int@2', 'IDIVS', 'POPS GF@r', 'WRITE GF@r')
+    assert run(xml, engine=engine) == (0, b'-4')
+
+@pytest.mark.parametrize('engine', engines)
+@pytest.mark.parametrize('lines, exit_code', [
+    (['IDIV GF@r int@1 int@0'], 57),
+    (['PUSHS int@1', 'PUSHS int@0', 'IDIVS'], 57),
+    (['IDIV GF@r int@1 string@2'], 53),
+    (['IDIV GF@r bool@true int@1'], 53),
+    (['IDIV GF@r int@1 nil@nil'], 53),
+])
+def test_idiv_error(engine, lines, exit_code):
+    xml = program('DEFVAR GF@r', *lines, 'WRITE string@reached')
+    assert run(xml, engine=engine) == (exit_code, b'')
+
+### READ ###
+
+# missing and malformed input is nil, WRITE of nil writes nothing
+@pytest.mark.parametrize('engine', engines)
+@pytest.mark.parametrize('read_type', ['int', 'string', 'bool'])
+def test_read_at_end_of_input(engine, read_type):
+    xml = program('DEFVAR GF@x', 'DEFVAR GF@t', f'READ GF@x type:{read_type}',
+        'TYPE GF@t GF@x', 'WRITE GF@t', 'WRITE string@|', 'WRITE GF@x', 'WRITE string@|',
+        'JUMPIFEQ label:nil GF@x nil@nil', 'EXIT int@1', 'LABEL label:nil')
+    assert run(xml, b'', engine) == (0, b'nil||')
+
+@pytest.mark.parametrize('engine', engines)
+def test_read_malformed_int(engine):
+    xml = program('DEFVAR GF@x', 'DEFVAR GF@t', 'READ GF@x type:int', 'TYPE GF@t GF@x', 'WRITE GF@t',
+        'READ GF@x type:int', 'TYPE GF@t GF@x', 'WRITE GF@t', 'READ GF@x type:string', 'TYPE GF@t GF@x', 'WRITE GF@t')
+    assert run(xml, b'abc\n\n\n', engine) == (0, b'nilnilstring')
+
+# the next line on every READ, the last line may miss its newline
+@pytest.mark.parametrize('engine', engines)
+def test_read_next_line(engine):
+    xml = program('DEFVAR GF@x', 'READ GF@x type:int', 'WRITE GF@x', 'READ GF@x type:string', 'WRITE GF@x',
+        'READ GF@x type:bool', 'WRITE GF@x', 'READ GF@x type:bool', 'WRITE GF@x', 'READ GF@x type:int', 'WRITE GF@x',
+        'READ GF@x type:int', 'TYPE GF@x GF@x', 'WRITE GF@x')
+    assert run(xml, b'1\ntwo words\nTRUE\nno\n5', engine) == (0, b'1two wordstruefalse5nil')
+
+### RETURN ###
+
+# RETURN continues after the CALL, also when a label follows the CALL
+@pytest.mark.parametrize('engine', engines)
+def test_return_after_call(engine):
+    xml = program('CALL label:f', 'LABEL label:back', 'WRITE string@b', 'CALL label:f', 'WRITE string@c',
+        'EXIT int@0', 'LABEL label:f', 'WRITE string@a', 'RETURN')
+    assert run(xml, engine=engine) == (0, b'abac')
+
+# a CALL right before RETURN returns to the caller of its subroutine
+@pytest.mark.parametrize('engine', engines)
+def test_return_from_tail_call(engine):
+    xml = program('CALL label:f', 'WRITE string@c', 'EXIT int@0',
+        'LABEL label:f', 'WRITE string@a', 'CALL label:g', 'RETURN',
+        'LABEL label:g', 'WRITE string@b', 'RETURN')
+    assert run(xml, engine=engine) == (0, b'abc')
+
+# every level of a recursion continues after its own CALL
+@pytest.mark.parametrize('engine', engines)
+def test_return_from_recursion(engine):
+    xml = program('DEFVAR GF@n', 'MOVE GF@n int@3', 'CALL label:r', 'WRITE string@.', 'EXIT int@0',
+        'LABEL label:r', 'JUMPIFEQ label:done GF@n int@0', 'WRITE GF@n', 'SUB GF@n GF@n int@1',
+        'CALL label:r', 'ADD GF@n GF@n int@1', 'WRITE GF@n', 'LABEL label:done', 'RETURN')
+    assert run(xml, engine=engine) == (0, b'321123.')
+
+@pytest.mark.parametrize('engine', engines)
+def test_return_without_call(engine):
+    xml = program('WRITE string@a', 'RETURN', 'WRITE string@b')
+    assert run(xml, engine=engine) == (56, b'a')
+
+### INT2CHAR ###
+
+@pytest.mark.parametrize('engine', engines)
+def test_int2char(engine):
+    xml = program('DEFVAR GF@c', 'INT2CHAR GF@c int@65', 'WRITE GF@c',
+        'PUSHS int@1114111', 'INT2CHARS', 'PUSHS int@98', 'INT2CHARS', 'POPS GF@c', 'WRITE GF@c',
+        'POPS GF@c', 'STRLEN GF@c GF@c', 'WRITE GF@c')
+    assert run(xml, engine=engine) == (0, b'Ab1')
+
+# ordinals out of the unicode range, also beyond the range of a C long
+@pytest.mark.parametrize('engine', engines)
+@pytest.mark.parametrize('ordinal', ['int@-1', 'int@1114112', 'int@-100000000000000000000', 'int@100000000000000000000'])
+@pytest.mark.parametrize('lines', [['INT2CHAR GF@c {}'], ['PUSHS {}', 'INT2CHARS']])
+def test_int2char_error(engine, ordinal, lines):
+    xml = program('DEFVAR GF@c', *[line.format(ordinal) for line in lines], 'WRITE string@reached')
+    assert run(xml, engine=engine) == (53, b'')
+
+### SETCHAR ###
+
+# replaces the character, the length stays
+@pytest.mark.parametrize('engine', engines)
+def test_setchar_replaces(engine):
+    xml = program('DEFVAR GF@s', 'DEFVAR GF@n', 'MOVE GF@s string@abc',
+        'SETCHAR GF@s int@1 string@XY', 'WRITE GF@s', 'STRLEN GF@n GF@s', 'WRITE GF@n',
+        'SETCHAR GF@s int@0 string@Q', 'SETCHAR GF@s int@2 string@Z', 'WRITE GF@s')
+    assert run(xml, engine=engine) == (0, b'aXc3QXZ')
+
+# a string built by CONCAT is replaced in place and read back flat
+@pytest.mark.parametrize('engine', engines)
+def test_setchar_after_concat(engine):
+    xml = program('DEFVAR GF@s', 'DEFVAR GF@n', 'DEFVAR GF@c', 'CONCAT GF@s string@ab string@cd',
+        'CONCAT GF@s GF@s string@e', 'SETCHAR GF@s int@4 string@E', 'SETCHAR GF@s int@0 string@A',
+        'WRITE GF@s', 'STRLEN GF@n GF@s', 'WRITE GF@n', 'GETCHAR GF@c GF@s int@4', 'WRITE GF@c',
+        'JUMPIFEQ label:same GF@s string@AbcdE', 'EXIT int@1', 'LABEL label:same')
+    assert run(xml, engine=engine) == (0, b'AbcdE5E')
+
+# copies made by MOVE and PUSHS keep their characters
+@pytest.mark.parametrize('engine', engines)
+def test_setchar_leaves_copies(engine):
+    xml = program('DEFVAR GF@s', 'DEFVAR GF@t', 'DEFVAR GF@u', 'CONCAT GF@s string@ab string@c',
+        'SETCHAR GF@s int@0 string@x', 'MOVE GF@t GF@s', 'PUSHS GF@s',
+        'SETCHAR GF@s int@1 string@y', 'POPS GF@u', 'SETCHAR GF@s int@2 string@z',
+        'WRITE GF@s', 'WRITE string@|', 'WRITE GF@t', 'WRITE string@|', 'WRITE GF@u')
+    assert run(xml, engine=engine) == (0, b'xyz|xbc|xbc')
+
+@pytest.mark.parametrize('engine', engines)
+@pytest.mark.parametrize('index, character', [('int@3', 'string@x'), ('int@-1', 'string@x'), ('int@0', 'string@')])
+def test_setchar_index_error(engine, index, character):
+    xml = program('DEFVAR GF@s', 'MOVE GF@s string@abc', f'SETCHAR GF@s {index} {character}', 'WRITE GF@s')
+    assert run(xml, engine=engine) == (58, b'')
+
+### FRAMES ###
+
+# a new frame has none of the variables of the frames before it
+@pytest.mark.parametrize('engine', engines)
+def test_frame_holds_own_variables(engine):
+    xml = program('CREATEFRAME', 'DEFVAR TF@a', 'MOVE TF@a int@1', 'PUSHFRAME',
+        'CREATEFRAME', 'DEFVAR TF@b', 'MOVE TF@b LF@a', 'DEFVAR TF@a', 'MOVE TF@a int@2',
+        'WRITE TF@b', 'WRITE TF@a', 'POPFRAME', 'WRITE TF@a')
+    assert run(xml, engine=engine) == (0, b'121')
+
+# TYPE of a local variable without a value is empty
+@pytest.mark.parametrize('engine', engines)
+def test_frame_type_of_uninitialized(engine):
+    xml = program('DEFVAR GF@t', 'CREATEFRAME', 'PUSHFRAME', 'DEFVAR LF@a',
+        'TYPE GF@t LF@a', 'WRITE GF@t', 'WRITE string@|', 'MOVE LF@a nil@nil', 'TYPE GF@t LF@a', 'WRITE GF@t')
+    assert run(xml, engine=engine) == (0, b'|nil')
+
+@pytest.mark.parametrize('engine', engines)
+@pytest.mark.parametrize('lines, exit_code', [
+    (['CREATEFRAME', 'DEFVAR TF@a', 'CREATEFRAME', 'WRITE TF@a'], 54),
+    (['CREATEFRAME', 'DEFVAR TF@a', 'CREATEFRAME', 'MOVE TF@a int@1'], 54),
+    (['CREATEFRAME', 'PUSHFRAME', 'STRLEN GF@n LF@s'], 54),
+    (['CREATEFRAME', 'PUSHFRAME', 'TYPE GF@n LF@a'], 54),
+    (['CREATEFRAME', 'DEFVAR TF@a', 'DEFVAR TF@a'], 52),
+    (['CREATEFRAME', 'PUSHFRAME', 'DEFVAR LF@a', 'MOVE LF@a int@1', 'DEFVAR LF@a'], 52),
+    (['CREATEFRAME', 'DEFVAR TF@a', 'WRITE TF@a'], 56),
+    (['CREATEFRAME', 'PUSHFRAME', 'WRITE TF@a'], 55),
+])
+def test_frame_error(engine, lines, exit_code):
+    xml = program('DEFVAR GF@n', *lines, 'WRITE string@reached')
+    assert run(xml, engine=engine) == (exit_code, b'')
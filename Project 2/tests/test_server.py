@@ -0,0 +1,126 @@
+# --serve of interpret.py: JSON requests over a Unix domain socket, served by
+# a server process with one worker.
+
+import os
+import sys
+import json
+import time
+import signal
+import socket
+import subprocess
+
+import pytest
+
+from harness import interpret_path, program
+
+echo_program = program('DEFVAR GF@n', 'READ GF@n type:int', 'ADD GF@n GF@n int@1', 'WRITE GF@n').decode()
+endless_program = program('LABEL label:top', 'JUMP label:top').decode()
+
+# process ids of the children of a process
+def child_processes(pid):
+    children = []
+    for name in os.listdir('/proc'):
+        if name.isdigit():
+            try:
+                with open(f'/proc/{name}/stat') as stat_file:
+                    fields = stat_file.read().rsplit(')', 1)[1].split()
+            except OSError:
+                continue
+            if int(fields[1]) == pid:
+                children.append(int(name))
+    return children
+
+class Client:
+    def __init__(self, path):
+        self.connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.connection.connect(path)
+        self.file = self.connection.makefile('rwb')
+
+    # response to a request line
+    def send_line(self, line):
+        self.file.write(line + b'\n')
+        self.file.flush()
+        return json.loads(self.file.readline())
+
+    def request(self, request):
+        return self.send_line(json.dumps(request).encode())
+
+@pytest.fixture
+def server(tmp_path):
+    path = os.path.join(tmp_path, 'server.sock')
+    process = subprocess.Popen([sys.executable, interpret_path, '--serve', path, '--workers', '1'],
+        stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 30
+    while not os.path.exists(path):
+        assert process.poll() is None and time.monotonic() < deadline
+        time.sleep(0.05)
+    yield process, path
+    process.send_signal(signal.SIGTERM)
+    assert process.wait(30) == 0
+    assert not os.path.exists(path)
+
+def test_server_request(server, tmp_path):
+    _, path = server
+    client = Client(path)
+    response = client.request({"xml": echo_program, "input": "41\n"})
+    assert (response["exit_code"], response["stdout"], response["stderr"]) == (0, "42", "")
+    # loaded before, the same result
+    assert client.request({"xml": echo_program, "input": "1\n"})["stdout"] == "2"
+    source = os.path.join(tmp_path, 'echo.xml')
+    with open(source, 'w') as source_file:
+        source_file.write(echo_program)
+    assert client.request({"source": source, "input": "-1\n"})["stdout"] == "0"
+    assert client.request({"xml": echo_program})["exit_code"] == 53
+
+# a malformed request gets an error and the connection stays usable
+@pytest.mark.parametrize('line, error', [
+    (b'{"xml": ', 'bad request: '),
+    (b'[1]', 'bad request: request is not an object'),
+    (b'{"xml": 1}', 'bad request: xml is not a string'),
+    (b'{"xml": "", "input": null}', 'bad request: input is not a string'),
+    (b'{"xml": "", "timeout": -1}', 'bad request: timeout is not a positive number'),
+    (b'{"xml": "", "timeout": true}', 'bad request: timeout is not a positive number'),
+    (b'{"input": ""}', 'no source or xml'),
+    (b'{"source": "/nonexistent/program.xml"}', 'No such file or directory'),
+])
+def test_server_malformed_request(server, line, error):
+    _, path = server
+    client = Client(path)
+    response = client.send_line(line)
+    assert response["exit_code"] is None
+    assert error in response["error"]
+    assert client.request({"xml": echo_program, "input": "1\n"})["stdout"] == "2"
+
+# the worker stops a program over its time limit and serves the next request
+def test_server_timeout(server):
+    process, path = server
+    client = Client(path)
+    workers = child_processes(process.pid)
+    assert client.request({"xml": endless_program, "timeout": 0.3}) == {"exit_code": None, "error": "timeout",
+        "time": pytest.approx(0.3, abs=0.5)}
+    assert client.request({"xml": echo_program, "input": "1\n"})["stdout"] == "2"
+    assert child_processes(process.pid) == workers
+
+# a worker that died is replaced by a new one
+@pytest.mark.skipif(not os.path.isdir('/proc/self'), reason='needs /proc')
+def test_server_worker_replaced(server):
+    process, path = server
+    client = Client(path)
+    assert client.request({"xml": echo_program, "input": "1\n"})["stdout"] == "2"
+    (worker,) = child_processes(process.pid)
+    os.kill(worker, signal.SIGKILL)
+    time.sleep(0.2)
+    assert client.request({"xml": echo_program, "input": "1\n"}) == {"exit_code": None, "error": "worker died"}
+    assert client.request({"xml": echo_program, "input": "1\n"})["stdout"] == "2"
+    assert worker not in child_processes(process.pid)
+
+# a file that is not a socket is not removed
+def test_server_path_not_socket(tmp_path):
+    path = os.path.join(tmp_path, 'server.sock')
+    with open(path, 'w') as kept:
+        kept.write('kept')
+    process = subprocess.run([sys.executable, interpret_path, '--serve', path], capture_output=True, timeout=30)
+    assert process.returncode == 2
+    assert b'exists and is not a socket' in process.stderr
+    with open(path) as kept:
+        assert kept.read() == 'kept'
@@ -0,0 +1,174 @@
+# Author: Baturov Illia (xbatur00)
+#
+# Offline analysis of an interpret.py --trace file: hot paths, branch
+# outcomes, loop trip counts and call depth over time.
+#
+# usage: python3 trace_analyzer.py TRACE [--top N] [--bucket N]
+
+import sys
+import json
+import struct
+import argparse
+
+### READING ###
+
+def read_varints(data, position):
+    value = 0
+    shift = 0
+    while position < len(data):
+        byte = data[position]
+        position += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            yield value, position
+            value = 0
+            shift = 0
+        else:
+            shift += 7
+
+def unzigzag(value):
+    return value >> 1 if value % 2 == 0 else -(value >> 1) - 1
+
+# program table and (source, target) records, target None at the end
+def read_trace(path):
+    with open(path, 'rb') as trace_file:
+        data = trace_file.read()
+    if data[:4] != b'IPPT':
+        sys.exit(f"{path}: not an interpret.py trace")
+    (table_length,) = struct.unpack_from('<I', data, 4)
+    table = json.loads(data[8:8 + table_length])
+
+    records = []
+    previous = 0
+    pending = None
+    for value, _ in read_varints(data, 8 + table_length):
+        if pending is None:
+            pending = previous + unzigzag(value)
+            continue
+        source = pending
+        pending = None
+        if value == 0:
+            records.append((source, None))
+            break
+        target = source + unzigzag(value - 1)
+        records.append((source, target))
+        previous = target
+    return table, records
+
+### ANALYSIS ###
+
+class Trace_analysis:
+    def __init__(self, table, bucket):
+        self.orders = table["orders"]
+        self.opcodes = table["opcodes"]
+        self.next = table["next"]
+        # CALLs followed by RETURN do not grow the call stack
+        self.tail_calls = set(table.get("tail_calls", ()))
+        self.bucket = bucket
+
+        length = len(self.orders)
+        self.executed = 0
+        self.hits = [0] * length
+        self.taken = {} # (source, target) : count
+        self.not_taken = [0] * length
+        self.runs = {} # (start, end) : count
+        self.depth = 0
+        self.max_depth = 0
+        self.depth_buckets = [] # max depth per bucket of executed instructions
+
+    def last_opcode(self, index):
+        return self.opcodes[self.next[index] - 1]
+
+    # superinstructions count as the instructions they fused
+    def execute(self, index, branched):
+        self.executed += self.next[index] - index
+        for fused in range(index, self.next[index]):
+            self.hits[fused] += 1
+        last = self.last_opcode(index)
+        if last in ("JUMPIFEQ", "JUMPIFNEQ", "JUMPIFEQS", "JUMPIFNEQS") and not branched:
+            self.not_taken[index] += 1
+        if last == "CALL" and branched and self.next[index] - 1 not in self.tail_calls:
+            self.depth += 1
+        elif self.opcodes[index] == "RETURN" and branched:
+            self.depth -= 1
+        self.max_depth = max(self.max_depth, self.depth)
+
+        bucket = (self.executed - 1) // self.bucket
+        if bucket == len(self.depth_buckets):
+            self.depth_buckets.append(self.depth)
+        else:
+            self.depth_buckets[bucket] = max(self.depth_buckets[bucket], self.depth)
+
+    # replays the records, instructions between them run in sequence
+    def replay(self, records):
+        position = 0
+        for source, target in records:
+            if position < len(self.orders):
+                start = position
+                while position != source:
+                    self.execute(position, False)
+                    position = self.next[position]
+                self.execute(source, target is not None)
+                self.runs[(start, source)] = self.runs.get((start, source), 0) + 1
+            if target is None:
+                break
+            self.taken[(source, target)] = self.taken.get((source, target), 0) + 1
+            position = target
+
+    # instructions of a sequential run, fused ones included
+    def run_length(self, start, end):
+        return self.next[end] - start
+
+### REPORT ###
+
+def print_report(analysis, top):
+    orders = analysis.orders
+    print(f"executed instructions: {analysis.executed}")
+    print(f"maximal call depth: {analysis.max_depth}")
+
+    print(f"\nhot paths (order range, runs, instructions):")
+    paths = [(count * analysis.run_length(start, end), count, start, end) for (start, end), count in analysis.runs.items()]
+    for weight, count, start, end in sorted(paths, reverse=True)[:top]:
+        print(f"  {orders[start]:>6} .. {orders[end]:<6} {count:>10} {weight:>12}")
+
+    print(f"\nbranches (order -> target, taken, not taken):")
+    sources = {source for source, _ in analysis.taken} | {index for index, count in enumerate(analysis.not_taken) if count}
+    branches = []
+    for source in sources:
+        taken = sum(count for (edge_source, _), count in analysis.taken.items() if edge_source == source)
+        branches.append((taken + analysis.not_taken[source], source, taken))
+    for total, source, taken in sorted(branches, reverse=True)[:top]:
+        targets = sorted({target for edge_source, target in analysis.taken if edge_source == source})
+        target_orders = ",".join(str(orders[target]) if target < len(orders) else "end" for target in targets) or "-"
+        print(f"  {orders[source]:>6} -> {target_orders:<10} {taken:>10} {analysis.not_taken[source]:>10}")
+
+    print(f"\nloops (header order, back-edge order, entries, iterations, average trip count):")
+    # backward jumps, CALL and RETURN are not loops
+    back_edges = {(source, target): count for (source, target), count in analysis.taken.items()
+        if target <= source and analysis.last_opcode(source) in ("JUMP", "JUMPIFEQ", "JUMPIFNEQ", "JUMPIFEQS", "JUMPIFNEQS")}
+    loops = []
+    for (source, target), count in back_edges.items():
+        header_back_edges = sum(edge_count for (_, edge_target), edge_count in back_edges.items() if edge_target == target)
+        entries = max(analysis.hits[target] - header_back_edges, 1)
+        loops.append((count, target, source, entries))
+    for count, target, source, entries in sorted(loops, reverse=True)[:top]:
+        print(f"  {orders[target]:>6} {orders[source]:>6} {entries:>10} {count + entries:>10} {(count + entries) / entries:>10.1f}")
+
+    print(f"\ncall depth per {analysis.bucket} instructions (maximum):")
+    buckets = analysis.depth_buckets
+    step = max(1, len(buckets) // top)
+    for number in range(0, len(buckets), step):
+        depth = max(buckets[number:number + step])
+        print(f"  {number * analysis.bucket:>12} {depth:>6} {'#' * min(depth, 60)}")
+
+if __name__ == '__main__':
+    argument_parser = argparse.ArgumentParser()
+    argument_parser.add_argument('trace', metavar='file', help='Path to trace of interpret.py --trace?')
+    argument_parser.add_argument('--top', metavar='n', type=int, default=10, help='Rows per table?')
+    argument_parser.add_argument('--bucket', metavar='n', type=int, default=10000, help='Instructions per call depth sample?')
+    program_args = argument_parser.parse_args()
+
+    table, records = read_trace(program_args.trace)
+    analysis = Trace_analysis(table, program_args.bucket)
+    analysis.replay(records)
+    print_report(analysis, program_args.top)
@@ -0,0 +1,76 @@
+# Author: Baturov Illia (xbatur00)
+#
+# --trace of interpret.py, read by trace_analyzer.py. Imported by
+# interpret.py only in this mode.
+
+import json
+import struct
+
+import interpret
+from interpret import handle_case_tail_call, reset_frames
+
+### TRACE ###
+
+# --trace file: b'IPPT', u32 length of the JSON program table, the table,
+# then one record per control transfer
+#   record  varint zigzag(source - previous target), varint zigzag(target - source) + 1
+#   end     varint zigzag(last - previous target), varint 0
+# instructions between two records ran in sequence, so a branch without a
+# record was not taken
+trace_magic = b'IPPT'
+trace_buffer_limit = 1 << 20
+
+def trace_varint(buffer, value):
+    while value > 0x7F:
+        buffer.append((value & 0x7F) | 0x80)
+        value >>= 7
+    buffer.append(value)
+
+def trace_zigzag(value):
+    return value * 2 if value >= 0 else -value * 2 - 1
+
+# index of the next instruction when nothing jumps
+def sequential_next(program):
+    return [index + 1 + (len(instruction.fused) if instruction.fused else 0) for index, instruction in enumerate(program)]
+
+def run_program_traced(program, path):
+    interpret.ipp_program = program
+    reset_frames()
+    interpret.instruction_order = 0
+    program_length = len(program)
+    next_index = sequential_next(program)
+
+    table = {
+        "orders": [int(instruction.order) for instruction in program],
+        "opcodes": [instruction.opcode for instruction in program],
+        "next": next_index,
+        "targets": [instruction.target for instruction in program],
+        "tail_calls": [index for index, instruction in enumerate(program) if instruction.handler is handle_case_tail_call],
+    }
+    table_data = json.dumps(table, separators=(',', ':')).encode()
+
+    with open(path, 'wb') as trace_file:
+        trace_file.write(trace_magic + struct.pack('<I', len(table_data)) + table_data)
+        buffer = bytearray()
+        previous = 0
+        index = -1
+        try:
+            while interpret.instruction_order < program_length:
+                index = interpret.instruction_order
+                instruction = program[index]
+                interpret.instruction_order = index + 1
+                instruction.handler(instruction)
+                next_order = interpret.instruction_order
+                if next_order != next_index[index]:
+                    trace_varint(buffer, trace_zigzag(index - previous))
+                    trace_varint(buffer, trace_zigzag(next_order - index) + 1)
+                    previous = next_order
+                    if len(buffer) >= trace_buffer_limit:
+                        trace_file.write(buffer)
+                        buffer.clear()
+        finally:
+            # last executed instruction, also for EXIT and errors
+            if index >= 0:
+                trace_varint(buffer, trace_zigzag(index - previous))
+                trace_varint(buffer, 0)
+            trace_file.write(buffer)